@@ -1,8 +1,6 @@
 from PIL import Image
 import streamlit as st
-from authentication.login import login_user
-
-from painel.relatorio_macro import *
+from authentication.login import login_user, usuario_autorizado
 
 # Configuração da página
 st.set_page_config(
@@ -43,14 +41,13 @@ else:
 
     st.image("img/row-logos.png", use_container_width=True)
                 
-    # Permissão por tipo de usuário
-    usuarios_autorizados = {
-        "inbazz": "inbazz"
-    }
-
+    # Permissão por usuário: e-mails autorizados do config.yaml (cache do processo)
     usuario_tipo = st.session_state.get("email")
 
-    if usuario_tipo in usuarios_autorizados.values():
+    if usuario_autorizado(usuario_tipo):
+        # o relatório (pandas, plotly, dados) só é importado depois do login
+        from painel.relatorio_macro import app_relatorio_macro
+
         app_relatorio_macro(authenticator)
     else:
         st.warning("Acesso restrito. Usuário não autorizado ou sessão inválida.")
\ No newline at end of file
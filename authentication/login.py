@@ -1,24 +1,81 @@
 import os
+import copy
+import threading
 import yaml
 from yaml.loader import SafeLoader
 import streamlit as st
 import streamlit_authenticator as stauth
 
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", ".streamlit", "config.yaml")
+
+# e-mails com acesso ao relatório quando o config.yaml não traz a lista "autorizados"
+AUTORIZADOS_PADRAO = ("inbazz",)
+
+# e-mails que veem as ferramentas de diagnóstico: só os listados em "administradores"
+# no config.yaml (sem a lista, ninguém)
+ADMINISTRADORES_PADRAO = frozenset()
+
+# config do processo, relido só quando o arquivo muda: caminho -> (mtime, config, autorizados, administradores)
+_CONFIGS = {}
+_LOCK_CONFIGS = threading.Lock()
+
+
+def _ler_config(caminho):
+    with open(caminho) as file:
+        config = yaml.load(file, Loader=SafeLoader)
+    # senhas em texto puro viram bcrypt uma vez por leitura do arquivo (e não a
+    # cada rerun, como faz o auto_hash do Authenticate)
+    stauth.Hasher.hash_passwords(config["credentials"])
+    autorizados = frozenset(config.get("autorizados") or AUTORIZADOS_PADRAO)
+    administradores = frozenset(config.get("administradores") or ADMINISTRADORES_PADRAO)
+    return config, autorizados, administradores
+
+
+def _entrada_config(caminho):
+    mtime = os.stat(caminho).st_mtime_ns
+    with _LOCK_CONFIGS:
+        atual = _CONFIGS.get(caminho)
+        if atual is None or atual[0] != mtime:
+            atual = (mtime, *_ler_config(caminho))
+            _CONFIGS[caminho] = atual
+        return atual
+
+
+def carregar_config(caminho=CONFIG_PATH):
+    """(config, autorizados) do config.yaml, compartilhados entre sessões. Não altere o config devolvido."""
+    _, config, autorizados, _ = _entrada_config(caminho)
+    return config, autorizados
+
+
+def usuario_autorizado(email, caminho=CONFIG_PATH):
+    """O e-mail da sessão tem acesso ao relatório?"""
+    try:
+        return email in carregar_config(caminho)[1]
+    except Exception:
+        return False
+
+
+def usuario_administrador(email, caminho=CONFIG_PATH):
+    """O e-mail da sessão vê as ferramentas de diagnóstico (ex.: painel de instrumentação)?"""
+    try:
+        return email in _entrada_config(caminho)[3]
+    except Exception:
+        return False
+
+
 def login_user():
-    """Carrega o config.yaml e retorna o objeto authenticator"""
+    """Carrega o config.yaml (cache do processo) e retorna o objeto authenticator"""
     try:
-        config_path = os.path.join(
-            os.path.dirname(__file__), "..", ".streamlit", "config.yaml"
-        )
-        # st.info(f"Lendo config.yaml de: {config_path}")
-        with open(config_path) as file:
-            config = yaml.load(file, Loader=SafeLoader)
+        config, _ = carregar_config()
 
+        # o Authenticate é criado a cada rerun (renderiza o componente de cookie)
+        # e altera as credenciais no login: cada sessão recebe a sua cópia
         authenticator = stauth.Authenticate(
-            config["credentials"],
+            copy.deepcopy(config["credentials"]),
             config["cookie"]["name"],
             config["cookie"]["key"],
             config["cookie"]["expiry_days"],
+            auto_hash=False,
         )
 
         return authenticator
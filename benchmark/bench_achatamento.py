@@ -0,0 +1,73 @@
+"""
+Benchmark do achatamento das colunas aninhadas: implementação antiga
+(applymap + apply(pd.Series) por coluna) x achatamento pelo esquema.
+
+A base é montada replicando os posts reais até 1k/100k/1M linhas. A versão
+antiga é pulada acima de --limite-antigo linhas (leva minutos em 1M).
+
+uso: python benchmark/bench_achatamento.py [--tamanhos 1000,100000,1000000] [--limite-antigo 100000]
+"""
+import os
+import sys
+import time
+import argparse
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import numpy as np
+import pandas as pd
+
+from painel.dados.esquema import CAMPOS_ANINHADOS
+from painel.dados.preparacao import achatar_colunas_aninhadas
+
+
+def _achatar_antigo(df):
+    """Cópia do achatamento original do filtro (referência)."""
+    mapa = getattr(df, "applymap", None) or df.map
+    dict_columns = df.columns[mapa(lambda x: isinstance(x, dict)).any()]
+    for col in dict_columns:
+        dict_expanded = df[col].apply(pd.Series).add_prefix(f"{col}_")
+        df = pd.concat([df, dict_expanded], axis=1)
+        df = df.drop(columns=[col])
+    return df
+
+
+def _base_replicada(base, n):
+    idx = np.resize(np.arange(len(base)), n)
+    return base.iloc[idx].reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--origem", default=os.path.join(RAIZ, "data", "base_farm_json_ajust.json"))
+    parser.add_argument("--tamanhos", default="1000,100000,1000000")
+    parser.add_argument("--limite-antigo", type=int, default=100_000)
+    args = parser.parse_args()
+
+    base = pd.read_json(args.origem)
+    base = base[base["post_type"].notna()].reset_index(drop=True)
+    n_sub = sum(len(v) for k, v in CAMPOS_ANINHADOS.items() if k in base.columns)
+    print(f"{base.shape[1]} colunas, {n_sub} subcolunas aninhadas")
+
+    for n in [int(x) for x in args.tamanhos.split(",")]:
+        df = _base_replicada(base, n)
+
+        t0 = time.perf_counter()
+        achatar_colunas_aninhadas(df)
+        t_novo = time.perf_counter() - t0
+
+        if n <= args.limite_antigo:
+            t0 = time.perf_counter()
+            _achatar_antigo(df)
+            t_antigo = time.perf_counter() - t0
+            antigo = f"{t_antigo:9.2f} s   ({t_antigo / t_novo:5.1f}x)"
+        else:
+            antigo = "   (pulado)"
+
+        print(f"{n:>9} posts   esquema {t_novo:8.3f} s   antigo {antigo}")
+        del df
+
+
+if __name__ == "__main__":
+    main()
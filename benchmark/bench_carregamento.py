@@ -0,0 +1,66 @@
+"""
+Benchmark de carga a frio: JSON exportado x Parquet achatado.
+
+Cada cenário roda em um processo novo (sem cache) e reporta o tempo de carga
+e o pico de memória residente (ru_maxrss) do processo.
+
+uso: python benchmark/bench_carregamento.py [origem.json]
+"""
+import os
+import sys
+import json
+import tempfile
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from painel.dados.colunar import converter_json_para_parquet
+
+# colunas usadas pelos KPIs da parte 1 (exemplo de painel que lê poucas colunas)
+COLUNAS_PAINEL = ["post_type", "post_date", "imagem_face_presente", "imagem_texto_detectado"]
+
+_FILHO = """
+import sys, json, time, resource
+sys.path.insert(0, {raiz!r})
+import pandas as pd
+from painel.dados.carregador import _ler_base
+base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+t0 = time.perf_counter()
+df = _ler_base({caminho!r}, {colunas!r})
+dt = time.perf_counter() - t0
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"segundos": dt, "rss_pico_mb": rss / 1024, "rss_import_mb": base_rss / 1024,
+                  "linhas": len(df), "colunas": df.shape[1]}}))
+"""
+
+
+def _medir(caminho, colunas=None):
+    codigo = _FILHO.format(raiz=RAIZ, caminho=caminho, colunas=colunas)
+    out = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    origem = sys.argv[1] if len(sys.argv) > 1 else os.path.join(RAIZ, "data", "base_farm_json_ajust.json")
+    with tempfile.TemporaryDirectory() as tmp:
+        destino = os.path.join(tmp, "base.parquet")
+        converter_json_para_parquet(origem, destino)
+
+        cenarios = {
+            "json (read_json + achatamento)": _medir(origem),
+            "parquet (todas as colunas)": _medir(destino),
+            "parquet (colunas do painel)": _medir(destino, COLUNAS_PAINEL),
+        }
+
+        print(f"origem: {origem} ({os.path.getsize(origem) / 1e6:.1f} MB)"
+              f" | parquet: {os.path.getsize(destino) / 1e6:.1f} MB")
+        for nome, r in cenarios.items():
+            print(f"{nome:<35} {r['segundos'] * 1000:9.1f} ms"
+                  f"   rss pico {r['rss_pico_mb']:7.1f} MB"
+                  f"   (+{r['rss_pico_mb'] - r['rss_import_mb']:.1f} MB na carga)"
+                  f"   {r['linhas']} x {r['colunas']}")
+
+
+if __name__ == "__main__":
+    main()
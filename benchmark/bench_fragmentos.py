@@ -0,0 +1,137 @@
+"""
+Benchmark de tempo de servidor por tipo de interação no relatório macro.
+
+Roda o app no AppTest sobre uma base com os posts reais replicados e mede o
+rerun provocado por cada interação: filtro de tipo de post (rerun completo) e
+os widgets do mosaico (página, colunas, legenda, contexto). Widgets dentro de
+um st.fragment reexecutam só o fragmento, como no navegador: o AppTest sempre
+pede rerun completo, então aqui o pedido de rerun é trocado pelo do fragmento
+dono do widget. Também reporta os tempos por seção gravados pelo app em
+st.session_state["tempos_relatorio"].
+
+Para comparar antes/depois, aponte --antes para outra cópia do repositório
+(ex.: git worktree add /tmp/antes <commit>); cada árvore roda num processo novo.
+
+uso: python benchmark/bench_fragmentos.py [--posts 100000] [--antes /tmp/antes]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmark.bench_memoria_rerun import _APP, _ambiente, _gerar_base
+
+_FILHO = """
+import sys, json, time, warnings
+warnings.filterwarnings("ignore")
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import local_script_runner as lsr
+from streamlit.runtime.scriptrunner_utils.script_requests import RerunData
+
+# rerun de fragmento: substitui o rerun completo que o runner enfileira ao nascer
+_FRAGMENTO = [None]
+_run = lsr.LocalScriptRunner.run
+
+def _run_fragmento(self, widget_state=None, query_params=None, timeout=3, page_hash=""):
+    if _FRAGMENTO[0] is None:
+        return _run(self, widget_state, query_params, timeout, page_hash)
+    self._requests._rerun_data = RerunData(widget_states=widget_state, page_script_hash=page_hash,
+                                           fragment_id_queue=[_FRAGMENTO[0]], is_fragment_scoped_rerun=True)
+    try:
+        if not self._script_thread:
+            self.start()
+        lsr.require_widgets_deltas(self, timeout)
+    finally:
+        self.join()
+    return lsr.parse_tree_from_messages(self.forward_msgs())
+
+lsr.LocalScriptRunner.run = _run_fragmento
+
+at = AppTest.from_file({app!r}, default_timeout=600)
+at.run()
+assert not at.exception, [e.value for e in at.exception]
+
+def _tempos():
+    return dict(at.session_state["tempos_relatorio"]) if "tempos_relatorio" in at.session_state else {{}}
+
+# fragmento de cada seção: o que, rodado sozinho, só atualiza o tempo dela
+secoes = {{}}
+for fid in list(at._fragment_storage._fragments):
+    _FRAGMENTO[0] = fid
+    antes = _tempos()
+    at.run()
+    mudou = [s for s, t in _tempos().items() if antes.get(s) != t]
+    if len(mudou) == 1:
+        secoes[mudou[0]] = fid
+_FRAGMENTO[0] = None
+at.run()
+
+tipos = list(at.multiselect[0].options)
+contexto = at.multiselect(key="mosaico_main_contexto")
+passos = [
+    ("rerun sem mudança", None, lambda: None),
+    ("filtro: 1 tipo de post", None, lambda: at.multiselect[0].set_value(tipos[:1])),
+    ("filtro: todos os tipos", None, lambda: at.multiselect[0].set_value(tipos)),
+    ("mosaico: página 2", "mosaico", lambda: at.number_input(key="mosaico_main_page").set_value(2)),
+    ("mosaico: colunas", "mosaico", lambda: at.number_input(key="mosaico_main_cols").set_value(6)),
+    ("mosaico: legendas", "mosaico", lambda: at.checkbox(key="mosaico_main_legend").check()),
+    ("mosaico: contexto", "mosaico", lambda: contexto.set_value(contexto.options[:1])),
+    ("mosaico: página 1", "mosaico", lambda: at.number_input(key="mosaico_main_page").set_value(1)),
+]
+reruns = []
+for nome, secao, acao in passos:
+    acao()
+    _FRAGMENTO[0] = secoes.get(secao)
+    t0 = time.perf_counter()
+    at.run()
+    dt = time.perf_counter() - t0
+    _FRAGMENTO[0] = None
+    assert not at.exception, [e.value for e in at.exception]
+    reruns.append({{"passo": nome, "segundos": dt, "fragmento": secao in secoes, "secoes": _tempos()}})
+print(json.dumps({{"reruns": reruns}}))
+"""
+
+
+def _medir(raiz, caminho, tmp):
+    app = os.path.join(tmp, f"app_{abs(hash(raiz))}.py")
+    with open(app, "w", encoding="utf-8") as f:
+        f.write(_APP.format(raiz=raiz, caminho=caminho))
+    # sem download de miniaturas: mede só o servidor do app
+    env = _ambiente(caminho, IA_FARM_MINIATURAS="0")
+    out = subprocess.run([sys.executable, "-c", _FILHO.format(app=app)], capture_output=True, text=True,
+                         check=True, cwd=raiz, env=env)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--origem", default=os.path.join(RAIZ, "data", "base_farm_json_ajust.json"))
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--antes", help="outra cópia do repositório para comparar")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = os.path.join(tmp, "base.parquet")
+        _gerar_base(args.origem, args.posts, caminho)
+        arvores = {"depois": RAIZ}
+        if args.antes:
+            arvores = {"antes": os.path.abspath(args.antes), **arvores}
+
+        resultados = {nome: _medir(raiz, caminho, tmp) for nome, raiz in arvores.items()}
+
+    print(f"{args.posts} posts (tempo de servidor por interação)")
+    for nome, r in resultados.items():
+        print(f"\n[{nome}]")
+        for p in r["reruns"]:
+            escopo = "fragmento" if p["fragmento"] else "completo"
+            secoes = "  ".join(f"{s} {t:.0f}" for s, t in p["secoes"].items())
+            print(f"  {p['passo']:<24} {p['segundos'] * 1000:8.0f} ms  ({escopo})  {secoes}")
+
+
+if __name__ == "__main__":
+    main()
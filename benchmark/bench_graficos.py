@@ -0,0 +1,79 @@
+"""
+Benchmark dos gráficos de barras do relatório (painel.funcao.graficos).
+
+Mede os 10 gráficos de barras (tipo de post, objetos, hashtags, emoções e
+as 6 visualizações de categorias) num rerun em que o agregado não mudou
+(ex.: só a página do mosaico mudou) e num rerun com recorte novo, e o custo
+dos rótulos vetorizados contra o apply(axis=1) antigo.
+
+uso: python benchmark/bench_graficos.py [--base data/base_farm_json_ajust.json] [--reruns 5]
+"""
+import os
+import sys
+import time
+import argparse
+import warnings
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+warnings.filterwarnings("ignore")
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from painel.dados.carregador import carregar_base
+from painel.funcao import funcao_relatorio_macro as f
+from painel.funcao.graficos import estatisticas_graficos, limpar_cache_graficos, rotulo_contagem_percentual
+
+GRAFICOS = [
+    f.app_funcao_tipo_post, f.app_funcao_objetos, f.app_funcao_hashtags, f.app_funcao_emocoes_legenda,
+    f.grafico_topicos_imagem, f.grafico_gatilhos_imagem, f.grafico_ctas_imagem,
+    f.grafico_topicos_legenda, f.grafico_gatilhos_legenda, f.grafico_ctas_legenda,
+]
+
+
+def _rerun(df):
+    t0 = time.perf_counter()
+    for g in GRAFICOS:
+        g(df)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base", default=os.path.join(RAIZ, "data", "base_farm_json_ajust.json"))
+    parser.add_argument("--reruns", type=int, default=5)
+    args = parser.parse_args()
+
+    st.plotly_chart = lambda fig, **kwargs: None  # só o custo de montar a figura
+    df = carregar_base(args.base)
+    rng = np.random.default_rng(0)
+
+    limpar_cache_graficos()
+    t_frio = _rerun(df)
+    t_quente = min(_rerun(df) for _ in range(args.reruns))
+    t_recorte = np.mean([_rerun(df[rng.random(len(df)) < 0.5]) for _ in range(args.reruns)])
+
+    n = 10_000
+    top = pd.DataFrame({"objeto": [f"objeto {i}" for i in range(n)],
+                        "count": rng.integers(1, 1000, n), "percent": rng.random(n) * 100})
+    t0 = time.perf_counter()
+    antigo = top.apply(lambda r: f"{r['count']} ({r['percent']:.1f}%)", axis=1)
+    t_apply = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    novo = rotulo_contagem_percentual(top["count"], top["percent"])
+    t_vetor = time.perf_counter() - t0
+    iguais = np.mean(antigo.to_numpy() == novo)
+
+    print(f"{len(df)} posts, {len(GRAFICOS)} gráficos")
+    print(f"1º rerun (monta figuras)     {t_frio * 1000:7.0f} ms")
+    print(f"rerun sem mudança (cache)    {t_quente * 1000:7.0f} ms")
+    print(f"rerun com recorte novo       {t_recorte * 1000:7.0f} ms")
+    print(f"rótulos {n} linhas: apply {t_apply * 1000:.1f} ms   vetorizado {t_vetor * 1000:.1f} ms"
+          f"   ({iguais:.0%} iguais)")
+    print(estatisticas_graficos())
+
+
+if __name__ == "__main__":
+    main()
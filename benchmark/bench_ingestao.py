@@ -0,0 +1,105 @@
+"""
+Benchmark de memória da ingestão de uma exportação grande em registros.
+
+Gera um JSON em registros com posts sintéticos (benchmark/gerador_sintetico.py,
+100k por padrão) e converte para Parquet de dois jeitos, cada um num processo
+novo: de uma vez (converter_json_para_parquet: pd.read_json do arquivo
+inteiro) e em lotes (converter_json_em_lotes, um --lote de registros por vez).
+Reporta o tempo e o pico de memória residente (VmHWM). Com --lote repetido,
+compara vários tamanhos de lote: o pico deve acompanhar o lote, não o tamanho
+do arquivo.
+
+Paridade: cada Parquet é lido como o app lê (ler_parquet) e, coluna a coluna,
+o nome, o dtype e um hash dos valores são comparados com os do Parquet
+convertido de uma vez. O resultado não pode depender do tamanho do lote
+(--lote 7 força lotes com chaves nulas, colunas vazias e tipos diferentes).
+
+uso: python benchmark/bench_ingestao.py [--posts 100000] [--lote 2000 5000]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmark.gerador_sintetico import gerar_posts, gravar_posts
+
+_FILHO = """
+import sys, json, time, warnings
+warnings.filterwarnings("ignore")
+sys.path.insert(0, ".")
+from painel.dados.colunar import converter_json_para_parquet, converter_json_em_lotes
+
+t0 = time.perf_counter()
+if {lote} is None:
+    converter_json_para_parquet({origem!r}, {destino!r})
+else:
+    converter_json_em_lotes({origem!r}, {destino!r}, tamanho_lote={lote})
+segundos = time.perf_counter() - t0
+with open("/proc/self/status") as f:
+    pico = next((int(l.split()[1]) / 1024 for l in f if l.startswith("VmHWM:")), None)
+
+# paridade (depois de medir o pico): nome, dtype e hash dos valores de cada coluna
+import hashlib
+from painel.dados.colunar import ler_parquet
+df = ler_parquet({destino!r})
+colunas = [
+    [c, str(df[c].dtype),
+     hashlib.blake2b(json.dumps(df[c].astype(object).tolist(), default=str).encode(), digest_size=8).hexdigest()]
+    for c in df.columns
+]
+print(json.dumps({{"segundos": segundos, "pico_mb": pico, "linhas": len(df), "colunas": colunas}}))
+"""
+
+
+def _medir(origem, destino, lote):
+    codigo = _FILHO.format(origem=origem, destino=destino, lote=lote)
+    out = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True, cwd=RAIZ)
+    os.remove(destino)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--lote", type=int, nargs="+", default=[2_000, 5_000])
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        origem = os.path.join(tmp, "posts.json")
+        gravar_posts(gerar_posts(args.posts, args.semente, dias=365), origem, registros=True)
+        tamanho_mb = os.path.getsize(origem) / 1e6
+        destino = os.path.join(tmp, "base.parquet")
+        resultados = {"de uma vez": _medir(origem, destino, None)}
+        for lote in args.lote:
+            resultados[f"lotes de {lote}"] = _medir(origem, destino, lote)
+
+    print(f"{args.posts} posts, JSON em registros de {tamanho_mb:.0f} MB")
+    referencia = resultados["de uma vez"]
+    for nome, r in resultados.items():
+        linha = f"  {nome:<18} {r['segundos']:7.1f} s   pico {r['pico_mb']:7.0f} MB   {r['linhas']} linhas"
+        if r is not referencia:
+            linha += "   paridade " + _paridade(referencia, r)
+        print(linha)
+
+
+def _paridade(referencia, r):
+    """'ok' ou o que diverge do Parquet convertido de uma vez (ordem, dtype ou valores das colunas)."""
+    if r["linhas"] != referencia["linhas"]:
+        return f"FALHOU: {r['linhas']} linhas (de uma vez: {referencia['linhas']})"
+    if [c[0] for c in r["colunas"]] != [c[0] for c in referencia["colunas"]]:
+        return "FALHOU: colunas diferentes ou em outra ordem"
+    tipos = [f"{a[0]} ({a[1]} -> {b[1]})" for a, b in zip(referencia["colunas"], r["colunas"]) if a[1] != b[1]]
+    valores = [a[0] for a, b in zip(referencia["colunas"], r["colunas"]) if a[2] != b[2]]
+    if tipos or valores:
+        return f"FALHOU: dtype {tipos}, valores {valores}"
+    return "ok"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark de inicialização (cold start) do app.
+
+1. Importação: roda `python -X importtime` num processo novo importando o
+   relatório (painel.relatorio_macro) e reporta o tempo total e os módulos
+   mais caros (tempo acumulado), no estilo do importtime.
+2. Tempo até a 1ª renderização de app_projeto_ia_farm.py no AppTest, num
+   processo novo: tela de login (sem sessão) e relatório (sessão autenticada
+   como usuário autorizado). Conta desde o início do processo, ou seja,
+   inclui a importação do Streamlit e do app.
+
+Para comparar antes/depois, aponte --antes para outra cópia do repositório
+(ex.: git worktree add /tmp/antes <commit>). Com --json os resultados também
+são gravados em arquivo.
+
+uso: python benchmark/bench_inicializacao.py [--modulo painel.relatorio_macro] [--top 15]
+                                             [--repeticoes 3] [--antes /tmp/antes] [--json saida.json]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_FILHO = """
+import time
+t0 = time.perf_counter()
+import sys, json, warnings
+warnings.filterwarnings("ignore")
+from streamlit.testing.v1 import AppTest
+
+at = AppTest.from_file("app_projeto_ia_farm.py", default_timeout=600)
+if {autenticado!r}:
+    at.session_state["authentication_status"] = True
+    at.session_state["email"] = "inbazz"
+    at.session_state["name"] = "inbazz"
+    at.session_state["username"] = "inbazz"
+at.run()
+dt = time.perf_counter() - t0
+assert not at.exception, [e.value for e in at.exception]
+print(json.dumps({{"segundos": dt, "modulos": len(sys.modules), "metricas": len(at.metric)}}))
+"""
+
+
+def _importtime(raiz, modulo):
+    """(tempo total em s, [(acumulado em s, módulo)]) de `import modulo` num processo novo."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                         capture_output=True, text=True, check=True, cwd=raiz)
+    modulos = []
+    for linha in out.stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        _, acumulado, nome = linha[len("import time:"):].split("|")
+        modulos.append((int(acumulado) / 1e6, nome.rstrip()[1:]))  # recuo = nível de importação
+    total = sum(t for t, nome in modulos if not nome.startswith(" "))
+    return total, modulos
+
+
+def _primeira_renderizacao(raiz, autenticado, repeticoes):
+    tempos, r = [], None
+    for _ in range(repeticoes):
+        out = subprocess.run([sys.executable, "-c", _FILHO.format(autenticado=autenticado)],
+                             capture_output=True, text=True, check=True, cwd=raiz)
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        tempos.append(r["segundos"])
+    return {"segundos": statistics.median(tempos), "modulos": r["modulos"], "metricas": r["metricas"]}
+
+
+def _medir(raiz, modulo, repeticoes):
+    totais = [_importtime(raiz, modulo) for _ in range(repeticoes)]
+    total, modulos = min(totais, key=lambda t: t[0])
+    return {
+        "importacao_segundos": total,
+        "modulos": sorted(modulos, reverse=True),
+        "login": _primeira_renderizacao(raiz, False, repeticoes),
+        "relatorio": _primeira_renderizacao(raiz, True, repeticoes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modulo", default="painel.relatorio_macro")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--antes", help="outra cópia do repositório para comparar")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args()
+
+    arvores = {"depois": RAIZ}
+    if args.antes:
+        arvores = {"antes": os.path.abspath(args.antes), **arvores}
+    resultados = {nome: _medir(raiz, args.modulo, args.repeticoes) for nome, raiz in arvores.items()}
+
+    for nome, r in resultados.items():
+        print(f"\n[{nome}] import {args.modulo}: {r['importacao_segundos'] * 1000:.0f} ms")
+        for t, modulo in r["modulos"][:args.top]:
+            print(f"  {t * 1000:8.1f} ms  {modulo}")
+        for tela in ("login", "relatorio"):
+            p = r[tela]
+            print(f"  1ª renderização ({tela}): {p['segundos'] * 1000:.0f} ms"
+                  f"   {p['modulos']} módulos carregados, {p['metricas']} métricas")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
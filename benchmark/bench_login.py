@@ -0,0 +1,68 @@
+"""
+Benchmark do login_user (authentication/login.py), chamado a cada rerun do app.
+
+Mede, num processo novo, o tempo por chamada de login_user() depois da 1ª
+(leitura do config.yaml + hash das senhas em texto puro + Authenticate) e, se
+a árvore tiver, o da checagem de usuário autorizado.
+
+Para comparar antes/depois, aponte --antes para outra cópia do repositório
+(ex.: git worktree add /tmp/antes <commit>; o config.yaml precisa existir lá).
+
+uso: python benchmark/bench_login.py [--chamadas 20] [--antes /tmp/antes]
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_FILHO = """
+import sys, json, time, logging, warnings
+warnings.filterwarnings("ignore")
+logging.disable(logging.WARNING)
+sys.path.insert(0, ".")
+from authentication import login
+
+login.login_user()
+t0 = time.perf_counter()
+for _ in range({chamadas}):
+    login.login_user()
+por_chamada = (time.perf_counter() - t0) / {chamadas}
+
+autorizado = None
+if hasattr(login, "usuario_autorizado"):
+    t0 = time.perf_counter()
+    for _ in range(100_000):
+        login.usuario_autorizado("inbazz")
+    autorizado = (time.perf_counter() - t0) / 100_000
+print(json.dumps({{"login_user": por_chamada, "usuario_autorizado": autorizado}}))
+"""
+
+
+def _medir(raiz, chamadas):
+    out = subprocess.run([sys.executable, "-c", _FILHO.format(chamadas=chamadas)], capture_output=True,
+                         text=True, check=True, cwd=raiz)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chamadas", type=int, default=20)
+    parser.add_argument("--antes", help="outra cópia do repositório para comparar")
+    args = parser.parse_args()
+
+    arvores = {"depois": RAIZ}
+    if args.antes:
+        arvores = {"antes": os.path.abspath(args.antes), **arvores}
+    for nome, raiz in arvores.items():
+        r = _medir(raiz, args.chamadas)
+        linha = f"[{nome}] login_user {r['login_user'] * 1000:8.2f} ms por rerun"
+        if r["usuario_autorizado"] is not None:
+            linha += f"   usuario_autorizado {r['usuario_autorizado'] * 1e6:.2f} µs"
+        print(linha)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark de memória por rerun do relatório macro (filtro + painéis + mosaico).
+
+Gera uma base com os posts reais replicados (100k por padrão), grava em Parquet
+e roda o app no AppTest do Streamlit: a 1ª execução carrega a base (fora da
+medida) e cada rerun seguinte muda o filtro. Para cada rerun é reportado o pico
+de memória residente acima do RSS de antes do rerun (VmHWM zerado via
+/proc/self/clear_refs; fora do Linux cai no ru_maxrss, que só cresce).
+
+Para comparar antes/depois, aponte --antes para outra cópia do repositório
+(ex.: git worktree add /tmp/antes <commit>); cada árvore roda num processo novo.
+
+uso: python benchmark/bench_memoria_rerun.py [--posts 100000] [--antes /tmp/antes]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from painel.dados.preparacao import preparar_base
+from painel.dados.colunar import _para_tabela_arrow
+
+# script do app rodado pelo AppTest: o relatório apontado para a base gerada
+# (árvores com registro de marcas usam IA_FARM_BASE_FARM, ver _ambiente)
+_APP = """
+import sys
+sys.path.insert(0, {raiz!r})
+import painel.filtro.filtro_relatorio_macro as filtro
+filtro.CAMINHO_BASE_PADRAO = {caminho!r}
+from painel.relatorio_macro import app_relatorio_macro
+
+class _SemLogin:
+    def logout(self, **kwargs):
+        pass
+
+app_relatorio_macro(_SemLogin())
+"""
+
+_FILHO = """
+import sys, json, time, resource, warnings
+warnings.filterwarnings("ignore")
+from streamlit.testing.v1 import AppTest
+
+def _status(campo):
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith(campo + ":"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def _zerar_pico():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+at = AppTest.from_file({app!r}, default_timeout=600)
+t0 = time.perf_counter()
+at.run()
+carga = time.perf_counter() - t0
+assert not at.exception, [e.value for e in at.exception]
+tipos = list(at.multiselect[0].options)
+ini, fim = at.slider[0].value
+
+passos = [
+    ("mesmo filtro", lambda: None),
+    ("1 tipo de post", lambda: at.multiselect[0].set_value(tipos[:1])),
+    ("todos os tipos", lambda: at.multiselect[0].set_value(tipos)),
+    ("metade do período", lambda: at.slider[0].set_value((ini, ini + (fim - ini) / 2))),
+    ("período todo", lambda: at.slider[0].set_value((ini, fim))),
+]
+reruns = []
+for nome, acao in passos:
+    acao()
+    antes = _status("VmRSS")
+    zerado = _zerar_pico()
+    t0 = time.perf_counter()
+    at.run()
+    dt = time.perf_counter() - t0
+    pico = _status("VmHWM") if zerado else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    reruns.append({{"passo": nome, "segundos": dt, "pico_acima_mb": None if antes is None else pico - antes,
+                   "pico_mb": pico}})
+print(json.dumps({{"carga_segundos": carga, "rss_mb": _status("VmRSS"), "reruns": reruns}}))
+"""
+
+
+def _gerar_base(origem, n, destino):
+    bruto = pd.read_json(origem)
+    bruto = bruto[bruto["post_type"].notna()].reset_index(drop=True)
+    idx = np.resize(np.arange(len(bruto)), n)
+    base = preparar_base(bruto.iloc[idx].reset_index(drop=True))
+    pq.write_table(_para_tabela_arrow(base), destino, compression="zstd")
+
+
+def _ambiente(caminho, **extra):
+    """Ambiente do processo filho com a base gerada como base da farm."""
+    return {**os.environ, "IA_FARM_MARCA": "farm", "IA_FARM_BASE_FARM": caminho, **extra}
+
+
+def _medir(raiz, caminho, tmp):
+    app = os.path.join(tmp, f"app_{abs(hash(raiz))}.py")
+    with open(app, "w", encoding="utf-8") as f:
+        f.write(_APP.format(raiz=raiz, caminho=caminho))
+    out = subprocess.run([sys.executable, "-c", _FILHO.format(app=app)], capture_output=True, text=True,
+                         check=True, cwd=raiz, env=_ambiente(caminho))
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--origem", default=os.path.join(RAIZ, "data", "base_farm_json_ajust.json"))
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--antes", help="outra cópia do repositório para comparar")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = os.path.join(tmp, "base.parquet")
+        _gerar_base(args.origem, args.posts, caminho)
+        arvores = {"depois": RAIZ}
+        if args.antes:
+            arvores = {"antes": os.path.abspath(args.antes), **arvores}
+
+        resultados = {nome: _medir(raiz, caminho, tmp) for nome, raiz in arvores.items()}
+
+    print(f"{args.posts} posts")
+    for nome, r in resultados.items():
+        print(f"\n[{nome}] carga {r['carga_segundos']:.1f} s   rss após reruns {r['rss_mb']:.0f} MB")
+        for p in r["reruns"]:
+            print(f"  {p['passo']:<20} {p['segundos'] * 1000:8.0f} ms   pico +{p['pico_acima_mb']:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
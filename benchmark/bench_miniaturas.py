@@ -0,0 +1,159 @@
+"""
+Benchmark do cache de miniaturas do mosaico contra um servidor HTTP local
+que faz o papel do storage (Supabase): gera N imagens grandes, serve por
+http.server com latência artificial e mede uma página do mosaico
+
+- baixando os originais a cada rerun (comportamento antigo do st.image(url));
+- 1ª passada pelo cache (download + tile);
+- passadas seguintes (só disco).
+
+Também confere o limite do LRU: com --limite-mb pequeno o total em disco
+não passa do limite e as imagens descartadas são baixadas de novo.
+
+Por fim compara a página buscada em série com o PrefetcherMiniaturas
+(pool de threads + próxima página aquecendo) e confere que URLs lentas ou
+mortas viram placeholder (None) dentro do tempo de espera da página.
+
+uso: python benchmark/bench_miniaturas.py [--imagens 40] [--latencia-ms 80] [--limite-mb 1]
+"""
+import os
+import sys
+import io
+import time
+import argparse
+import tempfile
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import numpy as np
+from PIL import Image
+
+from painel.imagens.miniaturas import CacheMiniaturas, _baixar
+from painel.imagens.prefetch import PrefetcherMiniaturas, baixar_com_sessao, _sessao_http
+
+
+class _Storage(SimpleHTTPRequestHandler):
+    latencia = 0.0
+
+    def do_GET(self):
+        # /lento/... segura a resposta bem além da espera da página
+        if self.path.startswith("/lento/"):
+            time.sleep(12)
+            self.path = self.path[len("/lento"):]
+        else:
+            time.sleep(self.latencia)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+def _gerar_imagens(pasta, n, tamanho=(1080, 1350)):
+    rng = np.random.default_rng(0)
+    for i in range(n):
+        # ruído em blocos: comprime como foto (não como cor sólida)
+        base = rng.integers(0, 255, (tamanho[1] // 8, tamanho[0] // 8, 3), dtype=np.uint8)
+        img = Image.fromarray(base).resize(tamanho, Image.Resampling.BILINEAR)
+        img.save(os.path.join(pasta, f"post_{i:05d}.jpg"), quality=90)
+
+
+class _Servidor(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # cliente que desistiu por timeout (BrokenPipe) não interessa aqui
+
+
+def _servidor(pasta, latencia):
+    handler = functools.partial(_Storage, directory=pasta)
+    _Storage.latencia = latencia
+    srv = _Servidor(("127.0.0.1", 0), handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def _cronometrar(f, urls):
+    t0 = time.perf_counter()
+    saida = [f(u) for u in urls]
+    return time.perf_counter() - t0, saida
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--imagens", type=int, default=40)
+    parser.add_argument("--latencia-ms", type=float, default=80)
+    parser.add_argument("--limite-mb", type=float, default=1)
+    parser.add_argument("--proporcao", default="4 / 5")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as storage, tempfile.TemporaryDirectory() as cache_dir:
+        _gerar_imagens(storage, args.imagens)
+        srv = _servidor(storage, args.latencia_ms / 1000)
+        urls = [f"http://127.0.0.1:{srv.server_port}/{n}" for n in sorted(os.listdir(storage))]
+
+        t_orig, originais = _cronometrar(_baixar, urls)
+        bytes_orig = sum(len(b) for b in originais)
+
+        cache = CacheMiniaturas(os.path.join(cache_dir, "grande"), max_bytes=1 << 30)
+        t_frio, tiles = _cronometrar(lambda u: cache.miniatura(u, args.proporcao), urls)
+        t_quente, tiles2 = _cronometrar(lambda u: cache.miniatura(u, args.proporcao), urls)
+        assert tiles == tiles2
+        bytes_tiles = sum(os.path.getsize(t) for t in tiles)
+        with Image.open(tiles[0]) as img:
+            dim = f"{img.width}x{img.height} {img.format}"
+
+        # reinício do processo: o índice em disco continua valendo
+        reaberto = CacheMiniaturas(os.path.join(cache_dir, "grande"), max_bytes=1 << 30)
+        t_reaberto, _ = _cronometrar(lambda u: reaberto.miniatura(u, args.proporcao), urls)
+
+        limite = int(args.limite_mb * 1024 * 1024)
+        pequeno = CacheMiniaturas(os.path.join(cache_dir, "pequeno"), max_bytes=limite)
+        for u in urls:
+            pequeno.miniatura(u, args.proporcao)
+        em_disco = sum(os.path.getsize(os.path.join(r, f)) for r, _, fs in
+                       os.walk(os.path.join(cache_dir, "pequeno", "originais")) for f in fs)
+        em_disco += sum(os.path.getsize(os.path.join(r, f)) for r, _, fs in
+                        os.walk(os.path.join(cache_dir, "pequeno", "tiles")) for f in fs)
+
+        # página em paralelo + próxima página aquecendo (URLs divididas em 2 páginas)
+        meio = len(urls) // 2
+        pref = PrefetcherMiniaturas(CacheMiniaturas(os.path.join(cache_dir, "paralelo"), max_bytes=1 << 30,
+                                                    baixar=baixar_com_sessao(_sessao_http())))
+        t0 = time.perf_counter()
+        pag1 = pref.pagina(urls[:meio], args.proporcao, espera=60)
+        pref.aquecer(urls[meio:], args.proporcao)
+        t_pag1 = time.perf_counter() - t0
+        time.sleep(args.latencia_ms / 1000 * 2 + 1)  # usuário olhando a página 1
+        t0 = time.perf_counter()
+        pag2 = pref.pagina(urls[meio:], args.proporcao, espera=60)
+        t_pag2 = time.perf_counter() - t0
+        assert all(pag1.values()) and all(pag2.values())
+
+        # URLs problemáticas: lenta, 404 e host sem servidor
+        ruins = [f"http://127.0.0.1:{srv.server_port}/lento/{os.listdir(storage)[0]}",
+                 f"http://127.0.0.1:{srv.server_port}/nao_existe.jpg",
+                 "http://127.0.0.1:9/morto.jpg"]
+        t0 = time.perf_counter()
+        r = pref.pagina(urls[:2] + ruins, args.proporcao, espera=2)
+        t_ruins = time.perf_counter() - t0
+        assert [r[u] is None for u in ruins] == [True, True, True] and r[urls[0]] and r[urls[1]]
+        srv.shutdown()
+
+    print(f"{args.imagens} imagens, latência {args.latencia_ms:.0f} ms, tile {dim}")
+    print(f"originais a cada rerun   {t_orig * 1000:8.0f} ms   {bytes_orig / 1e6:7.2f} MB trafegados")
+    print(f"cache (1ª passada)       {t_frio * 1000:8.0f} ms")
+    print(f"cache (reruns)           {t_quente * 1000:8.0f} ms   {bytes_tiles / 1e6:7.2f} MB em tiles")
+    print(f"cache (após reinício)    {t_reaberto * 1000:8.0f} ms")
+    print(f"LRU limite {limite / 1e6:.2f} MB: contabilizado {pequeno.nbytes / 1e6:.2f} MB,"
+          f" em disco {em_disco / 1e6:.2f} MB")
+    print(f"prefetch página 1 ({meio})     {t_pag1 * 1000:8.0f} ms   (série: ~{t_frio * 1000 * meio / len(urls):.0f} ms)")
+    print(f"prefetch página 2 (aquecida) {t_pag2 * 1000:6.0f} ms")
+    print(f"página com URLs lenta/404/morta {t_ruins * 1000:5.0f} ms (placeholder nas 3)")
+    assert pequeno.nbytes <= max(limite, 0) or len(pequeno._arquivos) == 1
+    assert em_disco == pequeno.nbytes
+
+
+if __name__ == "__main__":
+    main()
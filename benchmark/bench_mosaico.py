@@ -0,0 +1,98 @@
+"""
+Benchmark de renderização do mosaico: modo "colunas" (st.columns + st.image
+por tile) x modo "grade" (página inteira num único bloco HTML/CSS).
+
+Serve N imagens por um servidor HTTP local, aquece o cache de miniaturas e
+roda filtro_e_mosaico_imagens no AppTest em cada modo (processo novo por
+modo). Reporta elementos do Streamlit na página, bytes dos protos enviados
+ao navegador e tempo do rerun.
+
+uso: python benchmark/bench_mosaico.py [--por-pagina 200] [--colunas 5]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmark.bench_miniaturas import _gerar_imagens, _servidor
+
+_APP = """
+import sys
+sys.path.insert(0, {raiz!r})
+import pandas as pd
+import streamlit as st
+st._config.set_option("server.enableStaticServing", True)
+from painel.funcao.funcao_relatorio_macro import filtro_e_mosaico_imagens
+
+urls = {urls!r}
+df = pd.DataFrame({{
+    "thumbnail": urls,
+    "post_date": pd.date_range("2025-09-01", periods=len(urls), freq="h", tz="UTC").astype(str),
+    "caption": [f"legenda do post {{i}}" for i in range(len(urls))],
+    "imagem_contexto_farm_modo_retrato": [True] * len(urls),
+}})
+filtro_e_mosaico_imagens(df, mostrar_legenda=True, colunas={colunas}, por_pagina={por_pagina}, modo={modo!r})
+"""
+
+_FILHO = """
+import sys, json, time, warnings
+warnings.filterwarnings("ignore")
+from streamlit.testing.v1 import AppTest
+
+def _elementos(no, acc):
+    filhos = getattr(no, "children", None)
+    for filho in (filhos.values() if isinstance(filhos, dict) else []):
+        acc.append(filho)
+        _elementos(filho, acc)
+    return acc
+
+at = AppTest.from_file({app!r}, default_timeout=600)
+at.run()   # aquece cache/tiles
+t0 = time.perf_counter()
+at.run()
+dt = time.perf_counter() - t0
+assert not at.exception, [e.value for e in at.exception]
+els = _elementos(at._tree, [])
+protos = [e.proto for e in els if hasattr(getattr(e, "proto", None), "ByteSize")]
+print(json.dumps({{"elementos": len(els), "bytes": sum(p.ByteSize() for p in protos), "segundos": dt,
+                  "imagens": len(at.get("imgs"))}}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--por-pagina", type=int, default=200)
+    parser.add_argument("--colunas", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as storage, tempfile.TemporaryDirectory() as tmp:
+        _gerar_imagens(storage, args.por_pagina, tamanho=(640, 800))
+        srv = _servidor(storage, 0)
+        urls = [f"http://127.0.0.1:{srv.server_port}/{n}" for n in sorted(os.listdir(storage))]
+        env = {**os.environ, "IA_FARM_CACHE_MINIATURAS": os.path.join(tmp, "static", "miniaturas"),
+               "IA_FARM_ESPERA_MINIATURAS": "120"}
+
+        resultados = {}
+        for modo in ("colunas", "grade"):
+            app = os.path.join(tmp, f"app_{modo}.py")
+            with open(app, "w", encoding="utf-8") as f:
+                f.write(_APP.format(raiz=RAIZ, urls=urls, colunas=args.colunas,
+                                    por_pagina=args.por_pagina, modo=modo))
+            out = subprocess.run([sys.executable, "-c", _FILHO.format(app=app)], capture_output=True,
+                                 text=True, check=True, cwd=tmp, env=env)
+            resultados[modo] = json.loads(out.stdout.strip().splitlines()[-1])
+        srv.shutdown()
+
+    print(f"{args.por_pagina} tiles por página, {args.colunas} colunas (rerun com cache quente)")
+    for modo, r in resultados.items():
+        print(f"{modo:<8} {r['elementos']:5d} elementos   {r['bytes'] / 1024:8.1f} KiB de protos"
+              f"   {r['segundos'] * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
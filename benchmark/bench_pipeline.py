@@ -0,0 +1,237 @@
+"""
+Suíte de benchmark do pipeline do relatório macro sobre bases sintéticas.
+
+Para cada tamanho (10k e 100k posts por padrão; 1M com --tamanhos, que pede
+~3 GB de JSON em disco e bem mais que isso de RAM) gera a base com
+benchmark/gerador_sintetico.py e, num processo novo por árvore, mede:
+
+1. carga do JSON exportado (pd.read_json) e achatamento (preparar_base);
+2. carga pelo carregador a partir do Parquet (leitura + tokens, bitset,
+   indicadores e cubo), como o app faz com base colunar;
+3. filtros (todos os posts, 1 tipo de post, metade do período);
+4. cada KPI / app_funcao_* / grafico_* sobre o recorte com todos os posts;
+5. preparação da página do mosaico (filtro_e_mosaico_imagens).
+
+As chamadas do Streamlit são trocadas por um stub que devolve o valor padrão
+de cada widget; as etapas 3-5 rodam --repeticoes vezes a frio (sessão nova e
+cache de figuras limpo) e é reportada a mediana. Os resultados vão para um
+JSON (--json); com --comparar, cada etapa é comparada à de um JSON anterior
+(ex.: o da versão anterior) e as que ficaram mais lentas que --tolerancia
+são marcadas como regressão.
+
+Para comparar antes/depois direto, aponte --antes para outra cópia do
+repositório (ex.: git worktree add /tmp/antes <commit>).
+
+uso: python benchmark/bench_pipeline.py [--tamanhos 10000 100000] [--repeticoes 3] [--dias 365]
+                                        [--antes /tmp/antes] [--json saida.json]
+                                        [--comparar anterior.json] [--tolerancia 1.2]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmark.gerador_sintetico import gerar_posts, gravar_posts
+
+_FILHO = """
+import sys, json, time, statistics, warnings
+warnings.filterwarnings("ignore")
+sys.path.insert(0, ".")
+import pandas as pd
+import pyarrow.parquet as pq
+
+from painel.dados.preparacao import preparar_base
+from painel.dados.colunar import _para_tabela_arrow
+from painel.dados.carregador import carregar_base
+from painel.filtro.filtro_relatorio_macro import _aplicar_filtros
+import painel.funcao.funcao_relatorio_macro as funcoes
+try:
+    from painel.funcao.graficos import limpar_cache_graficos
+except ImportError:
+    def limpar_cache_graficos():
+        pass
+
+
+class _StreamlitFalso:
+    \"\"\"Aceita qualquer chamada do st.* e devolve o valor padrão dos widgets.\"\"\"
+
+    def __init__(self):
+        self.session_state = {{}}
+
+    def __getattr__(self, nome):
+        return self._nada
+
+    def _nada(self, *args, **kwargs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def columns(self, spec, **kwargs):
+        return [self] * (spec if isinstance(spec, int) else len(spec))
+
+    def checkbox(self, label, value=False, **kwargs):
+        return value
+
+    def selectbox(self, label, options, index=0, **kwargs):
+        return list(options)[index]
+
+    def multiselect(self, label, options, default=None, **kwargs):
+        return list(default or [])
+
+    def number_input(self, label, min_value=None, max_value=None, value=None, **kwargs):
+        return value
+
+    def get_option(self, nome):
+        return None
+
+
+st = funcoes.st = _StreamlitFalso()
+etapas = {{}}
+
+def _medir(nome, fn):
+    t0 = time.perf_counter()
+    r = fn()
+    etapas[nome] = time.perf_counter() - t0
+    return r
+
+bruto = _medir("carga_json", lambda: pd.read_json({json_!r}))
+df = _medir("achatamento", lambda: preparar_base(bruto))
+del bruto
+pq.write_table(_para_tabela_arrow(df), {parquet!r}, compression="zstd")
+posts = len(df)
+del df
+base = _medir("carga_carregador", lambda: carregar_base({parquet!r}))
+
+datas = base["post_dia_local" if "post_dia_local" in base.columns else "post_date_resumo"].dropna()
+ini, fim = datas.min().date(), datas.max().date()
+tipos = sorted(base["post_type"].dropna().unique().tolist())
+filtros = {{
+    "filtro_todos": {{"date_start": ini, "date_end": fim, "post_types": tipos}},
+    "filtro_1_tipo": {{"date_start": ini, "date_end": fim, "post_types": tipos[:1]}},
+    "filtro_metade_periodo": {{"date_start": ini, "date_end": ini + (fim - ini) / 2, "post_types": tipos}},
+}}
+agregacoes = [
+    ("kpis_relatorio", lambda b: funcoes.kpis_relatorio(b)),
+    ("app_funcao_conceito_basico_parte01", lambda b: funcoes.app_funcao_conceito_basico_parte01(b)),
+    ("app_funcao_conceito_basico_parte02", lambda b: funcoes.app_funcao_conceito_basico_parte02(b)),
+    ("app_funcao_tipo_post", funcoes.app_funcao_tipo_post),
+    ("app_funcao_objetos", funcoes.app_funcao_objetos),
+    ("app_funcao_hashtags", funcoes.app_funcao_hashtags),
+    ("app_funcao_emocoes_legenda", funcoes.app_funcao_emocoes_legenda),
+    ("grafico_topicos_legenda", funcoes.grafico_topicos_legenda),
+    ("grafico_gatilhos_legenda", funcoes.grafico_gatilhos_legenda),
+    ("grafico_ctas_legenda", funcoes.grafico_ctas_legenda),
+    ("grafico_topicos_imagem", funcoes.grafico_topicos_imagem),
+    ("grafico_gatilhos_imagem", funcoes.grafico_gatilhos_imagem),
+    ("grafico_ctas_imagem", funcoes.grafico_ctas_imagem),
+    ("mosaico_pagina", funcoes.filtro_e_mosaico_imagens),
+]
+
+tempos = {{}}
+for _ in range({repeticoes}):
+    recortes = {{}}
+    for nome, filtro in filtros.items():
+        t0 = time.perf_counter()
+        recortes[nome] = _aplicar_filtros(base, filtro)
+        tempos.setdefault(nome, []).append(time.perf_counter() - t0)
+    # a frio: sessão nova e sem figuras em cache
+    st.session_state = {{}}
+    limpar_cache_graficos()
+    for nome, fn in agregacoes:
+        t0 = time.perf_counter()
+        fn(recortes["filtro_todos"])
+        tempos.setdefault(nome, []).append(time.perf_counter() - t0)
+etapas.update({{nome: statistics.median(t) for nome, t in tempos.items()}})
+
+with open("/proc/self/status") as f:
+    pico = next((int(l.split()[1]) / 1024 for l in f if l.startswith("VmHWM:")), None)
+print(json.dumps({{"posts": posts, "pico_mb": pico, "etapas": etapas}}))
+"""
+
+
+def _commit(raiz):
+    out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=raiz)
+    return out.stdout.strip() or None
+
+
+def _medir(raiz, caminho_json, tmp, repeticoes):
+    parquet = os.path.join(tmp, f"base_{abs(hash(raiz))}.parquet")
+    codigo = _FILHO.format(json_=caminho_json, parquet=parquet, repeticoes=repeticoes)
+    env = {**os.environ, "IA_FARM_MINIATURAS": "0"}
+    out = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True,
+                         cwd=raiz, env=env)
+    os.remove(parquet)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _imprimir(nome, tamanho, r, anterior, tolerancia):
+    print(f"\n[{nome}] {tamanho} posts gerados ({r['posts']} analisados), pico {r['pico_mb']:.0f} MB")
+    for etapa, t in r["etapas"].items():
+        linha = f"  {etapa:<36} {t * 1000:10.1f} ms"
+        antes = (anterior or {}).get(etapa)
+        if antes:
+            razao = t / antes
+            linha += f"   {razao:5.2f}x" + ("  <- regressão" if razao > tolerancia else "")
+        print(linha)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--dias", type=int, default=365, help="período das datas geradas")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--antes", help="outra cópia do repositório para comparar")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar etapa a etapa")
+    parser.add_argument("--tolerancia", type=float, default=1.2)
+    args = parser.parse_args()
+
+    arvores = {"depois": RAIZ}
+    if args.antes:
+        arvores = {"antes": os.path.abspath(args.antes), **arvores}
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+
+    resultados = {
+        "arvores": {nome: {"raiz": raiz, "commit": _commit(raiz)} for nome, raiz in arvores.items()},
+        "repeticoes": args.repeticoes,
+        "dias": args.dias,
+        "semente": args.semente,
+        "tamanhos": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for tamanho in args.tamanhos:
+            caminho = os.path.join(tmp, f"posts_{tamanho}.json")
+            gravar_posts(gerar_posts(tamanho, args.semente, dias=args.dias), caminho)
+            por_arvore = {nome: _medir(raiz, caminho, tmp, args.repeticoes) for nome, raiz in arvores.items()}
+            os.remove(caminho)
+            resultados["tamanhos"][str(tamanho)] = por_arvore
+
+            for nome, r in por_arvore.items():
+                # compara com a mesma árvore do JSON anterior (ou com a "antes" desta execução)
+                referencia = None
+                if anterior is not None:
+                    referencia = anterior["tamanhos"].get(str(tamanho), {}).get(nome, {}).get("etapas")
+                elif nome != "antes" and "antes" in por_arvore:
+                    referencia = por_arvore["antes"]["etapas"]
+                _imprimir(nome, tamanho, r, referencia, args.tolerancia)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
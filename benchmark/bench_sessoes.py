@@ -0,0 +1,116 @@
+"""
+Benchmark de memória com sessões simultâneas do relatório macro.
+
+Abre N sessões do app (AppTest) no mesmo processo, todas sobre a mesma base
+(posts reais replicados, 100k por padrão) e com o mesmo filtro de tipo de post,
+mantendo as anteriores vivas, e reporta o RSS depois de cada sessão nova. Com o
+armazém compartilhado o RSS deve ficar estável: as sessões reaproveitam a base
+e o recorte filtrado em vez de cada uma montar o seu. Se a árvore tiver, também
+reporta as estatísticas dos armazéns (acertos/faltas, bytes, referências) com as
+sessões abertas e depois de fechadas.
+
+Para comparar antes/depois, aponte --antes para outra cópia do repositório
+(ex.: git worktree add /tmp/antes <commit>); cada árvore roda num processo novo.
+
+uso: python benchmark/bench_sessoes.py [--posts 100000] [--sessoes 8] [--antes /tmp/antes]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmark.bench_memoria_rerun import _APP, _ambiente, _gerar_base
+
+_FILHO = """
+import gc, sys, json, time, warnings
+warnings.filterwarnings("ignore")
+from streamlit.testing.v1 import AppTest
+
+def _rss():
+    with open("/proc/self/status") as f:
+        for linha in f:
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1]) / 1024
+
+def _estatisticas():
+    try:
+        from painel.dados.carregador import estatisticas_cache
+    except ImportError:
+        return None
+    return estatisticas_cache()
+
+sessoes, rss = [], []
+for i in range({sessoes}):
+    at = AppTest.from_file({app!r}, default_timeout=600)
+    at.run()
+    at.multiselect[0].set_value(list(at.multiselect[0].options)[:1])
+    t0 = time.perf_counter()
+    at.run()
+    dt = time.perf_counter() - t0
+    assert not at.exception, [e.value for e in at.exception]
+    sessoes.append(at)
+    gc.collect()
+    rss.append({{"rss_mb": _rss(), "segundos": dt}})
+abertas = _estatisticas()
+sessoes.clear()
+del at
+gc.collect()
+print(json.dumps({{"sessoes": rss, "abertas": abertas, "fechadas": _estatisticas()}}))
+"""
+
+
+def _medir(raiz, caminho, tmp, sessoes):
+    app = os.path.join(tmp, f"app_{abs(hash(raiz))}.py")
+    with open(app, "w", encoding="utf-8") as f:
+        f.write(_APP.format(raiz=raiz, caminho=caminho))
+    env = _ambiente(caminho, IA_FARM_MINIATURAS="0")
+    out = subprocess.run([sys.executable, "-c", _FILHO.format(app=app, sessoes=sessoes)], capture_output=True,
+                         text=True, check=True, cwd=raiz, env=env)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _fmt_estatisticas(estatisticas):
+    return "  ".join(
+        f"{nome}: {e['acertos']} acertos / {e['faltas']} faltas, {e['itens']} itens, "
+        f"{e['bytes'] / 1e6:.0f} MB, {e['referencias']} refs"
+        for nome, e in estatisticas.items()
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--origem", default=os.path.join(RAIZ, "data", "base_farm_json_ajust.json"))
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--sessoes", type=int, default=8)
+    parser.add_argument("--antes", help="outra cópia do repositório para comparar")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = os.path.join(tmp, "base.parquet")
+        _gerar_base(args.origem, args.posts, caminho)
+        arvores = {"depois": RAIZ}
+        if args.antes:
+            arvores = {"antes": os.path.abspath(args.antes), **arvores}
+
+        resultados = {nome: _medir(raiz, caminho, tmp, args.sessoes) for nome, raiz in arvores.items()}
+
+    print(f"{args.posts} posts, {args.sessoes} sessões com o mesmo filtro")
+    for nome, r in resultados.items():
+        print(f"\n[{nome}]")
+        anterior = None
+        for i, s in enumerate(r["sessoes"], 1):
+            delta = "" if anterior is None else f"  ({s['rss_mb'] - anterior:+.0f} MB)"
+            print(f"  sessão {i:>2}: rss {s['rss_mb']:7.0f} MB  filtro {s['segundos'] * 1000:6.0f} ms{delta}")
+            anterior = s["rss_mb"]
+        if r["abertas"] is not None:
+            print(f"  sessões abertas  -> {_fmt_estatisticas(r['abertas'])}")
+            print(f"  sessões fechadas -> {_fmt_estatisticas(r['fechadas'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Gerador de posts sintéticos no esquema da exportação real (base_farm_json_ajust.json).
+
+Os valores são sorteados a partir da própria base real (o "molde"), coluna a
+coluna, então tipos, dicionários aninhados, listas, categorias com '/' e a
+proporção de nulos seguem a exportação:
+
+- linhas sem análise (post_type nulo) aparecem na mesma proporção do molde;
+- colunas de categorias com '/' são remontadas sorteando a quantidade de
+  tokens e cada token pela frequência no molde (combinações novas, mesmo
+  vocabulário);
+- post_pk e thumbnail são únicos, com a mesma taxa de repetidos do molde
+  (o mesmo post analisado duas vezes), e post_date é sorteada no período do
+  molde ou nos últimos `dias` dias até a data final dele;
+- as demais colunas (inclusive dicts e listas) são sorteadas por coluna, e as
+  que precisam ser coerentes entre si (caption e legenda bruta, contagens de
+  tokens) vêm da mesma linha do molde.
+
+Com --registros grava no formato em registros ([{...}, ...]), o da exportação
+da insider, que pode ser ingerido em lotes (painel.dados.colunar).
+
+uso: python benchmark/gerador_sintetico.py <n_posts> <saida.json> [--semente 0] [--dias 365] [--registros]
+"""
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MOLDE_PADRAO = os.path.join(RAIZ, "data", "base_farm_json_ajust.json")
+
+# colunas de categorias/tokens separados por '/'
+COLUNAS_BARRA = [
+    "legenda_hashtags", "legenda_mencoes", "legenda_emoticoins", "legenda_marcas_texto", "legenda_cta",
+    "legenda_gatilhos", "legenda_entidades", "legenda_topicos", "imagem_palavras_unicas", "imagem_objetos",
+    "imagem_categorias_alternativas", "imagem_gatilhos", "imagem_entidades", "imagem_topicos",
+    "imagem_produto_nomes_alternativos",
+]
+
+# colunas sorteadas juntas (mesma linha do molde)
+GRUPOS = [
+    ("caption", "legenda_legenda_bruta"),
+    ("legenda_tokens_prompt", "legenda_tokens_completude", "legenda_tokens_total", "legenda_content_raw_len"),
+    ("imagem_tokens_prompt", "imagem_tokens_completude", "imagem_tokens_total", "imagem_content_raw_len"),
+]
+
+_FORMATO_DATA = "%Y-%m-%dT%H:%M:%S.000Z"
+
+
+def _eh_nulo(v):
+    return v is None or (isinstance(v, float) and np.isnan(v))
+
+
+def _sortear(valores, rng, n):
+    """n valores da coluna do molde, sorteados com reposição."""
+    return valores[rng.integers(0, len(valores), n)]
+
+
+def _barra(valores, rng, n):
+    """Categorias com '/': nº de tokens e tokens sorteados pela distribuição do molde."""
+    listas = [str(v).split("/") for v in valores if not _eh_nulo(v)]
+    taxa_nulos = 1 - len(listas) / len(valores)
+    saida = np.full(n, None, dtype=object)
+    if not listas:
+        return saida
+
+    vocab, contagens = np.unique([t for tokens in listas for t in tokens], return_counts=True)
+    preenchidos = np.flatnonzero(rng.random(n) >= taxa_nulos)
+    tamanhos = _sortear(np.array([len(tokens) for tokens in listas]), rng, len(preenchidos))
+    tokens = vocab[rng.choice(len(vocab), tamanhos.sum(), p=contagens / contagens.sum())].tolist()
+    fins = np.cumsum(tamanhos).tolist()
+    inicios = [0] + fins[:-1]
+    saida[preenchidos] = ["/".join(tokens[a:b]) for a, b in zip(inicios, fins)]
+    return saida
+
+
+def _datas(valores, rng, n, dias):
+    datas = pd.to_datetime(pd.Series(valores).dropna(), format="%Y-%m-%dT%H:%M:%S.%fZ")
+    fim = datas.max()
+    inicio = datas.min() if dias is None else fim - pd.Timedelta(days=dias)
+    segundos = rng.integers(0, max(1, int((fim - inicio).total_seconds())) + 1, n)
+    return (inicio + pd.to_timedelta(segundos, unit="s")).strftime(_FORMATO_DATA).to_numpy(dtype=object)
+
+
+def _identificadores(analisados, rng, n):
+    """post_pk e thumbnail únicos, repetindo um post anterior na taxa de repetidos do molde."""
+    taxa_repetidos = analisados["post_pk"].duplicated().mean()
+    origem = np.arange(n)
+    repetidos = np.flatnonzero(rng.random(n) < taxa_repetidos)
+    repetidos = repetidos[repetidos > 0]
+    origem[repetidos] = (rng.random(len(repetidos)) * repetidos).astype(np.int64)
+    base_pk = float(analisados["post_pk"].min())
+    # a exportação grava o post_pk com 10 dígitos significativos (~1e9 nesta faixa)
+    pk = base_pk + origem.astype(np.float64) * 1e9
+    prefixo = str(analisados["thumbnail"].dropna().iloc[0]).rsplit("/", 1)[0]
+    thumbs = np.array([f"{prefixo}/sintetico-{i}.jpg" for i in origem], dtype=object)
+    return pk, thumbs
+
+
+def gerar_posts(n, semente=0, molde=MOLDE_PADRAO, dias=None):
+    """DataFrame bruto com n posts sintéticos (colunas do molde; valores como objetos Python)."""
+    rng = np.random.default_rng(semente)
+    bruto = pd.read_json(molde)
+    vazias = bruto["post_type"].isna().to_numpy()
+    analisados = bruto[~vazias].reset_index(drop=True)
+    sem_analise = bruto[vazias].reset_index(drop=True)
+
+    eh_vazia = rng.random(n) < vazias.mean()
+    linhas = np.flatnonzero(~eh_vazia)
+    m = len(linhas)
+
+    gerado = {}
+    for grupo in GRUPOS:
+        origem = rng.integers(0, len(analisados), m)
+        for col in grupo:
+            if col in analisados.columns:
+                gerado[col] = analisados[col].to_numpy(dtype=object)[origem]
+    for col in COLUNAS_BARRA:
+        if col in analisados.columns:
+            gerado[col] = _barra(analisados[col].tolist(), rng, m)
+    gerado["post_pk"], gerado["thumbnail"] = _identificadores(analisados, rng, m)
+    gerado["post_date"] = _datas(analisados["post_date"].tolist(), rng, m, dias)
+
+    colunas = {}
+    for col in bruto.columns:
+        valores = np.empty(n, dtype=object)
+        if col in gerado:
+            valores[linhas] = gerado[col]
+        else:
+            valores[linhas] = _sortear(analisados[col].to_numpy(dtype=object), rng, m)
+        if len(sem_analise):
+            valores[eh_vazia] = _sortear(sem_analise[col].to_numpy(dtype=object), rng, int(eh_vazia.sum()))
+        colunas[col] = valores
+    return pd.DataFrame(colunas)
+
+
+def gravar_posts(df, destino, registros=False):
+    """Grava no layout da exportação real (JSON colunar, índice em string) ou em registros."""
+    df.to_json(destino, orient="records" if registros else "columns", force_ascii=False)
+    return destino
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("n_posts", type=int)
+    parser.add_argument("saida")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--dias", type=int, help="período das datas (padrão: o do molde)")
+    parser.add_argument("--molde", default=MOLDE_PADRAO)
+    parser.add_argument("--registros", action="store_true", help="JSON em registros em vez de colunar")
+    args = parser.parse_args()
+
+    gravar_posts(gerar_posts(args.n_posts, args.semente, args.molde, args.dias), args.saida, args.registros)
+    print(f"{args.n_posts} posts -> {args.saida} ({os.path.getsize(args.saida) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
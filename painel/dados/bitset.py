@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+from painel.dados.esquema import CONTEXT_FARM_COLS
+
+
+def _series_to_bool(s: pd.Series) -> pd.Series:
+    """Converte uma série (bool, numérica, string) para booleano."""
+    if s.dtype == bool:
+        return s.fillna(False)
+    s_str = s.astype(str).str.strip().str.lower()
+    num = pd.to_numeric(s_str, errors="coerce")
+    mask_num = num.fillna(0) > 0
+    truthy = {"true", "1", "sim", "yes", "y", "verdadeiro"}
+    mask_str = s_str.isin(truthy)
+    return (mask_num | mask_str).fillna(False)
+
+
+class BitsetContexto:
+    """
+    Flags de contexto empacotadas em um uint32 por post (bit i = colunas[i]).
+    O AND entre flags selecionadas vira (bits & mascara) == mascara, e as
+    contagens por flag saem de um único unpackbits sobre a seleção.
+    """
+
+    __slots__ = ("colunas", "bits", "_posicao")
+
+    def __init__(self, colunas, bits):
+        if len(colunas) > 32:
+            raise ValueError("BitsetContexto suporta no máximo 32 flags.")
+        self.colunas = list(colunas)
+        self.bits = bits
+        self._posicao = {c: i for i, c in enumerate(self.colunas)}
+
+    @classmethod
+    def de_base(cls, df, colunas=CONTEXT_FARM_COLS):
+        """Empacota as flags presentes em df (colunas ausentes ficam sempre 0)."""
+        bits = np.zeros(len(df), dtype=np.uint32)
+        for i, col in enumerate(colunas):
+            if col in df.columns:
+                bits |= _series_to_bool(df[col]).to_numpy(dtype=bool).astype(np.uint32) << np.uint32(i)
+        return cls(colunas, bits)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def atualizar(self, manter, novos):
+        """Bitset depois de uma ingestão incremental: linhas `manter` + posts novos ao final."""
+        return BitsetContexto(
+            self.colunas,
+            np.concatenate([self.bits[np.asarray(manter, dtype=np.int64)], BitsetContexto.de_base(novos, self.colunas).bits]),
+        )
+
+    def mascara(self, selecionadas):
+        m = 0
+        for col in selecionadas:
+            m |= 1 << self._posicao[col]
+        return np.uint32(m)
+
+    def _bits(self, linhas):
+        return self.bits if linhas is None else self.bits[np.asarray(linhas, dtype=np.int64)]
+
+    def filtrar(self, linhas, selecionadas):
+        """Máscara booleana (alinhada a linhas) dos posts com TODAS as flags selecionadas."""
+        bits = self._bits(linhas)
+        m = self.mascara(selecionadas)
+        return (bits & m) == m
+
+    def contagens(self, linhas=None, selecionadas=()):
+        """
+        Para cada flag, quantos posts de linhas atendem à seleção atual e têm a
+        flag (para as já selecionadas, é o total filtrado).
+        """
+        bits = self._bits(linhas)
+        if selecionadas:
+            m = self.mascara(selecionadas)
+            bits = bits[(bits & m) == m]
+        por_bit = np.unpackbits(
+            bits.astype("<u4").view(np.uint8).reshape(-1, 4), axis=1, bitorder="little"
+        ).sum(axis=0, dtype=np.int64)
+        return {c: int(por_bit[i]) for i, c in enumerate(self.colunas)}
@@ -0,0 +1,324 @@
+import os
+import hashlib
+import threading
+
+import pandas as pd
+
+from painel.dados.preparacao import preparar_base
+from painel.dados.colunar import eh_json_registros, ler_json_em_lotes, ler_parquet
+from painel.dados.tokens import tokenizar_base, atualizar_tokens
+from painel.dados.incremental import (
+    ARQUIVO_MANIFESTO,
+    eh_base_incremental,
+    ler_manifesto,
+    ler_partes,
+)
+from painel.dados.bitset import BitsetContexto
+from painel.dados.cubo import CuboDiario
+from painel.dados.datas import IndiceDatas
+from painel.dados.kpis import IndicadoresPost
+from painel.dados.compartilhado import ArmazemCompartilhado
+from painel.dados.tipos import concatenar, unificar_tipos
+from painel.instrumentacao import instrumentado
+
+# Caminho padrão da base de posts utilizada pelo relatório macro
+CAMINHO_BASE_PADRAO = "data/base_farm_json.json"
+
+# Quantidade máxima de bases mantidas em memória pelo processo
+MAX_BASES_EM_CACHE = int(os.environ.get("IA_FARM_MAX_BASES_CACHE", "4"))
+
+# Limite opcional da memória (estimada) das bases em cache, em bytes; 0 = só o limite por quantidade
+MAX_BYTES_BASES_EM_CACHE = int(os.environ.get("IA_FARM_MAX_BYTES_CACHE", "0"))
+
+# Recortes filtrados compartilhados entre sessões (mesma base + mesmo filtro)
+MAX_RECORTES_EM_CACHE = int(os.environ.get("IA_FARM_MAX_RECORTES_CACHE", "32"))
+MAX_BYTES_RECORTES_EM_CACHE = int(os.environ.get("IA_FARM_MAX_BYTES_RECORTES", "0"))
+
+# bases do processo, compartilhadas entre sessões:
+# (caminho absoluto, colunas, adaptador) -> {"assinatura", "hash", "bytes", "df", "tokens", "contexto", "indicadores", "cubo", "datas"}
+_BASES = ArmazemCompartilhado("bases", MAX_BASES_EM_CACHE, MAX_BYTES_BASES_EM_CACHE)
+# ((chave da base, hash), chave do filtro) -> recorte
+_RECORTES = ArmazemCompartilhado("recortes", MAX_RECORTES_EM_CACHE, MAX_BYTES_RECORTES_EM_CACHE)
+# serializa as cargas: sessões abrindo a mesma base ao mesmo tempo não a leem em dobro
+_LOCK_CACHE = threading.Lock()
+
+
+def _arquivo_referencia(caminho):
+    """Arquivo que identifica a versão da base (o manifesto, nas bases incrementais)."""
+    return os.path.join(caminho, ARQUIVO_MANIFESTO) if os.path.isdir(caminho) else caminho
+
+
+def _assinatura_arquivo(caminho):
+    """Assinatura barata do arquivo (mtime em ns + tamanho)."""
+    st_ = os.stat(_arquivo_referencia(caminho))
+    return (st_.st_mtime_ns, st_.st_size)
+
+
+def _hash_conteudo(caminho, bloco=1 << 20):
+    """Hash SHA-256 do conteúdo do arquivo (lido em blocos)."""
+    h = hashlib.sha256()
+    with open(_arquivo_referencia(caminho), "rb") as f:
+        for parte in iter(lambda: f.read(bloco), b""):
+            h.update(parte)
+    return h.hexdigest()
+
+
+def _ler_base(caminho, colunas=None, adaptador=None):
+    """Lê a base do disco: Parquet já achatado ou JSON bruto exportado."""
+    if caminho.endswith(".parquet"):
+        return ler_parquet(caminho, colunas).reset_index(drop=True)
+    if eh_json_registros(caminho):
+        # em registros: lido e preparado em lotes, sem o DataFrame bruto inteiro na memória
+        df = concatenar(list(ler_json_em_lotes(caminho, adaptador=adaptador)))
+    else:
+        df = preparar_base(pd.read_json(caminho), adaptador)
+    if colunas is not None:
+        df = df[[c for c in colunas if c in df.columns]]
+    return df
+
+
+def _nova_entrada(chave, df, assinatura, hash_, **extra):
+    # identifica a base de origem nos recortes (attrs é propagado pelo pandas)
+    df.attrs["ia_farm_base"] = (chave, hash_)
+    tokens = tokenizar_base(df)
+    indicadores = IndicadoresPost.de_base(df)
+    return {
+        "assinatura": assinatura,
+        "hash": hash_,
+        "df": df,
+        "tokens": tokens,
+        "contexto": BitsetContexto.de_base(df),
+        "indicadores": indicadores,
+        "cubo": _montar_cubo(df, tokens, indicadores),
+        "datas": _montar_indice_datas(df),
+        **extra,
+    }
+
+
+def _montar_cubo(df, tokens, indicadores):
+    # o cubo precisa das colunas de data e tipo (ausentes em cargas com projeção)
+    if "post_date_resumo" not in df.columns or "post_type" not in df.columns:
+        return None
+    return CuboDiario.de_base(df, tokens, indicadores)
+
+
+def _montar_indice_datas(df):
+    if "post_date_resumo" not in df.columns and "post_dia_local" not in df.columns:
+        return None
+    return IndiceDatas.de_base(df)
+
+
+def _bytes_entrada(entrada):
+    """Memória estimada da entrada: DataFrame (com os objetos Python) + estruturas pré-calculadas."""
+    total = int(entrada["df"].memory_usage(deep=True).sum())
+    total += sum(t.nbytes for t in entrada["tokens"].values())
+    for nome in ("contexto", "indicadores", "cubo", "datas"):
+        if entrada.get(nome) is not None:
+            total += entrada[nome].nbytes
+    return total
+
+
+def _guardar(chave, entrada):
+    entrada["bytes"] = _bytes_entrada(entrada)
+    return _BASES.guardar(chave, entrada, entrada["bytes"])
+
+
+def _atualizar_incremental(entrada, chave, caminho, colunas, assinatura, hash_):
+    """
+    Aplica à entrada em memória só as partes novas de uma base incremental:
+    lê o delta, descarta as versões superadas e tokeniza apenas os posts novos.
+    Retorna None quando não dá para atualizar (ex.: base compactada).
+    """
+    manifesto = ler_manifesto(caminho)
+    lidas = entrada.get("partes")
+    if lidas is None or manifesto["partes"][:len(lidas)] != lidas:
+        return None
+
+    delta = ler_partes(caminho, manifesto["partes"][len(lidas):], colunas, manifesto)
+    df = entrada["df"]
+    id_ = manifesto["chave"]
+    manter = ~df[id_].isin(delta[id_]).to_numpy()
+    posicoes = manter.nonzero()[0]
+
+    # o plano de tipos é refeito sobre as linhas vivas, como numa carga do zero
+    novo_df = concatenar(unificar_tipos([df[manter], delta]))
+    novo_df.attrs["ia_farm_base"] = (chave, hash_)
+    tokens = atualizar_tokens(entrada["tokens"], posicoes, delta)
+    indicadores = entrada["indicadores"].atualizar(posicoes, delta)
+    if indicadores is None:
+        indicadores = IndicadoresPost.de_base(novo_df)
+    return {
+        "assinatura": assinatura,
+        "hash": hash_,
+        "df": novo_df,
+        "tokens": tokens,
+        "contexto": entrada["contexto"].atualizar(posicoes, delta),
+        "indicadores": indicadores,
+        # o rollup é barato (dias x tipos): remonta a partir dos tokens já atualizados
+        "cubo": _montar_cubo(novo_df, tokens, indicadores),
+        # reordenar é O(n log n) sobre um array de int32: mais simples que intercalar o delta
+        "datas": _montar_indice_datas(novo_df),
+        "partes": manifesto["partes"],
+    }
+
+
+@instrumentado("carga_base")
+def carregar_base(caminho=CAMINHO_BASE_PADRAO, colunas=None, adaptador=None):
+    """
+    Retorna a base já achatada, reaproveitando o resultado entre reruns.
+
+    Aceita o JSON exportado, o Parquet gerado por painel.dados.colunar ou um
+    diretório de base incremental (painel.dados.incremental); no Parquet só as
+    colunas pedidas são materializadas. Numa base incremental, uma ingestão
+    nova só lê e tokeniza as partes acrescentadas. O cache é por processo e
+    indexado pelo caminho do arquivo (e pelas colunas pedidas). A validade é
+    conferida pelo mtime/tamanho; se eles mudarem mas o hash do conteúdo for o
+    mesmo, a base em memória continua valendo. O DataFrame devolvido é
+    compartilhado entre sessões e não deve ser alterado no lugar. O cache
+    guarda até IA_FARM_MAX_BASES_CACHE bases (e, se definido, até
+    IA_FARM_MAX_BYTES_CACHE bytes estimados); as bases que alguma sessão está
+    usando (referenciar_base) não são despejadas.
+
+    `adaptador` traduz o JSON bruto de uma marca com outro esquema para o da
+    farm antes da preparação (ver painel.dados.marcas); Parquet e base
+    incremental já são gravados no esquema da farm e não passam por ele.
+
+    Na carga as colunas de lista/categoria são tokenizadas uma única vez
+    (ver painel.dados.tokens), as flags de contexto FARM são empacotadas em
+    bitset (painel.dados.bitset), os indicadores dos KPIs são pré-calculados
+    (painel.dados.kpis), é montado o cubo diário (painel.dados.cubo) e os
+    posts são ordenados por dia local (painel.dados.datas); os recortes da
+    base os acessam por obter_tokens / obter_contexto / obter_indicadores /
+    obter_cubo / obter_indice_datas.
+    """
+    caminho = os.path.abspath(caminho)
+    chave = (caminho, tuple(colunas) if colunas is not None else None, adaptador)
+    assinatura = _assinatura_arquivo(caminho)
+
+    with _LOCK_CACHE:
+        entrada = _BASES.espiar(chave)
+
+        if entrada is not None and entrada["assinatura"] != assinatura:
+            # arquivo "tocado": só relê se o conteúdo realmente mudou
+            hash_ = _hash_conteudo(caminho)
+            if hash_ == entrada["hash"]:
+                entrada["assinatura"] = assinatura
+            else:
+                anterior = entrada
+                entrada = None
+                # libera a versão antiga antes de ler a nova (sessões que a usam ficam com a sua cópia)
+                _BASES.remover(lambda k: k == chave)
+                if eh_base_incremental(caminho):
+                    entrada = _atualizar_incremental(anterior, chave, caminho, colunas, assinatura, hash_)
+                if entrada is not None:
+                    return _guardar(chave, entrada)["df"]
+
+        if entrada is None:
+            # hash antes da leitura: se a base mudar no meio, o próximo rerun percebe
+            hash_ = _hash_conteudo(caminho)
+            if eh_base_incremental(caminho):
+                manifesto = ler_manifesto(caminho)
+                df = ler_partes(caminho, colunas=colunas, manifesto=manifesto)
+                entrada = _nova_entrada(chave, df, assinatura, hash_, partes=manifesto["partes"])
+            else:
+                entrada = _nova_entrada(chave, _ler_base(caminho, colunas, adaptador), assinatura, hash_)
+            # guarda e descarta as bases usadas há mais tempo (as em uso por sessões ficam)
+            return _guardar(chave, entrada)["df"]
+
+        _BASES.usar(chave)
+        return entrada["df"]
+
+
+def invalidar_cache(caminho=None):
+    """Remove uma base do cache (ou todas, se caminho for None), com os recortes dela."""
+    if caminho is None:
+        _BASES.remover()
+        _RECORTES.remover()
+        return
+    caminho = os.path.abspath(caminho)
+    _BASES.remover(lambda k: k[0] == caminho)
+    _RECORTES.remover(lambda k: k[0][0][0] == caminho)
+
+
+def estatisticas_cache():
+    """Estatísticas dos armazéns compartilhados: {"bases": {...}, "recortes": {...}} (ver ArmazemCompartilhado)."""
+    return {"bases": _BASES.estatisticas(), "recortes": _RECORTES.estatisticas()}
+
+
+def referenciar_base(df):
+    """
+    Referência que mantém a base de origem de df no cache enquanto existir
+    (guarde na sessão); None se df não veio do carregador.
+    """
+    origem = df.attrs.get("ia_farm_base") if hasattr(df, "attrs") else None
+    return None if origem is None else _BASES.referenciar(origem[0])
+
+
+def recorte_compartilhado(df, chave_filtro, recortar):
+    """
+    Recorte de df para o filtro, compartilhado entre as sessões que pedem o
+    mesmo filtro sobre a mesma base; recortar() só roda na falta. O recorte
+    devolvido é só leitura. Sem base de origem, só chama recortar().
+    """
+    origem = df.attrs.get("ia_farm_base")
+    if origem is None:
+        return recortar()
+
+    def _medir(recorte):
+        # sem filtro efetivo o recorte é uma visão rasa da base e não ocupa memória própria
+        return 0 if len(recorte) == len(df) else int(recorte.memory_usage().sum())
+
+    return _RECORTES.obter((origem, chave_filtro), recortar, _medir)
+
+
+def referenciar_recorte(df, chave_filtro):
+    """Referência que mantém o recorte compartilhado de df para o filtro no cache; None sem base de origem."""
+    origem = df.attrs.get("ia_farm_base")
+    return None if origem is None else _RECORTES.referenciar((origem, chave_filtro))
+
+
+def _entrada_da_base(df):
+    """Entrada do cache de onde o DataFrame (ou um recorte dele) saiu; None se não houver."""
+    origem = df.attrs.get("ia_farm_base") if hasattr(df, "attrs") else None
+    if origem is None:
+        return None
+    chave, hash_ = origem
+    entrada = _BASES.espiar(chave)
+    if entrada is None or entrada["hash"] != hash_:
+        return None
+    return entrada
+
+
+def obter_tokens(df, col):
+    """
+    Coluna tokenizada (ColunaTokens) da base de origem de df, ou None se df não
+    veio do carregador. As linhas de df são as posições df.index na base.
+    """
+    entrada = _entrada_da_base(df)
+    if entrada is None:
+        return None
+    return entrada["tokens"].get(col)
+
+
+def obter_contexto(df):
+    """Bitset das flags de contexto da base de origem de df, ou None."""
+    entrada = _entrada_da_base(df)
+    return None if entrada is None else entrada["contexto"]
+
+
+def obter_indicadores(df):
+    """Indicadores dos KPIs (IndicadoresPost) da base de origem de df, ou None."""
+    entrada = _entrada_da_base(df)
+    return None if entrada is None else entrada.get("indicadores")
+
+
+def obter_cubo(df):
+    """Cubo diário (CuboDiario) da base de origem de df, ou None."""
+    entrada = _entrada_da_base(df)
+    return None if entrada is None else entrada.get("cubo")
+
+
+def obter_indice_datas(df):
+    """Índice por dia local (IndiceDatas) da base de origem de df, ou None."""
+    entrada = _entrada_da_base(df)
+    return None if entrada is None else entrada.get("datas")
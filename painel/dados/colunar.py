@@ -0,0 +1,341 @@
+import io
+import os
+import sys
+import json
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from painel.dados.preparacao import preparar_base
+from painel.dados.tipos import COLUNAS_FIXAS, ResumoTipos, compactar_tipos
+
+# chave de metadado (schema parquet) com as colunas gravadas como texto JSON
+_META_COLUNAS_JSON = b"ia_farm:colunas_json"
+# e com o dtype pandas de cada coluna: o Arrow não devolve UInt8 com nulos,
+# datetime64[s] nem object vazio como foram gravados
+_META_TIPOS_PANDAS = b"ia_farm:tipos_pandas"
+
+# registros por lote na ingestão em lotes (a memória de pico acompanha este número)
+TAMANHO_LOTE = int(os.environ.get("IA_FARM_TAMANHO_LOTE", "5000"))
+
+
+def _eh_nulo(v):
+    return v is None or (isinstance(v, float) and pd.isna(v))
+
+
+def _tipo_coluna_objeto(valores):
+    """Classifica uma coluna object: 'str', 'lista_str' ou 'json' (misto)."""
+    nao_nulos = [v for v in valores if not _eh_nulo(v)]
+    if all(isinstance(v, str) for v in nao_nulos):
+        return "str"
+    if all(
+        isinstance(v, list) and all(isinstance(x, str) for x in v if x is not None)
+        for v in nao_nulos
+    ):
+        return "lista_str"
+    return "json"
+
+
+def _para_tabela_arrow(df):
+    """Converte a base achatada em uma tabela Arrow tipada."""
+    arrays, nomes, colunas_json = [], [], []
+    for col in df.columns:
+        s = df[col]
+        if s.dtype == object:
+            valores = s.tolist()
+            tipo = _tipo_coluna_objeto(valores)
+            if tipo == "str":
+                arr = pa.array([None if _eh_nulo(v) else v for v in valores], type=pa.string())
+            elif tipo == "lista_str":
+                arr = pa.array([None if _eh_nulo(v) else v for v in valores], type=pa.list_(pa.string()))
+            else:
+                arr = pa.array(
+                    [None if _eh_nulo(v) else json.dumps(v, ensure_ascii=False) for v in valores],
+                    type=pa.string(),
+                )
+                colunas_json.append(col)
+        else:
+            arr = pa.Array.from_pandas(s)
+        arrays.append(arr)
+        nomes.append(col)
+
+    tabela = pa.Table.from_arrays(arrays, names=nomes)
+    meta = dict(tabela.schema.metadata or {})
+    meta[_META_COLUNAS_JSON] = json.dumps(colunas_json).encode()
+    meta[_META_TIPOS_PANDAS] = json.dumps({c: str(df[c].dtype) for c in nomes}).encode()
+    return tabela.replace_schema_metadata(meta)
+
+
+def converter_json_para_parquet(origem, destino, tamanho_row_group=64_000, adaptador=None):
+    """
+    Etapa offline: lê o JSON exportado (colunar com índice em string ou em
+    registros), achata e grava um Parquet tipado pronto para leitura. Para a
+    exportação de outra marca, passe o adaptador dela (painel.dados.marcas).
+    """
+    df = preparar_base(pd.read_json(origem), adaptador)
+    tabela = _para_tabela_arrow(df.reset_index(drop=True))
+    pq.write_table(tabela, destino, row_group_size=tamanho_row_group, compression="zstd")
+    return destino
+
+
+# ----------------- ingestão em lotes (JSON em registros) -----------------
+def eh_json_registros(caminho):
+    """True se o JSON é uma lista de registros ([{...}, ...]), o formato que pode ser lido em lotes."""
+    with open(caminho, encoding="utf-8") as f:
+        while True:
+            c = f.read(1)
+            if not c or not c.isspace():
+                return c == "["
+
+
+def ler_registros_json(caminho, tamanho_lote=TAMANHO_LOTE, tamanho_bloco=1 << 20):
+    """
+    Lê um JSON em registros aos poucos e devolve o texto de cada lote de até
+    `tamanho_lote` registros (uma lista JSON válida). Só um bloco do arquivo e
+    o lote atual ficam em memória; raw_decode só serve para achar onde cada
+    registro termina.
+    """
+    decodificador = json.JSONDecoder()
+    with open(caminho, encoding="utf-8") as f:
+        buf, pos, fim_arquivo = "", 0, False
+        lote = []
+
+        def _completar():
+            nonlocal buf, pos, fim_arquivo
+            bloco = f.read(tamanho_bloco)
+            fim_arquivo = not bloco
+            buf, pos = buf[pos:] + bloco, 0
+
+        _completar()
+        pos = len(buf) - len(buf.lstrip())
+        if buf[pos:pos + 1] != "[":
+            raise ValueError(f"{caminho} não é um JSON em registros (lista de objetos).")
+        pos += 1
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ","):
+                pos += 1
+            if pos == len(buf):
+                if fim_arquivo:
+                    raise ValueError(f"{caminho}: JSON truncado (falta o ']' final).")
+                _completar()
+                continue
+            if buf[pos] == "]":
+                break
+            try:
+                _, fim = decodificador.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # registro cortado no fim do bloco: lê mais e tenta de novo
+                if fim_arquivo:
+                    raise
+                _completar()
+                continue
+            lote.append(buf[pos:fim])
+            pos = fim
+            if len(lote) == tamanho_lote:
+                yield "[" + ",".join(lote) + "]"
+                lote = []
+        if lote:
+            yield "[" + ",".join(lote) + "]"
+
+
+def resumir_json_em_lotes(caminho, tamanho_lote=TAMANHO_LOTE, adaptador=None):
+    """
+    1ª passada da leitura em lotes: ResumoTipos da base inteira (colunas e o
+    plano de tipos), sem guardar os lotes.
+    """
+    resumo, brutas = ResumoTipos(), {}
+    for texto in ler_registros_json(caminho, tamanho_lote):
+        bruto = pd.read_json(io.StringIO(texto))
+        brutas.update(dict.fromkeys(bruto.columns))
+        resumo.atualizar(preparar_base(bruto, adaptador, compactar=False))
+    # mesma ordem de colunas da leitura de uma vez: a das chaves na 1ª aparição,
+    # passada pela preparação (que põe as colunas achatadas no fim)
+    resumo.reordenar(preparar_base(pd.DataFrame(columns=list(brutas)), adaptador, compactar=False).columns)
+    return resumo
+
+
+def ler_json_em_lotes(caminho, tamanho_lote=TAMANHO_LOTE, adaptador=None, resumo=None):
+    """
+    Base preparada (preparar_base) lote a lote a partir de um JSON em
+    registros. Cada lote passa pelo pd.read_json, com as mesmas conversões
+    da leitura do arquivo inteiro. O plano de tipos vem do resumo da base
+    inteira (uma passada a mais se não for dado), então todo lote sai com as
+    mesmas colunas e os mesmos tipos, qualquer que seja o tamanho do lote.
+    """
+    if resumo is None:
+        resumo = resumir_json_em_lotes(caminho, tamanho_lote, adaptador)
+    colunas, plano = resumo.colunas, resumo.plano()
+    for texto in ler_registros_json(caminho, tamanho_lote):
+        df = preparar_base(pd.read_json(io.StringIO(texto)), adaptador, compactar=False)
+        yield compactar_tipos(df.reindex(columns=colunas), plano)
+
+
+def _tipo_unificado(tipos, chave=False):
+    """
+    Tipo Arrow comum de uma coluna entre os lotes: o mesmo tipo quando todos
+    concordam; texto/dicionário, números e datas promovidos; qualquer outra
+    mistura (texto, listas e JSON) vira "json". Uma chave (`chave`) com
+    inteiros e float fica int64 com nulos, nunca float64; nas outras colunas
+    o plano de tipos já deixa os lotes com o mesmo tipo.
+    """
+    tipos = [t for t in tipos if not pa.types.is_null(t)]
+    if not tipos:
+        return pa.null()
+    if all(t == tipos[0] for t in tipos):
+        return tipos[0]
+    if all(pa.types.is_dictionary(t) for t in tipos):
+        return pa.dictionary(pa.int32(), pa.large_string())
+    if all(pa.types.is_string(t) or pa.types.is_large_string(t) or pa.types.is_dictionary(t) for t in tipos):
+        return pa.large_string()
+    if all(pa.types.is_integer(t) or pa.types.is_boolean(t) for t in tipos):
+        tipo = np.result_type(*[t.to_pandas_dtype() for t in tipos])
+        # uint64 com int64 o numpy promove para float64
+        return pa.int64() if tipo.kind == "f" else pa.from_numpy_dtype(tipo)
+    if all(pa.types.is_integer(t) or pa.types.is_floating(t) or pa.types.is_boolean(t) for t in tipos):
+        if chave:
+            return pa.int64()
+        return pa.from_numpy_dtype(np.result_type(*[t.to_pandas_dtype() for t in tipos]))
+    if all(pa.types.is_timestamp(t) for t in tipos):
+        return pa.timestamp("ns")
+    return "json"
+
+
+def _texto_json(arr, ja_json):
+    """Coluna de um lote como texto JSON (as que o lote já gravou assim ficam como estão)."""
+    if ja_json:
+        return arr.cast(pa.string())
+    return pa.array([None if v is None else json.dumps(v, ensure_ascii=False, default=str) for v in arr.to_pylist()],
+                    type=pa.string())
+
+
+def converter_json_em_lotes(origem, destino, tamanho_lote=TAMANHO_LOTE, tamanho_row_group=64_000, adaptador=None):
+    """
+    Mesma conversão de converter_json_para_parquet para exportações grandes
+    em registros, com memória limitada pelo tamanho do lote: uma passada monta
+    o plano de tipos da base inteira; na outra cada lote é lido, preparado
+    (achatado e compactado pelo plano) e gravado numa parte temporária. No fim
+    os tipos das partes são unificados e elas são regravadas, uma por vez, num
+    único Parquet.
+    """
+    pasta = tempfile.mkdtemp(prefix=".lotes-", dir=os.path.dirname(os.path.abspath(destino)))
+    try:
+        partes, tipos, colunas_json, tipos_pandas, com_valores = [], {}, set(), {}, set()
+        for i, df in enumerate(ler_json_em_lotes(origem, tamanho_lote, adaptador)):
+            tabela = _para_tabela_arrow(df)
+            # pelo plano, os lotes já concordam nos dtypes (salvo colunas só com nulos
+            # num lote): vale o do primeiro lote com valores, senão o do primeiro lote
+            for col in df.columns:
+                if col not in com_valores and df[col].notna().any():
+                    tipos_pandas[col] = str(df[col].dtype)
+                    com_valores.add(col)
+                else:
+                    tipos_pandas.setdefault(col, str(df[col].dtype))
+            del df
+            parte = os.path.join(pasta, f"{i:06d}.parquet")
+            pq.write_table(tabela, parte)
+            json_da_parte = set(json.loads(tabela.schema.metadata[_META_COLUNAS_JSON]))
+            partes.append((parte, json_da_parte))
+            colunas_json |= json_da_parte
+            for campo in tabela.schema:
+                tipos.setdefault(campo.name, []).append(campo.type)
+            del tabela
+
+        finais = {}
+        for col, tipos_col in tipos.items():
+            tipo = "json" if col in colunas_json else _tipo_unificado(tipos_col, col in COLUNAS_FIXAS)
+            if tipo == "json":
+                colunas_json.add(col)
+                tipo = pa.string()
+            finais[col] = tipo
+        esquema = pa.schema(list(finais.items()), metadata={
+            _META_COLUNAS_JSON: json.dumps([c for c in finais if c in colunas_json]).encode(),
+            _META_TIPOS_PANDAS: json.dumps(tipos_pandas).encode(),
+        })
+
+        with pq.ParquetWriter(destino, esquema, compression="zstd") as escritor:
+            for parte, json_da_parte in partes:
+                tabela = pq.read_table(parte)
+                arrays = []
+                for col, tipo in finais.items():
+                    if col not in tabela.column_names:
+                        arrays.append(pa.nulls(len(tabela), tipo))
+                    elif col in colunas_json:
+                        arrays.append(_texto_json(tabela.column(col).combine_chunks(), col in json_da_parte))
+                    else:
+                        arrays.append(tabela.column(col).combine_chunks().cast(tipo))
+                escritor.write_table(pa.Table.from_arrays(arrays, schema=esquema), row_group_size=tamanho_row_group)
+                os.remove(parte)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    return destino
+
+
+def _coluna_para_pandas(tabela, col, colunas_json, tipo=None):
+    """Materializa uma coluna Arrow mantendo listas/dicts como objetos Python (no dtype gravado, se houver)."""
+    arr = tabela.column(col)
+    if col in colunas_json:
+        return pd.Series(
+            [None if v is None else json.loads(v) for v in arr.to_pylist()],
+            name=col, dtype=object,
+        )
+    if pa.types.is_list(arr.type):
+        return pd.Series(arr.to_pylist(), name=col, dtype=object)
+    s = arr.to_pandas().rename(col)
+    if tipo is not None and tipo != "category" and str(s.dtype) != tipo:
+        s = s.astype(tipo)
+    return s
+
+
+def tabela_para_pandas(tabela, colunas_json=(), tipos_pandas=None):
+    """
+    Converte uma tabela Arrow lida da base em DataFrame (listas/dicts como
+    objetos Python). Com `tipos_pandas` (metadado do arquivo), cada coluna
+    volta ao dtype com que foi gravada.
+    """
+    colunas_json, tipos_pandas = set(colunas_json), tipos_pandas or {}
+    return pd.concat(
+        [_coluna_para_pandas(tabela, c, colunas_json, tipos_pandas.get(c)) for c in tabela.column_names],
+        axis=1,
+    )
+
+
+def colunas_json_do_arquivo(caminho):
+    """Colunas gravadas como texto JSON (metadado do schema Parquet)."""
+    meta = pq.read_schema(caminho, memory_map=True).metadata or {}
+    return json.loads(meta.get(_META_COLUNAS_JSON, b"[]"))
+
+
+def ler_parquet(caminho, colunas=None):
+    """
+    Lê a base Parquet com memory-map, materializando só as colunas pedidas
+    (todas se colunas for None).
+    """
+    arquivo = pq.ParquetFile(caminho, memory_map=True)
+    meta = arquivo.schema_arrow.metadata or {}
+    colunas_json = json.loads(meta.get(_META_COLUNAS_JSON, b"[]"))
+    tipos_pandas = json.loads(meta.get(_META_TIPOS_PANDAS, b"{}"))
+
+    if colunas is not None:
+        existentes = set(arquivo.schema_arrow.names)
+        colunas = [c for c in colunas if c in existentes]
+
+    tabela = arquivo.read(columns=colunas)
+    return tabela_para_pandas(tabela, colunas_json, tipos_pandas)
+
+
+if __name__ == "__main__":
+    # uso: python -m painel.dados.colunar origem.json destino.parquet
+    #      (JSON em registros é convertido em lotes de IA_FARM_TAMANHO_LOTE)
+    if len(sys.argv) != 3:
+        print("uso: python -m painel.dados.colunar <origem.json> <destino.parquet>")
+        sys.exit(1)
+    origem, destino = sys.argv[1], sys.argv[2]
+    if eh_json_registros(origem):
+        converter_json_em_lotes(origem, destino)
+    else:
+        converter_json_para_parquet(origem, destino)
+    print(f"{origem} -> {destino} ({os.path.getsize(destino) / 1e6:.1f} MB)")
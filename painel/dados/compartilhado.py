@@ -0,0 +1,144 @@
+import threading
+import weakref
+from collections import Counter, OrderedDict, deque
+
+# Armazém do processo para objetos só leitura compartilhados entre sessões
+# (bases carregadas, recortes filtrados): N analistas olhando a mesma marca e o
+# mesmo filtro usam um único DataFrame. É um LRU limitado por quantidade de
+# itens e, opcionalmente, por bytes estimados; itens com referências vivas
+# (sessões usando) não são despejados, pois a memória deles não seria liberada
+# e a próxima sessão criaria uma 2ª cópia.
+
+
+class Referencia:
+    """
+    Marca um item do armazém como em uso enquanto o objeto existir (guarde-o em
+    st.session_state). A referência é devolvida em liberar() ou quando o objeto
+    é coletado, ex.: no fim da sessão.
+    """
+
+    __slots__ = ("chave", "_finalizador", "__weakref__")
+
+    def __init__(self, armazem, chave):
+        self.chave = chave
+        armazem._incrementar(chave)
+        self._finalizador = weakref.finalize(self, armazem._liberacoes.append, chave)
+
+    def liberar(self):
+        self._finalizador()
+
+
+class ArmazemCompartilhado:
+    """LRU do processo com contagem de referências, limite de itens/bytes e estatísticas."""
+
+    def __init__(self, nome, max_itens, max_bytes=0):
+        self.nome = nome
+        self.max_itens = max(1, max_itens)
+        self.max_bytes = max_bytes  # 0 = sem limite por bytes
+        self._itens = OrderedDict()  # chave -> (valor, bytes)
+        self._referencias = Counter()
+        self._bytes = 0
+        self._estatisticas = {"acertos": 0, "faltas": 0, "despejos": 0}
+        self._lock = threading.Lock()
+        # o finalizador de uma Referencia pode rodar no meio de uma operação
+        # (coleta de lixo) e não pode tomar o lock: só enfileira a chave, que é
+        # descontada na próxima operação
+        self._liberacoes = deque()
+
+    # ----------------- leitura -----------------
+    def espiar(self, chave):
+        """Valor guardado (ou None) sem contar acerto nem mexer na ordem do LRU."""
+        with self._lock:
+            item = self._itens.get(chave)
+        return None if item is None else item[0]
+
+    def usar(self, chave):
+        """Valor guardado (ou None), contando acerto e marcando como usado agora."""
+        with self._lock:
+            self._processar_liberacoes()
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            self._itens.move_to_end(chave)
+            self._estatisticas["acertos"] += 1
+            return item[0]
+
+    def obter(self, chave, calcular, medir):
+        """
+        Valor da chave; na falta, calcula (fora do lock), guarda com os bytes
+        de medir(valor) e devolve. Duas sessões pedindo a mesma chave ao mesmo
+        tempo podem calcular em dobro, mas só uma cópia fica guardada.
+        """
+        valor = self.usar(chave)
+        if valor is not None:
+            return valor
+        valor = calcular()
+        with self._lock:
+            # outra sessão guardou enquanto esta calculava: usa a que já está lá
+            item = self._itens.get(chave)
+            if item is not None:
+                self._itens.move_to_end(chave)
+                return item[0]
+        return self.guardar(chave, valor, medir(valor))
+
+    # ----------------- escrita -----------------
+    def guardar(self, chave, valor, nbytes):
+        """Guarda (ou substitui) o valor, conta uma falta e despeja o excedente."""
+        with self._lock:
+            self._processar_liberacoes()
+            anterior = self._itens.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._itens[chave] = (valor, nbytes)
+            self._bytes += nbytes
+            self._estatisticas["faltas"] += 1
+            self._despejar(manter=chave)
+        return valor
+
+    def remover(self, filtro=None):
+        """Remove os itens cuja chave satisfaz filtro(chave) (todos, se None)."""
+        with self._lock:
+            for chave in [k for k in self._itens if filtro is None or filtro(k)]:
+                self._bytes -= self._itens.pop(chave)[1]
+
+    def referenciar(self, chave):
+        return Referencia(self, chave)
+
+    def estatisticas(self):
+        """Acertos/faltas/despejos, itens e bytes guardados, itens em uso e referências vivas."""
+        with self._lock:
+            self._processar_liberacoes()
+            return {
+                **self._estatisticas,
+                "itens": len(self._itens),
+                "bytes": self._bytes,
+                "em_uso": sum(1 for k in self._itens if self._referencias[k] > 0),
+                "referencias": sum(self._referencias.values()),
+            }
+
+    # ----------------- interno (com o lock) -----------------
+    def _incrementar(self, chave):
+        with self._lock:
+            self._referencias[chave] += 1
+
+    def _processar_liberacoes(self):
+        """Desconta as referências devolvidas; o que deixou de estar em uso pode ser despejado."""
+        if not self._liberacoes:
+            return
+        while self._liberacoes:
+            chave = self._liberacoes.popleft()
+            self._referencias[chave] -= 1
+            if self._referencias[chave] <= 0:
+                del self._referencias[chave]
+        self._despejar()
+
+    def _despejar(self, manter=None):
+        """Descarta os itens usados há mais tempo além dos limites, pulando os que estão em uso."""
+        for chave in list(self._itens):
+            acima = len(self._itens) > self.max_itens or (0 < self.max_bytes < self._bytes)
+            if not acima:
+                break
+            if chave == manter or self._referencias[chave] > 0:
+                continue
+            self._bytes -= self._itens.pop(chave)[1]
+            self._estatisticas["despejos"] += 1
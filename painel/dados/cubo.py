@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+from painel.dados.datas import dias_locais
+from painel.dados.kpis import IndicadoresPost, kpis_de_somas
+
+# Rollup diário da base: um grupo por (dia local do post, post_type) com
+# a quantidade de posts, os numeradores dos KPIs e as contagens de tokens por
+# categoria. Consultas por período somam só os grupos do intervalo, então o
+# custo depende de dias x tipos x vocabulário, não do número de posts.
+
+
+class CuboDiario:
+
+    def __init__(self, dias, tipos, primeiro_post, medidas, tokens, vocab):
+        self.dias = dias                    # datetime64[D] por grupo (NaT = sem data)
+        self.tipos = tipos                  # post_type por grupo
+        self.primeiro_post = primeiro_post  # posição do 1º post do grupo na base
+        self.medidas = medidas              # nome -> soma por grupo (inclui "n_posts")
+        self.tokens = tokens                # col -> (grupo, token_id, count, primeiro)
+        self.vocab = vocab                  # col -> vocabulário (ColunaTokens.vocab)
+
+    @classmethod
+    def de_base(cls, df, tokens, indicadores=None):
+        """Monta o cubo a partir da base carregada, das colunas tokenizadas e dos indicadores dos KPIs."""
+        if indicadores is None:
+            indicadores = IndicadoresPost.de_base(df)
+        dias = dias_locais(df)
+        tipos = df["post_type"].astype(object).to_numpy()
+
+        # grupo = par (dia, tipo); NaT/None viram um código próprio
+        cod_dia, dias_unicos = pd.factorize(dias, sort=True, use_na_sentinel=False)
+        cod_tipo, tipos_unicos = pd.factorize(tipos, sort=True, use_na_sentinel=False)
+        pares, grupo = np.unique(cod_dia.astype(np.int64) * len(tipos_unicos) + cod_tipo, return_inverse=True)
+        grupo = grupo.astype(np.int64)
+        n_grupos = len(pares)
+
+        medidas = {"n_posts": np.bincount(grupo, minlength=n_grupos)}
+        for nome in indicadores.nomes:
+            ind = indicadores.coluna(nome)
+            medidas[nome] = np.bincount(grupo, weights=ind.astype(np.float64), minlength=n_grupos)
+
+        primeiro_post = np.full(n_grupos, len(df), dtype=np.int64)
+        np.minimum.at(primeiro_post, grupo, np.arange(len(df), dtype=np.int64))
+
+        cubo_tokens = {}
+        for col, t in tokens.items():
+            # grupo de cada token (pela linha a que pertence) e sua posição global
+            grupo_tok = np.repeat(grupo, np.diff(t.offsets))
+            chave = grupo_tok * len(t.vocab) + t.ids
+            uk, inv = np.unique(chave, return_inverse=True)
+            cont = np.bincount(inv)
+            primeiro = np.full(len(uk), len(t.ids), dtype=np.int64)
+            np.minimum.at(primeiro, inv, np.arange(len(t.ids), dtype=np.int64))
+            cubo_tokens[col] = (uk // max(len(t.vocab), 1), uk % max(len(t.vocab), 1), cont, primeiro)
+
+        return cls(
+            np.asarray(dias_unicos, dtype="datetime64[D]")[pares // len(tipos_unicos)],
+            np.asarray(tipos_unicos, dtype=object)[pares % len(tipos_unicos)],
+            primeiro_post,
+            medidas,
+            cubo_tokens,
+            {col: t.vocab for col, t in tokens.items()},
+        )
+
+    @property
+    def nbytes(self):
+        total = self.dias.nbytes + self.primeiro_post.nbytes + sum(m.nbytes for m in self.medidas.values())
+        return total + sum(a.nbytes for arrays in self.tokens.values() for a in arrays)
+
+    # ----------------- consultas -----------------
+    def grupos(self, date_start=None, date_end=None, post_types=None):
+        """Máscara dos grupos no período (dias inclusivos) e nos tipos pedidos."""
+        sel = np.ones(len(self.dias), dtype=bool)
+        if date_start and date_end:
+            ini = np.datetime64(pd.Timestamp(date_start).date(), "D")
+            fim = np.datetime64(pd.Timestamp(date_end).date(), "D")
+            sel &= (self.dias >= ini) & (self.dias <= fim)
+        if post_types:
+            sel &= np.isin(self.tipos, list(post_types))
+        return sel
+
+    def total_posts(self, grupos):
+        return int(self.medidas["n_posts"][grupos].sum())
+
+    def kpis(self, grupos):
+        """Os sete KPIs do relatório nos grupos (mesmo dict de painel.dados.kpis.calcular_kpis)."""
+        somas = {nome: m[grupos].sum() for nome, m in self.medidas.items() if nome != "n_posts"}
+        return kpis_de_somas(self.total_posts(grupos), somas)
+
+    def contagem_tipo_post(self, grupos):
+        """Mesma saída de _contagem_tipo_post (ordem de empate pela 1ª ocorrência)."""
+        r = pd.DataFrame({
+            "post_type": self.tipos[grupos],
+            "count": self.medidas["n_posts"][grupos],
+            "_primeiro": self.primeiro_post[grupos],
+        }).groupby("post_type", sort=False).agg({"count": "sum", "_primeiro": "min"})
+        r = r.sort_values(["count", "_primeiro"], ascending=[False, True]).reset_index()
+        r = r.drop(columns="_primeiro")
+        r["count"] = r["count"].astype("int64")
+        r["percent"] = r["count"] / r["count"].sum() * 100
+        return r
+
+    def contagem(self, col, grupos, nome="token"):
+        """Contagem de tokens da coluna nos grupos -> (DataFrame [nome, 'count'], total)."""
+        if col not in self.tokens:
+            return None
+        grupo, token, cont, primeiro = self.tokens[col]
+        sel = grupos[grupo]
+        token, cont, primeiro = token[sel], cont[sel], primeiro[sel]
+        vocab = self.vocab[col]
+        if len(token) == 0:
+            return pd.DataFrame({nome: pd.Series(dtype=object), "count": pd.Series(dtype="int64")}), 0
+
+        soma = np.bincount(token, weights=cont, minlength=len(vocab)).astype(np.int64)
+        min_pos = np.full(len(vocab), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(min_pos, token, primeiro)
+        presentes = np.flatnonzero(soma)
+        ordem = np.lexsort((min_pos[presentes], -soma[presentes]))
+        ids = presentes[ordem]
+        return pd.DataFrame({nome: vocab[ids], "count": soma[ids]}), int(cont.sum())
@@ -0,0 +1,83 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Fuso em que os dias do relatório são contados (slider de período, cubo diário)
+FUSO_LOCAL = os.environ.get("IA_FARM_FUSO", "America/Sao_Paulo")
+
+# formato de post_date na exportação (UTC)
+FORMATO_POST_DATE = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+_NAT = np.iinfo(np.int64).min
+
+
+def converter_post_date(post_date, fuso=FUSO_LOCAL):
+    """
+    Interpreta post_date uma única vez -> (post_date_resumo, post_dia_local):
+    instante em UTC (datetime64[ns] sem fuso, ou seja, int64 em ns) e o dia
+    local no fuso (datetime64[s] à meia-noite). Datas inválidas viram NaT.
+    """
+    utc = pd.to_datetime(post_date, format=FORMATO_POST_DATE, errors="coerce", utc=True)
+    dia = utc.dt.tz_convert(fuso).dt.tz_localize(None).dt.floor("D").astype("datetime64[s]")
+    return utc.dt.tz_localize(None), dia
+
+
+def dias_locais(df, fuso=FUSO_LOCAL):
+    """
+    Dia local de cada post como datetime64[D]: a coluna post_dia_local ou, em
+    bases gravadas antes dela, o dia de post_date_resumo convertido para o fuso.
+    """
+    if "post_dia_local" in df.columns:
+        return df["post_dia_local"].to_numpy(dtype="datetime64[s]").astype("datetime64[D]")
+    utc = pd.to_datetime(df["post_date_resumo"]).dt.tz_localize("UTC")
+    return utc.dt.tz_convert(fuso).dt.tz_localize(None).to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+
+
+def _dia(valor):
+    return np.datetime64(pd.Timestamp(valor).date(), "D").astype(np.int64)
+
+
+class IndiceDatas:
+    """
+    Posts ordenados pelo dia local (ordenação estável, sem os posts sem data).
+    Um período vira duas buscas binárias sobre os dias ordenados, e os limites
+    do slider são o primeiro e o último dia, sem varrer a base.
+    """
+
+    __slots__ = ("tamanho", "dias", "ordem")
+
+    def __init__(self, tamanho, dias, ordem):
+        self.tamanho = tamanho  # linhas da base
+        self.dias = dias        # dia local (dias desde 1970-01-01), em ordem crescente
+        self.ordem = ordem      # posição na base do post de cada dia em `dias`
+
+    @classmethod
+    def de_base(cls, df):
+        dias = dias_locais(df).astype(np.int64)
+        com_data = np.flatnonzero(dias != _NAT)
+        ordem = com_data[np.argsort(dias[com_data], kind="stable")]
+        return cls(len(df), dias[ordem].astype(np.int32), ordem)
+
+    @property
+    def nbytes(self):
+        return self.dias.nbytes + self.ordem.nbytes
+
+    def limites(self):
+        """(primeiro dia, último dia) como datetime.date, ou (None, None) sem datas."""
+        if len(self.dias) == 0:
+            return None, None
+        ini, fim = np.array([self.dias[0], self.dias[-1]], dtype="datetime64[D]")
+        return ini.item(), fim.item()
+
+    def posicoes(self, date_start, date_end):
+        """Posições na base (em ordem de dia) dos posts entre os dois dias, inclusive."""
+        i = np.searchsorted(self.dias, _dia(date_start), side="left")
+        j = np.searchsorted(self.dias, _dia(date_end), side="right")
+        return self.ordem[i:j]
+
+    def mascara(self, date_start, date_end, linhas=None):
+        """Máscara booleana do período sobre a base (ou sobre as posições `linhas` dela)."""
+        sel = np.zeros(self.tamanho, dtype=bool)
+        sel[self.posicoes(date_start, date_end)] = True
+        return sel if linhas is None else sel[np.asarray(linhas, dtype=np.int64)]
@@ -0,0 +1,43 @@
+# Esquema das colunas aninhadas (dicionários) da base de posts.
+# Cada coluna vira "<coluna>_<campo>" no achatamento; a ordem dos campos
+# segue a ordem em que aparecem na exportação.
+CAMPOS_ANINHADOS = {
+    "legenda_frete": [
+        "frete_gratis", "valor_minimo_brl", "codigo_necessario",
+    ],
+    "legenda_pagamento": [
+        "parcelas_sem_juros", "parcela_minima_brl", "pix_parcelado", "provedor_pix",
+    ],
+    "legenda_codigos": [
+        "cupons", "codigos_vendedora",
+    ],
+    "legenda_sentimento": [
+        "polaridade", "pontuacao", "emocoes",
+    ],
+    "legenda_metricas_estilo": [
+        "formalidade", "grau_legibilidade", "tem_sarcasmo", "excesso_maiusculas", "excesso_pontuacao",
+    ],
+    "legenda_seguranca": [
+        "toxicidade", "nsfw",
+    ],
+    "imagem_cta": [
+        "presente", "tipo", "frases",
+    ],
+    "imagem_oferta": [
+        "tem_oferta", "desconto_percentual", "cupom",
+    ],
+    "imagem_contexto_farm": [
+        "cabide_visivel", "arara_visivel", "steamer_visivel", "modo_retrato",
+        "provador_lotado", "reflexo_espelho", "interior_loja", "foco_look",
+        "foco_acessorio", "foco_textura", "roupas_dobradas", "cortina_visivel",
+        "manequim_visivel", "etiqueta_preco_visivel", "sacola_visivel",
+        "selfie_no_espelho", "logo_marca_visivel",
+    ],
+    "imagem_contexto_marca": [
+        "marcas", "quantidade_marcas", "multi_marca", "marca_principal",
+        "marca_secundaria", "evidencia", "confianca_marca",
+    ],
+}
+
+# Flags de contexto FARM já achatadas (imagem_contexto_farm_<campo>)
+CONTEXT_FARM_COLS = [f"imagem_contexto_farm_{campo}" for campo in CAMPOS_ANINHADOS["imagem_contexto_farm"]]
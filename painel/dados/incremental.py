@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from painel.dados.preparacao import preparar_base
+from painel.dados.colunar import _para_tabela_arrow, ler_parquet
+from painel.dados.tipos import compactar_tipos, concatenar, unificar_tipos
+
+# Base incremental = diretório com partes Parquet imutáveis + índice de chaves:
+#
+#   <dir>/manifesto.json             chave, índice de chaves atual, partes (em ordem de escrita)
+#   <dir>/chaves-NNNNNN.parquet      chave -> parte onde está a versão viva + assinatura
+#   <dir>/partes/parte-NNNNNN.parquet
+#
+# Cada ingestão grava só os posts novos/alterados numa parte nova; a versão
+# anterior de um post alterado continua na parte antiga, mas deixa de ser
+# "viva" no índice de chaves. O manifesto aponta para o índice de chaves da
+# mesma versão, então um leitor nunca combina partes e chaves de versões
+# diferentes.
+ARQUIVO_MANIFESTO = "manifesto.json"
+PASTA_PARTES = "partes"
+
+# chaves aceitas, na ordem de preferência (farm usa post_pk, insider cod_ident)
+CHAVES_CANDIDATAS = ["post_pk", "cod_ident"]
+
+
+def eh_base_incremental(caminho):
+    return os.path.isdir(caminho) and os.path.exists(os.path.join(caminho, ARQUIVO_MANIFESTO))
+
+
+def ler_manifesto(diretorio):
+    with open(os.path.join(diretorio, ARQUIVO_MANIFESTO)) as f:
+        return json.load(f)
+
+
+def _gravar_json_atomico(caminho, conteudo):
+    tmp = caminho + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(conteudo, f, indent=2)
+    os.replace(tmp, caminho)
+
+
+def _gravar_parquet_atomico(tabela, caminho):
+    tmp = caminho + ".tmp"
+    pq.write_table(tabela, tmp, compression="zstd")
+    os.replace(tmp, caminho)
+
+
+def _ler_chaves(diretorio, manifesto):
+    if not manifesto.get("chaves"):
+        return pd.DataFrame({manifesto["chave"]: pd.Series(dtype=object), "parte": pd.Series(dtype=object),
+                             "assinatura": pd.Series(dtype="int64")})
+    return pq.read_table(os.path.join(diretorio, manifesto["chaves"])).to_pandas()
+
+
+def _publicar_versao(diretorio, manifesto, chaves, partes):
+    """Grava o índice de chaves da nova versão e, por último, o manifesto que aponta para ele."""
+    versao = manifesto["proxima"]
+    nome_chaves = f"chaves-{versao:06d}.parquet"
+    _gravar_parquet_atomico(pa.Table.from_pandas(chaves, preserve_index=False), os.path.join(diretorio, nome_chaves))
+
+    anterior = manifesto.get("chaves")
+    manifesto.update({"chaves": nome_chaves, "partes": partes, "proxima": versao + 1})
+    _gravar_json_atomico(os.path.join(diretorio, ARQUIVO_MANIFESTO), manifesto)
+    if anterior:
+        os.remove(os.path.join(diretorio, anterior))
+
+
+def _valor_canonico(v):
+    """
+    Valor do post na forma que não depende do lote: o dtype de uma coluna
+    muda com os outros posts do lote (0 vira 0.0 se houver nulos, None vira
+    NaN), então nulos viram None e números inteiros viram int.
+    """
+    if isinstance(v, dict):
+        return {k: _valor_canonico(x) for k, x in v.items()}
+    if isinstance(v, (list, tuple, np.ndarray)):
+        return [_valor_canonico(x) for x in v]
+    if v is None or v is pd.NA or v is pd.NaT:
+        return None
+    if isinstance(v, np.generic):
+        v = v.item()
+    if isinstance(v, float):
+        if np.isnan(v):
+            return None
+        if v.is_integer():
+            return int(v)
+    return v
+
+
+def _assinatura_linhas(df):
+    """Hash (int64) do conteúdo de cada post, para detectar alterações (o mesmo em qualquer lote)."""
+    registros = df.to_dict(orient="records")
+    return np.array([
+        int.from_bytes(
+            hashlib.blake2b(
+                json.dumps(_valor_canonico(r), sort_keys=True, default=str).encode(), digest_size=8,
+            ).digest(),
+            "little", signed=True,
+        )
+        for r in registros
+    ], dtype=np.int64)
+
+
+def _normalizar_novos(origem, chave, adaptador=None):
+    """Prepara o lote novo (JSON exportado ou DataFrame bruto) e descarta chaves repetidas."""
+    bruto = pd.read_json(origem) if isinstance(origem, str) else origem.copy()
+    # sem compactar: o plano de tipos (e a assinatura, se viesse dele) dependeria do lote
+    df = preparar_base(bruto, adaptador, compactar=False)
+    if chave is None:
+        chave = next((c for c in CHAVES_CANDIDATAS if c in df.columns), None)
+        if chave is None:
+            raise ValueError(f"Nenhuma coluna de chave encontrada ({', '.join(CHAVES_CANDIDATAS)}).")
+    df = df[df[chave].notna()]
+    # a mesma chave repetida no lote: vale a última ocorrência
+    df = df.drop_duplicates(subset=[chave], keep="last").reset_index(drop=True)
+    return df, chave
+
+
+def ingerir_incremental(origem, diretorio, chave=None, adaptador=None):
+    """
+    Faz upsert de um lote de posts na base incremental em `diretorio`.
+
+    Só os posts novos ou alterados (assinatura de conteúdo diferente) são
+    gravados, numa parte Parquet nova; o custo de escrita é proporcional ao
+    lote, não ao histórico. `adaptador` traduz exportações fora do esquema da
+    farm (ver painel.dados.marcas), como em preparar_base. Retorna um resumo
+    da ingestão.
+    """
+    os.makedirs(os.path.join(diretorio, PASTA_PARTES), exist_ok=True)
+    if eh_base_incremental(diretorio):
+        manifesto = ler_manifesto(diretorio)
+    else:
+        manifesto = {"chave": chave, "chaves": None, "partes": [], "proxima": 1}
+
+    novos, chave = _normalizar_novos(origem, manifesto["chave"] or chave, adaptador)
+    manifesto["chave"] = chave
+    novos["_assinatura"] = _assinatura_linhas(novos)
+
+    chaves = _ler_chaves(diretorio, manifesto)
+    atuais = dict(zip(chaves[chave].tolist(), chaves["assinatura"].tolist()))
+    assinatura_atual = novos[chave].map(atuais)
+    eh_novo = assinatura_atual.isna()
+    eh_alterado = ~eh_novo & (assinatura_atual != novos["_assinatura"])
+    delta = novos[eh_novo | eh_alterado]
+
+    resumo = {
+        "novos": int(eh_novo.sum()),
+        "alterados": int(eh_alterado.sum()),
+        "inalterados": int(len(novos) - len(delta)),
+        "parte": None,
+    }
+    if delta.empty:
+        return resumo
+
+    nome = f"parte-{manifesto['proxima']:06d}.parquet"
+    tabela = _para_tabela_arrow(compactar_tipos(delta.drop(columns="_assinatura").reset_index(drop=True)))
+    _gravar_parquet_atomico(tabela, os.path.join(diretorio, PASTA_PARTES, nome))
+
+    # índice de chaves: versões novas apontam para a parte recém-gravada
+    vivas = chaves[~chaves[chave].isin(delta[chave])]
+    chaves = pd.concat([
+        vivas,
+        pd.DataFrame({chave: delta[chave].to_numpy(), "parte": nome, "assinatura": delta["_assinatura"].to_numpy()}),
+    ], ignore_index=True)
+    _publicar_versao(diretorio, manifesto, chaves, manifesto["partes"] + [nome])
+
+    resumo["parte"] = nome
+    return resumo
+
+
+def ler_partes(diretorio, partes=None, colunas=None, manifesto=None):
+    """
+    Lê as linhas vivas das partes pedidas (todas por padrão), na ordem do
+    manifesto, com um mesmo plano de tipos para todas (tipos.unificar_tipos).
+    A coluna de chave é sempre incluída.
+    """
+    manifesto = manifesto or ler_manifesto(diretorio)
+    chave = manifesto["chave"]
+    partes = manifesto["partes"] if partes is None else partes
+    chaves = _ler_chaves(diretorio, manifesto)
+    vivas_por_parte = chaves.groupby("parte")[chave].agg(set).to_dict()
+
+    if colunas is not None and chave not in colunas:
+        colunas = [chave] + list(colunas)
+
+    frames = []
+    for nome in partes:
+        vivas = vivas_por_parte.get(nome)
+        if not vivas:
+            continue
+        df = ler_parquet(os.path.join(diretorio, PASTA_PARTES, nome), colunas)
+        frames.append(df[df[chave].isin(vivas)])
+    if not frames:
+        return pd.DataFrame(columns=colunas or [chave])
+    # cada parte foi compactada pelo plano do seu lote: um plano só para todas
+    return concatenar(unificar_tipos(frames))
+
+
+def ler_base_incremental(diretorio, colunas=None):
+    """Base completa (só versões vivas) de um diretório incremental."""
+    return ler_partes(diretorio, colunas=colunas)
+
+
+def compactar_base(diretorio):
+    """Regrava as versões vivas numa única parte, descartando as superadas."""
+    manifesto = ler_manifesto(diretorio)
+    df = ler_partes(diretorio)
+    chaves = _ler_chaves(diretorio, manifesto)
+
+    nome = f"parte-{manifesto['proxima']:06d}.parquet"
+    _gravar_parquet_atomico(_para_tabela_arrow(df), os.path.join(diretorio, PASTA_PARTES, nome))
+    chaves["parte"] = nome
+
+    antigas = manifesto["partes"]
+    _publicar_versao(diretorio, manifesto, chaves, [nome])
+    for antiga in antigas:
+        os.remove(os.path.join(diretorio, PASTA_PARTES, antiga))
+    return nome
+
+
+if __name__ == "__main__":
+    # uso: python -m painel.dados.incremental <lote.json> <diretorio_base> [marca]
+    #      python -m painel.dados.incremental --compactar <diretorio_base>
+    # (a marca escolhe o adaptador da exportação; farm por padrão)
+    if len(sys.argv) == 3 and sys.argv[1] == "--compactar":
+        print(f"compactado em {compactar_base(sys.argv[2])}")
+    elif len(sys.argv) in (3, 4):
+        # import tardio: marcas importa o carregador, que importa este módulo
+        from painel.dados.marcas import MARCAS
+
+        marca = sys.argv[3] if len(sys.argv) == 4 else "farm"
+        if marca not in MARCAS:
+            print(f"marca desconhecida: {marca} (disponíveis: {', '.join(MARCAS)})")
+            sys.exit(1)
+        print(ingerir_incremental(sys.argv[1], sys.argv[2], adaptador=MARCAS[marca]["adaptador"]))
+    else:
+        print("uso: python -m painel.dados.incremental <lote.json> <diretorio_base> [marca] | --compactar <diretorio_base>")
+        sys.exit(1)
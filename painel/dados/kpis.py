@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+
+
+# --- helpers ---
+def _nonempty_any(v):
+    """True se v (string/list) tiver algo não vazio."""
+    # pd.NA: nulo das colunas de inteiro anulável (painel.dados.tipos)
+    if v is None or v is pd.NA or (isinstance(v, float) and pd.isna(v)):
+        return False
+    if isinstance(v, list):
+        return any(str(x).strip() for x in v if x is not None)
+    s = str(v).strip()
+    return s not in ("", "none", "null")
+
+def _col_bool(df, col):
+    """Série booleana True se a coluna existir e tiver conteúdo não vazio (str/list)."""
+    if col not in df.columns:
+        return pd.Series(False, index=df.index)
+    # astype(bool): em recortes vazios o apply devolveria o dtype original da coluna
+    return df[col].apply(_nonempty_any).astype(bool)
+
+def _pick_first_col(df, candidates):
+    """Retorna o primeiro nome de coluna existente; senão None."""
+    return next((c for c in candidates if c in df.columns), None)
+
+def _inteiro(s):
+    return pd.to_numeric(s, errors="coerce").fillna(0).astype(int).to_numpy()
+
+def _positivo(s):
+    return (pd.to_numeric(s, errors="coerce").fillna(0) > 0).to_numpy()
+
+
+# Indicadores por post usados nos KPIs do relatório. Cada um é um array numérico
+# alinhado às linhas da base; a % do KPI é a média * 100. None = coluna ausente
+# (o KPI vale 0).
+def _ind_rosto(df):
+    col_face = _pick_first_col(df, ["imagem_face_presente"])
+    return _inteiro(df[col_face]) if col_face else None
+
+def _ind_texto(df):
+    # texto na imagem: tenta várias formas
+    if "imagem_texto_presente" in df.columns:
+        return _inteiro(df["imagem_texto_presente"])
+    if "imagem_texto_detectado" in df.columns:
+        return _inteiro(df["imagem_texto_detectado"])
+    if "imagem_num_blocos_texto" in df.columns:
+        return _positivo(df["imagem_num_blocos_texto"])
+    if "imagem_texto_proporcao" in df.columns:
+        return _positivo(df["imagem_texto_proporcao"])
+    return None
+
+def _ind_par(col_img, cols_leg):
+    def _ind(df):
+        col_leg = _pick_first_col(df, cols_leg)
+        leg = _col_bool(df, col_leg) if col_leg else pd.Series(False, index=df.index)
+        return (_col_bool(df, col_img) | leg).to_numpy()
+    return _ind
+
+INDICADORES = {
+    "rosto": _ind_rosto,
+    "texto": _ind_texto,
+    # menções (@)
+    "mencoes": _ind_par("imagem_mencoes_ocr", ["legenda_mencoes"]),
+    # hashtags
+    "hashtags": _ind_par("imagem_hashtags_ocr", ["legenda_hashtags"]),
+    # URLs
+    "urls": _ind_par("imagem_url_detectada", ["legenda_urls"]),
+    # cupons (imagem + legenda em variantes)
+    "cupons": _ind_par("imagem_codigo_cupom", ["legenda_codigos_cupons", "legenda_codigos.cupons"]),
+}
+
+
+def indicadores_por_post(df, nomes=None):
+    """Calcula os indicadores pedidos (todos por padrão) -> {nome: array ou None}."""
+    return {n: INDICADORES[n](df) for n in (nomes or INDICADORES)}
+
+
+def pct(indicador, n):
+    """% de posts com o indicador (média * 100); NaN sem posts e 0 sem a coluna."""
+    if indicador is None:
+        return 0
+    if n == 0:
+        return float("nan")
+    return float(np.mean(indicador) * 100)
+
+
+# indicador -> chave do KPI nos dicts devolvidos aos painéis
+CHAVES_KPIS = {
+    "rosto": "pct_faces",
+    "texto": "pct_texto",
+    "mencoes": "pct_mencoes",
+    "hashtags": "pct_hashtags",
+    "urls": "pct_urls",
+    "cupons": "pct_cupons",
+}
+
+
+def kpis_de_somas(n, somas):
+    """
+    Monta o dict dos sete KPIs a partir da qtd. de posts e da soma de cada
+    indicador (None = coluna ausente), com a mesma regra de pct.
+    """
+    saida = {"total_posts": int(n)}
+    for nome, chave in CHAVES_KPIS.items():
+        soma = somas.get(nome)
+        if soma is None:
+            saida[chave] = 0
+        elif n == 0:
+            saida[chave] = float("nan")
+        else:
+            saida[chave] = float(soma / n * 100)
+    return saida
+
+
+class IndicadoresPost:
+    """
+    Indicadores dos KPIs pré-calculados na carga: matriz (posts x indicadores)
+    com uma coluna por indicador cuja coluna de origem existe na base. Os KPIs
+    de qualquer recorte saem de uma soma por coluna sobre as linhas do recorte.
+    """
+
+    def __init__(self, nomes, matriz):
+        self.nomes = list(nomes)
+        self.matriz = matriz
+
+    @classmethod
+    def de_base(cls, df):
+        ind = {n: v for n, v in indicadores_por_post(df).items() if v is not None}
+        if not ind:
+            return cls([], np.zeros((len(df), 0), dtype=np.int32))
+        return cls(list(ind), np.column_stack([np.asarray(v, dtype=np.int32) for v in ind.values()]))
+
+    @property
+    def nbytes(self):
+        return self.matriz.nbytes
+
+    def __len__(self):
+        return len(self.matriz)
+
+    def coluna(self, nome):
+        """Indicador por post (array) ou None se a coluna de origem não existe."""
+        return self.matriz[:, self.nomes.index(nome)] if nome in self.nomes else None
+
+    def atualizar(self, manter, delta):
+        """Mantém as linhas `manter` e acrescenta as do delta; None se o delta mudar os indicadores disponíveis."""
+        novos = IndicadoresPost.de_base(delta)
+        if novos.nomes != self.nomes:
+            return None
+        return IndicadoresPost(self.nomes, np.concatenate([self.matriz[manter], novos.matriz]))
+
+    def kpis(self, linhas=None):
+        """KPIs das linhas (posições ou máscara booleana; None = todas) num único passe."""
+        sub = self.matriz if linhas is None else self.matriz[linhas]
+        somas = sub.sum(axis=0, dtype=np.int64)
+        return kpis_de_somas(len(sub), {nome: somas[i] for i, nome in enumerate(self.nomes)})
+
+
+def calcular_kpis(df, mascara=None):
+    """
+    Os sete KPIs do relatório (total_posts e pct_*) de df[mascara], sem copiar
+    o DataFrame. mascara é booleana e alinhada às linhas de df (None = todas).
+    Se df é a base do carregador (ou um recorte dela) usa os indicadores
+    pré-calculados na carga; senão calcula os indicadores de df na hora.
+    """
+    from painel.dados.carregador import obter_indicadores
+
+    indicadores = obter_indicadores(df)
+    if indicadores is None:
+        indicadores, linhas = IndicadoresPost.de_base(df), None
+    else:
+        linhas = df.index.to_numpy()
+    if mascara is not None:
+        mascara = np.asarray(mascara, dtype=bool)
+        linhas = mascara if linhas is None else linhas[mascara]
+    return indicadores.kpis(linhas)
@@ -0,0 +1,143 @@
+import os
+import warnings
+
+from painel.dados.carregador import carregar_base, CAMINHO_BASE_PADRAO
+
+# Registro das bases por marca. Cada marca aponta para o arquivo da sua base e,
+# quando a exportação não segue o esquema da farm (imagem_* / legenda_* em
+# português), para um adaptador que traduz as colunas antes da preparação.
+# Nada é lido no registro: a base de uma marca só é carregada no 1º acesso a
+# ela e fica no LRU do carregador (IA_FARM_MAX_BASES_CACHE), então um processo
+# atende várias marcas sem manter todas em memória.
+
+# Marca aberta quando a sessão ainda não escolheu uma
+MARCA_PADRAO = os.environ.get("IA_FARM_MARCA", "farm")
+
+# Exportação em inglês (insider) -> colunas do esquema da farm (já achatado)
+COLUNAS_INSIDER = {
+    # pessoas / texto na imagem
+    "imagem_fp": "imagem_face_presente",
+    "imagem_nf": "imagem_num_faces",
+    "imagem_np": "imagem_num_pessoas",
+    "imagem_dom": "imagem_cor_dominante",
+    "imagem_wu": "imagem_palavras_unicas",
+    "imagem_mentions": "imagem_mencoes_ocr",
+    "imagem_hashtags": "imagem_hashtags_ocr",
+    "imagem_urls": "imagem_url_detectada",
+    "imagem_coupon_codes": "imagem_codigo_cupom",
+    # conteúdo da imagem
+    "imagem_objects": "imagem_objetos",
+    "imagem_category": "imagem_topicos",
+    "imagem_triggers": "imagem_gatilhos",
+    "imagem_possibilities_cta": "imagem_cta_tipo",
+    "imagem_brand_mentions": "imagem_contexto_marca_marcas",
+    # flags de contexto
+    "imagem_hanger_visible": "imagem_contexto_farm_cabide_visivel",
+    "imagem_rack_visible": "imagem_contexto_farm_arara_visivel",
+    "imagem_steamer_visible": "imagem_contexto_farm_steamer_visivel",
+    "imagem_portrait_mode": "imagem_contexto_farm_modo_retrato",
+    "imagem_fitting_room_crowded": "imagem_contexto_farm_provador_lotado",
+    "imagem_mirror_reflection": "imagem_contexto_farm_reflexo_espelho",
+    "imagem_store_interior": "imagem_contexto_farm_interior_loja",
+    "imagem_outfit_focus": "imagem_contexto_farm_foco_look",
+    "imagem_accessory_focus": "imagem_contexto_farm_foco_acessorio",
+    "imagem_textile_detail_focus": "imagem_contexto_farm_foco_textura",
+    "imagem_folded_clothes": "imagem_contexto_farm_roupas_dobradas",
+    "imagem_curtain_visible": "imagem_contexto_farm_cortina_visivel",
+    "imagem_mannequin_visible": "imagem_contexto_farm_manequim_visivel",
+    "imagem_price_tag_visible": "imagem_contexto_farm_etiqueta_preco_visivel",
+    "imagem_shopping_bag_visible": "imagem_contexto_farm_sacola_visivel",
+    "imagem_mirror_selfie": "imagem_contexto_farm_selfie_no_espelho",
+    "imagem_brand_logo_visible": "imagem_contexto_farm_logo_marca_visivel",
+    # metadados do modelo
+    "imagem_model": "imagem_modelo",
+    "imagem_prompt_tokens": "imagem_tokens_prompt",
+    "imagem_completion_tokens": "imagem_tokens_completude",
+    "imagem_total_tokens": "imagem_tokens_total",
+    # legenda
+    "legenda_mentions": "legenda_mencoes",
+    "legenda_coupon_codes": "legenda_codigos_cupons",
+    "legenda_seller_codes": "legenda_codigos_codigos_vendedora",
+    "legenda_brand_mentions": "legenda_marcas_texto",
+    "legenda_category": "legenda_topicos",
+    "legenda_triggers": "legenda_gatilhos",
+    "legenda_possibilities_cta": "legenda_cta",
+    "legenda_emotion": "legenda_sentimento_emocoes",
+    "legenda_sentiment_score": "legenda_sentimento_pontuacao",
+    "legenda_conf": "legenda_confianca",
+    "legenda_model": "legenda_modelo",
+    "legenda_prompt_tokens": "legenda_tokens_prompt",
+    "legenda_completion_tokens": "legenda_tokens_completude",
+    "legenda_total_tokens": "legenda_tokens_total",
+}
+
+# Colunas que na farm são texto separado por '/' (é o que os parsers de
+# painel.dados.tokenizacao e o motor DuckDB esperam) e na exportação em inglês
+# vêm como lista. legenda_sentimento_emocoes já é lista nas duas.
+_COLUNAS_BARRA = [
+    "imagem_cor_dominante", "imagem_palavras_unicas", "imagem_mencoes_ocr", "imagem_hashtags_ocr",
+    "imagem_url_detectada", "imagem_codigo_cupom", "imagem_emoticoins", "imagem_objetos",
+    "imagem_topicos", "imagem_gatilhos", "imagem_cta_tipo", "imagem_contexto_marca_marcas",
+    "legenda_hashtags", "legenda_mencoes", "legenda_urls", "legenda_emoticoins",
+    "legenda_codigos_cupons", "legenda_codigos_codigos_vendedora", "legenda_marcas_texto",
+    "legenda_topicos", "legenda_gatilhos", "legenda_cta",
+]
+
+
+def _juntar_com_barra(v):
+    """['a', 'b'] -> 'a/b'; lista vazia vira None e os demais valores passam como estão."""
+    if not isinstance(v, list):
+        return v
+    itens = [str(x).strip() for x in v if x is not None and str(x).strip()]
+    return "/".join(itens) if itens else None
+
+
+def adaptar_colunas(df, mapa, nome_marca):
+    """Renomeia as colunas para o esquema da farm e normaliza as listas em texto com '/'."""
+    df = df.rename(columns=mapa)
+    for col in _COLUNAS_BARRA:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = [_juntar_com_barra(v) for v in df[col].tolist()]
+    if "marca" not in df.columns:
+        df["marca"] = nome_marca
+    return df
+
+
+# Rótulos dos tipos de post da exportação da insider; os tipos comuns (feed,
+# clips, ...) são renomeados na preparação e a farm mantém os seus rótulos
+TIPOS_POST_INSIDER = {"tiktok": "TikTok", "story": "Stories"}
+
+
+def adaptar_insider(df):
+    df = adaptar_colunas(df, COLUNAS_INSIDER, "Insider")
+    if "post_type" in df.columns:
+        df["post_type"] = df["post_type"].replace(TIPOS_POST_INSIDER)
+    return df
+
+
+# marca -> nome exibido, arquivo da base (JSON, Parquet ou base incremental) e
+# adaptador da exportação bruta (None = já está no esquema da farm). O caminho
+# pode ser trocado por IA_FARM_BASE_<MARCA> (ex.: IA_FARM_BASE_INSIDER).
+MARCAS = {
+    "farm": {"nome": "Farm", "caminho": CAMINHO_BASE_PADRAO, "adaptador": None},
+    "insider": {"nome": "Insider", "caminho": "data/data_insider.json", "adaptador": adaptar_insider},
+}
+
+if MARCA_PADRAO not in MARCAS:
+    warnings.warn(f"IA_FARM_MARCA={MARCA_PADRAO!r} não é uma marca registrada ({', '.join(MARCAS)}); usando 'farm'.",
+                  stacklevel=2)
+    MARCA_PADRAO = "farm"
+
+
+def caminho_marca(marca):
+    return os.environ.get(f"IA_FARM_BASE_{marca.upper()}", MARCAS[marca]["caminho"])
+
+
+def marcas_disponiveis():
+    """Marcas registradas cuja base existe no disco (na ordem do registro)."""
+    return [m for m in MARCAS if os.path.exists(caminho_marca(m))]
+
+
+def carregar_marca(marca, colunas=None):
+    """Base da marca no esquema da farm, carregada no 1º acesso e mantida no cache do carregador."""
+    return carregar_base(caminho_marca(marca), colunas, adaptador=MARCAS[marca]["adaptador"])
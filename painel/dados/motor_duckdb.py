@@ -0,0 +1,340 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from painel.dados.carregador import carregar_base, CAMINHO_BASE_PADRAO, MAX_BASES_EM_CACHE, _assinatura_arquivo
+from painel.dados.colunar import tabela_para_pandas, colunas_json_do_arquivo
+
+# Motor de consulta usado pelo relatório: "pandas" (padrão) ou "duckdb"
+MOTOR_PADRAO = os.environ.get("IA_FARM_MOTOR", "pandas").lower()
+
+# espaços removidos pelo str.strip() do Python (os mais comuns)
+_ESPACOS = " \t\n\r\x0b\x0c"
+
+_TIPOS_TEXTO = ("VARCHAR",)
+_TIPOS_NUMERICOS = ("DOUBLE", "FLOAT", "BIGINT", "INTEGER", "SMALLINT", "TINYINT", "UBIGINT", "UINTEGER", "USMALLINT",
+                    "UTINYINT", "HUGEINT")
+
+
+class MotorDuckDB:
+    """
+    Registra a base de posts como tabela DuckDB e responde às contagens do
+    relatório macro em SQL (mesmos resultados do caminho pandas).
+
+    A origem pode ser um DataFrame já achatado ou o caminho de um Parquet
+    gerado por painel.dados.colunar — nesse caso a base nunca passa pelo pandas.
+    A coluna _ordem guarda a posição original da linha para desempatar as
+    contagens na mesma ordem do value_counts.
+    """
+
+    def __init__(self, origem):
+        # importado só quando o motor DuckDB é usado (o padrão é o pandas)
+        import duckdb
+
+        self._con = duckdb.connect()
+        self._lock = threading.Lock()
+        self._colunas_json = []
+        if isinstance(origem, pd.DataFrame):
+            # Categorical viraria ENUM no DuckDB: registra como texto (VARCHAR)
+            texto = {c: "str" for c, t in origem.dtypes.items() if isinstance(t, pd.CategoricalDtype)}
+            self._con.register("_origem", origem.astype(texto).assign(_ordem=np.arange(len(origem))))
+            self._con.execute("CREATE TABLE posts AS SELECT * FROM _origem")
+            self._con.unregister("_origem")
+        else:
+            self._colunas_json = colunas_json_do_arquivo(str(origem))
+            caminho = str(origem).replace("'", "''")
+            self._con.execute(
+                "CREATE VIEW posts AS SELECT * EXCLUDE (file_row_number), file_row_number AS _ordem "
+                f"FROM read_parquet('{caminho}', file_row_number = true)"
+            )
+        self.tipos = dict(self._con.execute("SELECT column_name, column_type FROM (DESCRIBE posts)").fetchall())
+        self.columns = [c for c in self.tipos if c != "_ordem"]
+
+    # ----------------- execução -----------------
+    def _sql(self, sql, params=None):
+        with self._lock:
+            return self._con.cursor().execute(sql, params or []).df()
+
+    @property
+    def _coluna_dia(self):
+        # bases gravadas antes de post_dia_local só têm o instante UTC
+        return "post_dia_local" if "post_dia_local" in self.tipos else "post_date_resumo"
+
+    def _where(self, filtro):
+        """Traduz o filtro do relatório (datas e tipos de post) em WHERE + parâmetros."""
+        conds, params = [], []
+        filtro = filtro or {}
+        if filtro.get("date_start") and filtro.get("date_end"):
+            # dias inclusivos: [início, dia seguinte ao fim)
+            conds.append(f"{self._coluna_dia} >= ? AND {self._coluna_dia} < ?")
+            params += [
+                pd.to_datetime(filtro["date_start"]).to_pydatetime(),
+                (pd.to_datetime(filtro["date_end"]) + pd.Timedelta(days=1)).to_pydatetime(),
+            ]
+        if filtro.get("post_types"):
+            tipos = list(filtro["post_types"])
+            conds.append(f"post_type IN ({', '.join('?' * len(tipos))})")
+            params += tipos
+        return ("WHERE " + " AND ".join(conds)) if conds else "", params
+
+    # ----------------- metadados para os widgets -----------------
+    def limites_datas(self):
+        r = self._sql(f"SELECT min({self._coluna_dia}) AS ini, max({self._coluna_dia}) AS fim FROM posts")
+        return r["ini"].iloc[0], r["fim"].iloc[0]
+
+    def tipos_post(self):
+        r = self._sql("SELECT DISTINCT post_type FROM posts WHERE post_type IS NOT NULL")
+        return sorted(r["post_type"].tolist())
+
+    def contar(self, filtro=None):
+        where, params = self._where(filtro)
+        return int(self._sql(f"SELECT count(*) AS n FROM posts {where}", params)["n"].iloc[0])
+
+    def para_pandas(self, filtro=None, colunas=None):
+        """Materializa em pandas só as linhas filtradas (e as colunas pedidas)."""
+        where, params = self._where(filtro)
+        if colunas is None:
+            sel = "* EXCLUDE (_ordem)"
+        else:
+            sel = ", ".join(f'"{c}"' for c in colunas if c in self.tipos) or "NULL AS _vazio"
+        with self._lock:
+            tabela = self._con.cursor().execute(
+                f"SELECT {sel} FROM posts {where} ORDER BY _ordem", params
+            ).fetch_arrow_table()
+        return tabela_para_pandas(tabela, self._colunas_json)
+
+    # ----------------- expressões -----------------
+    def _expr_nao_vazio(self, col):
+        """Equivalente SQL de _nonempty_any; None se o tipo da coluna não for suportado."""
+        tipo = self.tipos.get(col)
+        c = f'"{col}"'
+        if tipo in _TIPOS_TEXTO:
+            return f"({c} IS NOT NULL AND trim({c}, '{_ESPACOS}') NOT IN ('', 'none', 'null'))"
+        if tipo in _TIPOS_NUMERICOS:
+            if tipo in ("DOUBLE", "FLOAT"):
+                return f"({c} IS NOT NULL AND NOT isnan({c}))"
+            return f"({c} IS NOT NULL)"
+        if tipo == "BOOLEAN":
+            return f"({c} IS NOT NULL)"
+        if tipo == "VARCHAR[]":
+            return (f"(coalesce(len(list_filter({c}, x -> x IS NOT NULL "
+                    f"AND trim(x, '{_ESPACOS}') <> '')), 0) > 0)")
+        if tipo == '"NULL"' or tipo is None:
+            return "FALSE"
+        return None
+
+    def _expr_inteiro(self, col):
+        """pd.to_numeric(errors='coerce').fillna(0).astype(int)."""
+        return f'coalesce(trunc(TRY_CAST("{col}" AS DOUBLE)), 0)'
+
+    def _expr_positivo(self, col):
+        """pd.to_numeric(errors='coerce').fillna(0) > 0."""
+        return f'(coalesce(TRY_CAST("{col}" AS DOUBLE), 0) > 0)'
+
+    # ----------------- contagens -----------------
+    def contagem_tipo_post(self, filtro=None):
+        where, params = self._where(filtro)
+        r = self._sql(f"""
+            SELECT post_type, count(*) AS "count", min(_ordem) AS _primeiro
+            FROM posts {where}
+            GROUP BY post_type
+            ORDER BY "count" DESC, _primeiro
+        """, params)
+        r = r.drop(columns="_primeiro")
+        r["count"] = r["count"].astype("int64")
+        r["percent"] = r["count"] / r["count"].sum() * 100
+        return r
+
+    def _contagem_tokens(self, tokens_sql, nome, filtro, params_extra=()):
+        """
+        Agrupa uma subconsulta (_ordem, _pos, token) em contagem desc, desempatando
+        pela primeira ocorrência -> (DataFrame [nome, 'count'], total).
+        """
+        where, params = self._where(filtro)
+        r = self._sql(f"""
+            WITH base AS (SELECT * FROM posts {where}),
+            tokens AS ({tokens_sql})
+            SELECT token AS "{nome}", count(*) AS "count", min(_ordem * 1000000 + _pos) AS _primeiro
+            FROM tokens
+            WHERE token IS NOT NULL
+            GROUP BY token
+            ORDER BY "count" DESC, _primeiro
+        """, params + list(params_extra))
+        r = r.drop(columns="_primeiro")
+        r["count"] = r["count"].astype("int64")
+        return r, int(r["count"].sum())
+
+    def contagem_objetos(self, filtro=None):
+        if self.tipos.get("imagem_objetos") not in _TIPOS_TEXTO:
+            return None
+        tokens_sql = f"""
+            SELECT _ordem, _pos, token FROM (
+                SELECT _ordem,
+                       unnest(generate_series(1, len(partes))) AS _pos,
+                       lower(trim(unnest(partes), '{_ESPACOS}')) AS token
+                FROM (SELECT _ordem, string_split(coalesce(imagem_objetos, ''), '/') AS partes FROM base)
+            ) WHERE token NOT IN ('', 'none', 'null')
+        """
+        return self._contagem_tokens(tokens_sql, "objeto", filtro)
+
+    def contagem_hashtags(self, filtro=None):
+        tipo = self.tipos.get("legenda_hashtags")
+        if tipo in _TIPOS_TEXTO:
+            partes = (f"CASE WHEN lower(trim(legenda_hashtags, '{_ESPACOS}')) IN ('', 'none', 'null') "
+                      f"OR legenda_hashtags IS NULL THEN []::VARCHAR[] "
+                      f"ELSE regexp_split_to_array(trim(legenda_hashtags, '{_ESPACOS}'), '[,\\s;/|]+') END")
+        elif tipo == "VARCHAR[]":
+            partes = "coalesce(legenda_hashtags, []::VARCHAR[])"
+        else:
+            return None
+        tokens_sql = f"""
+            SELECT _ordem, _pos, token FROM (
+                SELECT _ordem,
+                       unnest(generate_series(1, len(partes))) AS _pos,
+                       lower(trim(ltrim(trim(unnest(partes), '{_ESPACOS}'), '#'), '{_ESPACOS}')) AS token
+                FROM (SELECT _ordem, {partes} AS partes FROM base)
+            ) WHERE token <> ''
+        """
+        return self._contagem_tokens(tokens_sql, "hashtag", filtro)
+
+    def contagem_categorias(self, col, filtro=None, dedup_por_post=True):
+        """Equivalente SQL de _contagem_categorias (split por '/', 'Desconhecido' removido)."""
+        if col not in self.tipos:
+            return pd.DataFrame(columns=["categoria", "count"])
+        if self.tipos[col] not in _TIPOS_TEXTO:
+            return None
+        c = f'"{col}"'
+        # _split_por_barra: nulos/vazios viram ['Desconhecido']
+        partes = (f"CASE WHEN {c} IS NULL OR lower(trim({c}, '{_ESPACOS}')) IN ('', 'none', 'null', '[]') "
+                  f"THEN ['Desconhecido'] ELSE list_filter(list_transform(string_split(trim({c}, '{_ESPACOS}'), '/'), "
+                  f"t -> trim(t, '{_ESPACOS}')), t -> t <> '') END")
+        partes = f"CASE WHEN len({partes}) = 0 THEN ['Desconhecido'] ELSE {partes} END"
+        if dedup_por_post:
+            partes = f"list_sort(list_distinct({partes}))"
+        tokens_sql = f"""
+            SELECT _ordem, unnest(generate_series(1, len(partes))) AS _pos, unnest(partes) AS token
+            FROM (SELECT _ordem, {partes} AS partes FROM base)
+        """
+        r, _ = self._contagem_tokens(tokens_sql, "categoria", filtro)
+        return r[r["categoria"].str.strip().str.lower() != "desconhecido"]
+
+    # ----------------- KPIs -----------------
+    def kpis_parte01(self, filtro=None):
+        where, params = self._where(filtro)
+        exprs = ["count(*) AS total_posts"]
+        exprs.append(f"avg({self._expr_inteiro('imagem_face_presente')}) * 100 AS pct_faces"
+                     if "imagem_face_presente" in self.tipos else "0 AS pct_faces")
+        if "imagem_texto_presente" in self.tipos:
+            exprs.append(f"avg({self._expr_inteiro('imagem_texto_presente')}) * 100 AS pct_texto")
+        elif "imagem_texto_detectado" in self.tipos:
+            exprs.append(f"avg({self._expr_inteiro('imagem_texto_detectado')}) * 100 AS pct_texto")
+        elif "imagem_num_blocos_texto" in self.tipos:
+            exprs.append(f"avg({self._expr_positivo('imagem_num_blocos_texto')}::INT) * 100 AS pct_texto")
+        elif "imagem_texto_proporcao" in self.tipos:
+            exprs.append(f"avg({self._expr_positivo('imagem_texto_proporcao')}::INT) * 100 AS pct_texto")
+        else:
+            exprs.append("0 AS pct_texto")
+        r = self._sql(f"SELECT {', '.join(exprs)} FROM posts {where}", params).iloc[0]
+        return {
+            "total_posts": int(r["total_posts"]),
+            "pct_faces": float("nan") if pd.isna(r["pct_faces"]) else float(r["pct_faces"]),
+            "pct_texto": float("nan") if pd.isna(r["pct_texto"]) else float(r["pct_texto"]),
+        }
+
+    def kpis_parte02(self, filtro=None):
+        """% de posts com menções/hashtags/URLs/cupons; None se alguma coluna exigir o pandas."""
+        cup_leg = next((c for c in ["legenda_codigos_cupons", "legenda_codigos.cupons"] if c in self.tipos), None)
+        pares = {
+            "pct_mencoes": ("imagem_mencoes_ocr", "legenda_mencoes"),
+            "pct_hashtags": ("imagem_hashtags_ocr", "legenda_hashtags"),
+            "pct_urls": ("imagem_url_detectada", "legenda_urls"),
+            "pct_cupons": ("imagem_codigo_cupom", cup_leg),
+        }
+        exprs = []
+        for nome, (a, b) in pares.items():
+            ea = self._expr_nao_vazio(a) if a else "FALSE"
+            eb = self._expr_nao_vazio(b) if b else "FALSE"
+            if ea is None or eb is None:
+                return None
+            exprs.append(f"avg(({ea} OR {eb})::INT) * 100 AS {nome}")
+        where, params = self._where(filtro)
+        r = self._sql(f"SELECT {', '.join(exprs)} FROM posts {where}", params).iloc[0]
+        return {k: float("nan") if pd.isna(r[k]) else float(r[k]) for k in pares}
+
+
+class ConsultaDuckDB:
+    """
+    Base filtrada "preguiçosa": motor + filtro do relatório. Os painéis pedem as
+    contagens em SQL e só materializam em pandas as colunas que precisam.
+    Quando o tipo de uma coluna não tem equivalente em SQL, cai no caminho pandas.
+    """
+
+    def __init__(self, motor, filtro=None):
+        self.motor = motor
+        self.filtro = filtro or {}
+
+    @property
+    def columns(self):
+        return self.motor.columns
+
+    def __len__(self):
+        return self.motor.contar(self.filtro)
+
+    def para_pandas(self, colunas=None):
+        return self.motor.para_pandas(self.filtro, colunas)
+
+    def kpis_parte01(self):
+        return self.motor.kpis_parte01(self.filtro)
+
+    def kpis_parte02(self):
+        from painel.funcao.funcao_relatorio_macro import _kpis_parte02
+        r = self.motor.kpis_parte02(self.filtro)
+        if r is None:
+            r = _kpis_parte02(self.para_pandas())
+        return r
+
+    def contagem_tipo_post(self):
+        return self.motor.contagem_tipo_post(self.filtro)
+
+    def contagem_objetos(self):
+        from painel.funcao.funcao_relatorio_macro import _contagem_objetos
+        r = self.motor.contagem_objetos(self.filtro)
+        return r if r is not None else _contagem_objetos(self.para_pandas(["imagem_objetos"]))
+
+    def contagem_hashtags(self):
+        from painel.funcao.funcao_relatorio_macro import _contagem_hashtags
+        r = self.motor.contagem_hashtags(self.filtro)
+        return r if r is not None else _contagem_hashtags(self.para_pandas(["legenda_hashtags"]))
+
+    def contagem_categorias(self, col, dedup_por_post=True):
+        from painel.funcao.funcao_relatorio_macro import _contagem_categorias
+        r = self.motor.contagem_categorias(col, self.filtro, dedup_por_post)
+        return r if r is not None else _contagem_categorias(self.para_pandas([col]), col, dedup_por_post)
+
+
+# motores por arquivo de base (LRU, mesmo limite das bases do carregador):
+# caminho absoluto -> (assinatura, motor)
+_MOTORES = OrderedDict()
+_LOCK_MOTORES = threading.Lock()
+
+
+def obter_motor(caminho=CAMINHO_BASE_PADRAO, adaptador=None):
+    """
+    Retorna o motor DuckDB da base, reaproveitado entre reruns enquanto o
+    arquivo não mudar. Parquet é lido direto pelo DuckDB; JSON passa pelo
+    carregador (cache do processo), com o adaptador da marca.
+    """
+    caminho = os.path.abspath(caminho)
+    assinatura = _assinatura_arquivo(caminho)
+    with _LOCK_MOTORES:
+        entrada = _MOTORES.get(caminho)
+        if entrada is None or entrada[0] != assinatura:
+            origem = caminho if caminho.endswith(".parquet") else carregar_base(caminho, adaptador=adaptador)
+            entrada = _MOTORES[caminho] = (assinatura, MotorDuckDB(origem))
+        _MOTORES.move_to_end(caminho)
+        while len(_MOTORES) > max(1, MAX_BASES_EM_CACHE):
+            _MOTORES.popitem(last=False)
+        return entrada[1]
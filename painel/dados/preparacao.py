@@ -0,0 +1,59 @@
+import pandas as pd
+
+from painel.dados.datas import converter_post_date
+from painel.dados.esquema import CAMPOS_ANINHADOS
+from painel.dados.tipos import compactar_tipos
+from painel.instrumentacao import instrumentado
+
+
+def achatar_colunas_aninhadas(df, esquema=CAMPOS_ANINHADOS):
+    """
+    Expande as colunas de dicionário declaradas no esquema em
+    "<coluna>_<campo>", montando todas as subcolunas e concatenando uma vez só.
+    Valores que não são dict (None/NaN) viram None em todos os campos.
+    """
+    aninhadas = [c for c in df.columns if c in esquema]
+    if not aninhadas:
+        return df
+
+    novas = {}
+    for col in aninhadas:
+        registros = [v if isinstance(v, dict) else {} for v in df[col].tolist()]
+        for campo in esquema[col]:
+            novas[f"{col}_{campo}"] = [r.get(campo) for r in registros]
+
+    expandido = pd.DataFrame(novas, index=df.index)
+    return pd.concat([df.drop(columns=aninhadas), expandido], axis=1)
+
+
+@instrumentado("achatamento")
+def preparar_base(df, adaptador=None, compactar=True):
+    """
+    Filtra, renomeia e achata as colunas de dicionário da base bruta.
+    `adaptador` (opcional) leva a exportação de outra marca para o esquema da farm.
+    Com `compactar`, as colunas passam para os tipos compactos de painel.dados.tipos.
+    """
+    if adaptador is not None:
+        df = adaptador(df)
+
+    # Filtrar casos que post_type não é NaN
+    df = df[df['post_type'].notna()].copy()
+
+    # Renomear as categorias do post_type
+    df['post_type'] = df['post_type'].replace({
+        'carousel_container': 'Carrossel',
+        'feed': 'Feed',
+        'clips': 'Reels',
+    })
+
+    # Transformar as colunas de dicionário (esquema declarado) em colunas separadas
+    df = achatar_colunas_aninhadas(df)
+
+    # post_date é interpretada só aqui: instante UTC + dia local (painel.dados.datas)
+    df['post_date_resumo'], df['post_dia_local'] = converter_post_date(df['post_date'])
+
+    if compactar:
+        df = compactar_tipos(df)
+
+    # índice posicional: as estruturas pré-calculadas (tokens) são indexadas por linha
+    return df.reset_index(drop=True)
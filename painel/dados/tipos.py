@@ -0,0 +1,296 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_float_dtype, is_integer_dtype, is_string_dtype
+
+# Plano de tipos compactos aplicado na ingestão (preparar_base). A base chega
+# do JSON com quase tudo em float64 (flags 0/1, contagens, pontuações) e texto;
+# o plano é inferido coluna a coluna, então vale para qualquer marca:
+# - números inteiros (flags 0/1, contagens, tokens) -> menor inteiro que cabe
+#   (uint8, int16, ...), ou o inteiro anulável (UInt8, ...) se houver nulos;
+# - pontuações/proporções (não inteiras, |x| < 2**24) -> float32;
+# - texto com poucos valores distintos (tipo de post, idioma, modelo,
+#   intenção, categoria...) -> Categorical, que o Parquet grava como dicionário.
+# Identificadores, datas, bool e colunas de listas/dicts ficam como estão; as
+# chaves (COLUNAS_FIXAS) só passam a int64 (Int64 com nulos), nunca a float.
+# O plano sai de um ResumoTipos, que também pode ser acumulado lote a lote:
+# a base lida em lotes recebe o mesmo plano da base lida de uma vez.
+
+# chaves de junção com a exportação: não são compactadas, só mantidas inteiras
+COLUNAS_FIXAS = ("post_pk",)
+
+# texto vira Categorical quando os valores distintos são no máximo esta fração dos não nulos
+FRACAO_CATEGORIA = float(os.environ.get("IA_FARM_FRACAO_CATEGORIA", "0.5"))
+
+# maior |x| que o float32 representa sem perder a parte inteira
+_LIMITE_FLOAT32 = 2 ** 24
+
+# float64 exato mais próximo dos limites do int64 (o máximo, 2**63 - 1, arredonda para 2**63)
+_LIMITES_INT64 = (-(2 ** 63), 2 ** 63 - 1024)
+
+_INTEIROS = [np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32, np.uint64, np.int64]
+# inteiro do numpy -> inteiro anulável do pandas (para colunas com nulos)
+_ANULAVEIS = {np.dtype(t): pd.api.types.pandas_dtype(np.dtype(t).name.replace("u", "U").replace("i", "I"))
+              for t in _INTEIROS}
+
+
+def _menor_inteiro(minimo, maximo):
+    for tipo in _INTEIROS:
+        info = np.iinfo(tipo)
+        if info.min <= minimo and maximo <= info.max:
+            return np.dtype(tipo)
+    return None
+
+
+def _eh_numerico(tipo):
+    return is_bool_dtype(tipo) or is_integer_dtype(tipo) or is_float_dtype(tipo)
+
+
+def _eh_texto(tipo):
+    return isinstance(tipo, pd.CategoricalDtype) or (is_string_dtype(tipo) and not is_bool_dtype(tipo))
+
+
+def _tipo_numpy(tipo):
+    return tipo.numpy_dtype if isinstance(tipo, pd.api.extensions.ExtensionDtype) else np.dtype(tipo)
+
+
+def _tipo_texto(s):
+    """Categorical para texto de baixa cardinalidade; None para texto livre ou objetos mistos."""
+    valores = s.dropna()
+    if len(valores) == 0:
+        return None
+    if not is_string_dtype(s.dtype) or (s.dtype == object and not all(isinstance(v, str) for v in valores)):
+        return None
+    if valores.nunique() > FRACAO_CATEGORIA * len(valores):
+        return None
+    return "category"
+
+
+class _ResumoColuna:
+    __slots__ = ("tipos", "tipos_nulos", "nulos", "nao_nulos", "minimo", "maximo", "maior_abs",
+                 "inteiros", "so_texto", "distintos")
+
+    def __init__(self, nulos):
+        self.tipos = []        # dtype dos lotes em que a coluna tem valores
+        self.tipos_nulos = []  # dtype dos lotes em que ela só tem nulos (ou não existe)
+        self.nulos = nulos
+        self.nao_nulos = 0
+        self.minimo = self.maximo = self.maior_abs = None
+        self.inteiros = True   # todos os números são inteiros
+        self.so_texto = True   # todos os valores de texto/object são str
+        self.distintos = set()  # hash de cada texto distinto
+
+    def atualizar(self, s):
+        valores = s.dropna()
+        self.nulos += len(s) - len(valores)
+        self.nao_nulos += len(valores)
+        if len(valores) == 0:
+            self.tipos_nulos.append(s.dtype)
+            return
+        if s.dtype not in self.tipos:
+            self.tipos.append(s.dtype)
+        if _eh_numerico(s.dtype):
+            v = valores.to_numpy()
+            if is_bool_dtype(s.dtype):
+                v = v.astype(np.int8)
+            minimo, maximo, maior_abs = v.min(), v.max(), np.abs(v).max()
+            self.minimo = minimo if self.minimo is None else min(self.minimo, minimo)
+            self.maximo = maximo if self.maximo is None else max(self.maximo, maximo)
+            self.maior_abs = maior_abs if self.maior_abs is None else max(self.maior_abs, maior_abs)
+            if self.inteiros and is_float_dtype(s.dtype):
+                self.inteiros = bool(np.array_equal(v, np.trunc(v)))
+        elif _eh_texto(s.dtype) and self.so_texto:
+            # partes já compactadas (Categorical) entram pelos valores, como texto
+            brutos = valores.cat.categories if isinstance(s.dtype, pd.CategoricalDtype) else valores
+            if brutos.dtype == object and not all(isinstance(v, str) for v in brutos):
+                self.so_texto = False
+                self.distintos = set()
+            else:
+                self.distintos.update(pd.util.hash_array(valores.to_numpy(dtype=object)).tolist())
+
+    def plano(self, col):
+        """Tipo da coluna na base inteira (o compacto, quando há ganho), ou None para deixá-la como está."""
+        if not self.tipos:
+            return None
+        if all(_eh_numerico(t) for t in self.tipos) and not all(is_bool_dtype(t) for t in self.tipos):
+            # tipo que a coluna teria lida de uma vez: inteiro com nulos vira float64
+            base = np.result_type(*[_tipo_numpy(t) for t in self.tipos])
+            if self.nulos and base.kind in "biu":
+                base = np.dtype(np.float64)
+            if col in COLUNAS_FIXAS:
+                # chave: int64 (Int64 com nulos), nunca float
+                cabe = self.inteiros and _LIMITES_INT64[0] <= self.minimo and self.maximo <= _LIMITES_INT64[1]
+                inteiro = np.dtype(np.int64) if cabe else None
+            else:
+                inteiro = _menor_inteiro(self.minimo, self.maximo) if self.inteiros else None
+            if inteiro is not None:
+                tipo = _ANULAVEIS[inteiro] if self.nulos else inteiro
+            elif col not in COLUNAS_FIXAS and base == np.float64 and self.maior_abs < _LIMITE_FLOAT32:
+                tipo = np.dtype(np.float32)
+            else:
+                tipo = None
+        elif all(_eh_texto(t) for t in self.tipos):
+            if not self.so_texto:
+                base = np.dtype(object)
+            else:
+                textos = [t for t in self.tipos if t != object and not isinstance(t, pd.CategoricalDtype)]
+                # só Categorical (partes já compactadas) que deixam de ser categoria voltam a str
+                base = textos[0] if textos else (pd.api.types.pandas_dtype("str") if object not in self.tipos
+                                                 else np.dtype(object))
+            categoria = self.so_texto and len(self.distintos) <= FRACAO_CATEGORIA * self.nao_nulos
+            tipo = "category" if categoria and col not in COLUNAS_FIXAS else None
+        else:
+            return None
+        if tipo is None and any(t != base for t in self.tipos + self.tipos_nulos):
+            # sem ganho, mas os lotes discordam: todos passam para o tipo da base inteira
+            tipo = base
+        return tipo
+
+
+class ResumoTipos:
+    """
+    O que o plano de tipos precisa saber de cada coluna (tipos, nulos, faixa
+    numérica, se os números são inteiros, textos distintos), acumulado lote a
+    lote. Uma coluna que falta num lote conta como nula nele.
+    """
+
+    __slots__ = ("linhas", "_colunas")
+
+    def __init__(self):
+        self.linhas = 0
+        self._colunas = {}  # coluna -> _ResumoColuna, na ordem em que apareceu
+
+    @classmethod
+    def de_base(cls, df):
+        resumo = cls()
+        resumo.atualizar(df)
+        return resumo
+
+    @property
+    def colunas(self):
+        return list(self._colunas)
+
+    def reordenar(self, colunas):
+        """Passa a listar as colunas nesta ordem (as que não estão nela vão para o fim)."""
+        ordem = dict.fromkeys(c for c in colunas if c in self._colunas)
+        ordem.update(dict.fromkeys(self._colunas))
+        self._colunas = {c: self._colunas[c] for c in ordem}
+
+    def atualizar(self, df):
+        for col in df.columns:
+            resumo = self._colunas.get(col)
+            if resumo is None:
+                resumo = self._colunas[col] = _ResumoColuna(self.linhas)
+                if self.linhas:
+                    resumo.tipos_nulos.append(np.dtype(np.float64))
+            resumo.atualizar(df[col])
+        presentes = set(df.columns)
+        for col, resumo in self._colunas.items():
+            if col not in presentes:
+                resumo.nulos += len(df)
+                resumo.tipos_nulos.append(np.dtype(np.float64))
+        self.linhas += len(df)
+
+    def plano(self):
+        """Tipo final de cada coluna que muda -> {coluna: dtype} (o plano de compactar_tipos)."""
+        plano = {}
+        for col, resumo in self._colunas.items():
+            tipo = resumo.plano(col)
+            if tipo is not None:
+                plano[col] = tipo
+        return plano
+
+
+def plano_tipos(df):
+    """Tipo compacto de cada coluna que ganha com a troca -> {coluna: dtype}."""
+    return {c: t for c, t in ResumoTipos.de_base(df).plano().items() if t != df[c].dtype}
+
+
+def compactar_tipos(df, plano=None):
+    """
+    Aplica o plano de tipos (inferido de df se não for dado) -> novo DataFrame.
+    Com o plano de um ResumoTipos de vários lotes, todo lote sai com os mesmos tipos.
+    """
+    plano = plano_tipos(df) if plano is None else plano
+    plano = {c: t for c, t in plano.items() if c in df.columns and t != df[c].dtype}
+    if not plano:
+        return df
+    vazias = [c for c in plano if not df[c].notna().any()]
+    if vazias:
+        # coluna só com nulos: passa por object, senão a Categorical teria categorias float
+        df = df.assign(**{c: pd.Series(None, index=df.index, dtype=object) for c in vazias})
+    return df.astype(plano)
+
+
+def unificar_tipos(frames):
+    """
+    Partes de uma mesma base com o mesmo plano de tipos: o ResumoTipos das
+    partes juntas (já compactadas ou não) aplicado a cada uma, com as mesmas
+    colunas. Os tipos não dependem de como a base foi dividida.
+    """
+    resumo = ResumoTipos()
+    for f in frames:
+        resumo.atualizar(f)
+    plano = resumo.plano()
+    return [compactar_tipos(f.reindex(columns=resumo.colunas), plano) for f in frames]
+
+
+def concatenar(frames):
+    """
+    pd.concat que preserva as colunas Categorical: as categorias das partes são
+    unidas antes (com categorias diferentes o pandas voltaria para object). Se
+    em alguma parte a coluna não for texto (ex.: listas), ela fica object.
+    """
+    categoricas = {
+        col for f in frames for col in f.columns if isinstance(f[col].dtype, pd.CategoricalDtype)
+    }
+    for col in categoricas:
+        categorias = pd.Index([])
+        for f in frames:
+            if col in f.columns:
+                s = f[col]
+                if isinstance(s.dtype, pd.CategoricalDtype):
+                    novas = s.cat.categories
+                elif _tipo_texto(s.astype(object)) is not None or s.isna().all():
+                    novas = pd.Index(s.dropna().unique())
+                else:
+                    categorias = None
+                    break
+                categorias = categorias.union(novas, sort=False)
+        tipo = object if categorias is None else pd.CategoricalDtype(categorias)
+        frames = [f.astype({col: tipo}) if col in f.columns else f for f in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def relatorio_bytes(antes, depois):
+    """Bytes por coluna antes/depois da compactação, das colunas que mais encolheram para as que menos."""
+    bytes_antes = antes.memory_usage(deep=True, index=False)
+    bytes_depois = depois.memory_usage(deep=True, index=False)
+    r = pd.DataFrame({
+        "tipo_antes": antes.dtypes.astype(str),
+        "tipo_depois": depois.dtypes.astype(str),
+        "bytes_antes": bytes_antes,
+        "bytes_depois": bytes_depois.reindex(bytes_antes.index),
+    })
+    r["economia"] = r["bytes_antes"] - r["bytes_depois"]
+    r = r.sort_values("economia", ascending=False, kind="stable")
+    r.loc["TOTAL"] = ["", "", r["bytes_antes"].sum(), r["bytes_depois"].sum(), r["economia"].sum()]
+    return r.rename_axis("coluna")
+
+
+if __name__ == "__main__":
+    # uso: python -m painel.dados.tipos <base.json>
+    if len(sys.argv) != 2:
+        print("uso: python -m painel.dados.tipos <base.json>")
+        sys.exit(1)
+    from painel.dados.preparacao import preparar_base
+
+    antes = preparar_base(pd.read_json(sys.argv[1]), compactar=False)
+    r = relatorio_bytes(antes, compactar_tipos(antes))
+    with pd.option_context("display.max_rows", None, "display.max_columns", None, "display.width", 200):
+        print(r)
+    total = r.loc["TOTAL"]
+    print(f"\n{total['bytes_antes'] / 1e6:.1f} MB -> {total['bytes_depois'] / 1e6:.1f} MB "
+          f"({total['bytes_depois'] / total['bytes_antes']:.0%})")
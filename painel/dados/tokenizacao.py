@@ -0,0 +1,135 @@
+import re
+import json
+import unicodedata
+
+import pandas as pd
+
+# Parsers das colunas de texto/lista da base: cada um transforma o valor bruto
+# de uma célula na lista de tokens normalizados usada pelas contagens.
+
+
+def _split_hashtags(val):
+    # None / NaN
+    if val is None or (isinstance(val, float) and pd.isna(val)):
+        return []
+
+    # Se for lista, normaliza item a item
+    if isinstance(val, list):
+        items = val
+    else:
+        # Trata como string; separa por espaços, vírgulas, ponto-e-vírgula, '/', '|' e quebras de linha
+        s = str(val).strip()
+        if s == "" or s.lower() in ("none", "null"):
+            return []
+        items = re.split(r"[,\s;/|]+", s)
+
+    # Normaliza: remove '#' duplicado, espaços, caixa-baixa
+    norm = []
+    for it in items:
+        tag = str(it).strip()
+        if not tag:
+            continue
+        tag = tag.lstrip("#").strip()   # remove '#' à esquerda
+        if not tag:
+            continue
+        tag = tag.lower()
+        norm.append(tag)
+    return norm
+
+
+def _norm_txt(s: str) -> str:
+    if s is None:
+        return ""
+    s = str(s).strip().lower()
+    # remove acentos
+    s = "".join(ch for ch in unicodedata.normalize("NFD", s) if not unicodedata.combining(ch))
+    return s
+
+
+def _parse_emocoes(val):
+    """Aceita None, lista, ou string estilo '[alegria, urgencia]' e retorna lista normalizada."""
+    if val is None or (isinstance(val, float) and pd.isna(val)):
+        return []
+
+    # já é lista?
+    if isinstance(val, list):
+        items = val
+    else:
+        s = str(val).strip()
+        if s in ("", "none", "null"):
+            return []
+        # tenta JSON
+        try:
+            parsed = json.loads(s)
+            if isinstance(parsed, list):
+                items = parsed
+            elif isinstance(parsed, str):
+                items = [parsed]
+            else:
+                # cai no split manual
+                items = re.split(r"[,\;/|]+", s.strip("[]"))
+        except Exception:
+            # split manual
+            items = re.split(r"[,\;/|]+", s.strip("[]"))
+
+    # normalização + mapa de equivalências (ex.: 'urgencia' -> 'urgência')
+    MAP = {
+        "urgencia": "urgência",
+        "exclusividade": "exclusividade",
+        "entusiasmo": "entusiasmo",
+        "alegria": "alegria",
+        "ansiedade": "ansiedade",
+        "medo": "medo",
+        "tristeza": "tristeza",
+        "raiva": "raiva",
+        "surpresa": "surpresa",
+        # adicione outros se aparecerem
+    }
+
+    out = []
+    for it in items:
+        t = _norm_txt(it)
+        if not t:
+            continue
+        # remove aspas remanescentes
+        t = t.strip("'\" ")
+        # aplica mapa (com acento “bonitinho” quando conhecido)
+        out.append(MAP.get(t, t))
+    return out
+
+
+def _split_objetos(val):
+    """Divide imagem_objetos por '/', em caixa-baixa, sem vazios/'none'/'null'."""
+    s = "" if val is None or (isinstance(val, float) and pd.isna(val)) else str(val)
+    return [
+        t.strip().lower()
+        for t in s.split("/")
+        if t and t.strip().lower() not in ("", "none", "null")
+    ]
+
+
+def _split_por_barra(val):
+    """Divide por '/', trata None/NaN/'none'/'null' como ['Desconhecido'].
+       Aceita também lista (cada item pode conter '/')."""
+    if val is None or (isinstance(val, float) and pd.isna(val)):
+        return ["Desconhecido"]
+    if isinstance(val, list):
+        tokens = []
+        for v in val:
+            if v is None: 
+                continue
+            for t in str(v).split("/"):
+                t = t.strip()
+                if t:
+                    tokens.append(t)
+        return tokens if tokens else ["Desconhecido"]
+    s = str(val).strip()
+    if s == "" or s.lower() in {"none", "null", "[]"}:
+        return ["Desconhecido"]
+    parts = [t.strip() for t in s.split("/") if t.strip() != ""]
+    return parts if parts else ["Desconhecido"]
+
+
+def _split_por_barra_dedup(val):
+    """_split_por_barra sem repetição no mesmo post (ordenado)."""
+    return sorted(set(_split_por_barra(val)))
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+from painel.dados.tokenizacao import (
+    _split_hashtags,
+    _parse_emocoes,
+    _split_objetos,
+    _split_por_barra_dedup,
+)
+
+# Colunas tokenizadas na carga da base e o parser de cada uma. As colunas de
+# categorias já guardam os tokens sem repetição por post, como em
+# _contagem_categorias(dedup_por_post=True).
+COLUNAS_TOKENIZADAS = {
+    "legenda_hashtags": _split_hashtags,
+    "legenda_sentimento_emocoes": _parse_emocoes,
+    "imagem_objetos": _split_objetos,
+    "legenda_topicos": _split_por_barra_dedup,
+    "legenda_gatilhos": _split_por_barra_dedup,
+    "legenda_cta": _split_por_barra_dedup,
+    "imagem_topicos": _split_por_barra_dedup,
+    "imagem_gatilhos": _split_por_barra_dedup,
+    "imagem_cta_tipo": _split_por_barra_dedup,
+}
+
+
+class ColunaTokens:
+    """
+    Coluna de listas de tokens em layout CSR: vocabulário + offsets por post +
+    ids dos tokens. Os tokens do post i são ids[offsets[i]:offsets[i + 1]].
+    """
+
+    __slots__ = ("vocab", "offsets", "ids")
+
+    def __init__(self, vocab, offsets, ids):
+        self.vocab = np.asarray(vocab, dtype=object)
+        self.offsets = offsets
+        self.ids = ids
+
+    @classmethod
+    def de_listas(cls, listas):
+        """Monta a coluna a partir de uma lista de listas de tokens (um item por post)."""
+        indice = {}
+        ids = []
+        offsets = np.zeros(len(listas) + 1, dtype=np.int64)
+        for i, tokens in enumerate(listas):
+            for t in tokens:
+                ids.append(indice.setdefault(t, len(indice)))
+            offsets[i + 1] = len(ids)
+        return cls(list(indice), offsets, np.asarray(ids, dtype=np.int32))
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.ids.nbytes
+
+    def selecionar(self, linhas):
+        """Nova coluna só com as linhas pedidas (mesmo vocabulário)."""
+        linhas = np.asarray(linhas, dtype=np.int64)
+        tamanhos = self.offsets[linhas + 1] - self.offsets[linhas]
+        offsets = np.zeros(len(linhas) + 1, dtype=np.int64)
+        np.cumsum(tamanhos, out=offsets[1:])
+        return ColunaTokens(self.vocab, offsets, self._ids_das_linhas(linhas))
+
+    def estender(self, listas):
+        """Nova coluna com os posts de listas acrescentados ao final (vocabulário estendido)."""
+        indice = {t: i for i, t in enumerate(self.vocab)}
+        novos_ids = []
+        offsets = np.empty(len(listas), dtype=np.int64)
+        for i, tokens in enumerate(listas):
+            for t in tokens:
+                novos_ids.append(indice.setdefault(t, len(indice)))
+            offsets[i] = len(novos_ids)
+        return ColunaTokens(
+            list(indice),
+            np.concatenate([self.offsets, self.offsets[-1] + offsets]),
+            np.concatenate([self.ids, np.asarray(novos_ids, dtype=np.int32)]),
+        )
+
+    def _ids_das_linhas(self, linhas):
+        """Ids dos tokens das linhas pedidas (posições), na ordem das linhas."""
+        if linhas is None:
+            return self.ids
+        linhas = np.asarray(linhas, dtype=np.int64)
+        inicios = self.offsets[linhas]
+        tamanhos = self.offsets[linhas + 1] - inicios
+        total = int(tamanhos.sum())
+        if total == 0:
+            return self.ids[:0]
+        # posição de cada token: início da sua linha + deslocamento dentro dela
+        saltos = np.repeat(inicios - (np.cumsum(tamanhos) - tamanhos), tamanhos)
+        return self.ids[saltos + np.arange(total)]
+
+    def contagem(self, linhas=None, nome="token"):
+        """
+        Conta os tokens das linhas com np.bincount -> (DataFrame [nome, 'count'], total).
+        Ordena por contagem desc e, no empate, pela primeira ocorrência (como o
+        value_counts depois do explode).
+        """
+        sel = self._ids_das_linhas(linhas)
+        if len(sel) == 0:
+            return pd.DataFrame({nome: pd.Series(dtype=object), "count": pd.Series(dtype="int64")}), 0
+
+        cont = np.bincount(sel, minlength=len(self.vocab))
+        presentes, primeiro = np.unique(sel, return_index=True)
+        ordem = np.lexsort((primeiro, -cont[presentes]))
+        ids_ord = presentes[ordem]
+        return (
+            pd.DataFrame({nome: self.vocab[ids_ord], "count": cont[ids_ord].astype("int64")}),
+            int(len(sel)),
+        )
+
+
+def tokenizar_base(df, colunas=COLUNAS_TOKENIZADAS):
+    """Tokeniza (uma vez) as colunas de lista/categoria presentes na base."""
+    return {
+        col: ColunaTokens.de_listas([parser(v) for v in df[col].tolist()])
+        for col, parser in colunas.items()
+        if col in df.columns
+    }
+
+
+def atualizar_tokens(tokens, manter, novos, colunas=COLUNAS_TOKENIZADAS):
+    """
+    Tokens da base depois de uma ingestão incremental: mantém as linhas
+    `manter` (posições) e tokeniza só os posts novos, acrescentados ao final.
+    """
+    def _valores(col):
+        return novos[col].tolist() if col in novos.columns else [None] * len(novos)
+
+    return {
+        col: tokens[col].selecionar(manter).estender([colunas[col](v) for v in _valores(col)])
+        for col in tokens
+    }
@@ -1,50 +1,90 @@
-from PIL import Image
 import streamlit as st
 import pandas as pd
-import re
-import ast
+import numpy as np
 
-def app_filtro_relatorio_macro():
+from painel.dados.carregador import (
+    obter_cubo,
+    obter_indice_datas,
+    recorte_compartilhado,
+    referenciar_base,
+    referenciar_recorte,
+)
+from painel.dados.datas import dias_locais
+from painel.dados.marcas import MARCAS, MARCA_PADRAO, caminho_marca, carregar_marca, marcas_disponiveis
+from painel.dados.motor_duckdb import MOTOR_PADRAO, ConsultaDuckDB, obter_motor
+from painel.instrumentacao import instrumentado
+
+def _escolher_marca():
+    """Marca do relatório: seletor quando há mais de uma base disponível."""
+    disponiveis = marcas_disponiveis()
+    if MARCA_PADRAO not in disponiveis:
+        aviso = (f"Base da marca padrão ({MARCAS[MARCA_PADRAO]['nome']}) não encontrada em "
+                 f"'{caminho_marca(MARCA_PADRAO)}' (ajuste IA_FARM_BASE_{MARCA_PADRAO.upper()}).")
+        if not disponiveis:
+            st.error(aviso)
+            st.stop()
+        st.warning(aviso)
+    if len(disponiveis) == 1:
+        return disponiveis[0]
+    return st.selectbox(
+        "Marca",
+        disponiveis,
+        index=disponiveis.index(MARCA_PADRAO) if MARCA_PADRAO in disponiveis else 0,
+        format_func=lambda m: MARCAS[m]["nome"],
+        key="marca_relatorio_macro",
+    )
 
-    # importar a base em formato json base_farm_json atualizada
-    df = pd.read_json('data/base_farm_json.json')
-
-    # Filtrar casos que post_type não é NaN
-    df = df[df['post_type'].notna()]
-
-    # Renomear as categorias do post_type
-    df['post_type'] = df['post_type'].replace({
-        'carousel_container': 'Carrossel',
-        'feed': 'Feed',
-        'clips': 'Reels'
-    })
-
-    # Identificar variáveis que estão em formato de dicionário {}
-    dict_columns = df.columns[df.applymap(lambda x: isinstance(x, dict)).any()]
-
-    # Quero pegar todas as colunas que são em formato de dicionário(dict_columns) e transformar em colunas separadas
-    for col in dict_columns:
-        # Expandir a coluna de dicionário em colunas separadas
-        dict_expanded = df[col].apply(pd.Series)
-        
-        # Renomear as novas colunas para evitar conflitos
-        dict_expanded = dict_expanded.add_prefix(f'{col}_')
-        
-        # Concatenar as novas colunas ao DataFrame original
-        df = pd.concat([df, dict_expanded], axis=1)
-        
-        # Remover a coluna original de dicionário
-        df = df.drop(columns=[col])
-
-    df['post_date_resumo'] = pd.to_datetime(df['post_date'], format='%Y-%m-%dT%H:%M:%S.%fZ')
+def _app_filtro_duckdb(marca):
+    """Mesmo filtro do relatório, respondido pelo motor DuckDB (sem carregar a base no pandas)."""
+    motor = obter_motor(caminho_marca(marca), MARCAS[marca]["adaptador"])
 
     with st.expander("Filtros"):
         c1, c2 = st.columns(2)
 
         # 1) Filtro de datas
-        if df["post_date_resumo"].notna().any():
-            min_date = df["post_date_resumo"].min().date()
-            max_date = df["post_date_resumo"].max().date()
+        min_ts, max_ts = motor.limites_datas()
+        if pd.notna(min_ts):
+            min_date = min_ts.date()
+            max_date = max_ts.date()
+            date_start, date_end = c1.slider(
+                "Período de publicação",
+                min_value=min_date,
+                max_value=max_date,
+                value=(min_date, max_date),
+                format="DD/MM/YYYY",
+            )
+        else:
+            date_start = date_end = None
+            c1.info("Sem datas válidas em 'post_date'.")
+
+        # 2) Filtro por tipo de post
+        post_types = motor.tipos_post()
+        post_type_sel = c2.multiselect("Tipo de Publicação", post_types, default=post_types)
+
+    filtro = {
+        "date_start": date_start,
+        "date_end": date_end,
+        "post_types": post_type_sel if post_types else None,
+    }
+    return _recorte_memoizado(motor, filtro, lambda chave: ConsultaDuckDB(motor, filtro))
+
+def app_filtro_relatorio_macro():
+
+    # a base da marca só é lida na 1ª vez em que alguém a escolhe
+    marca = _escolher_marca()
+
+    if MOTOR_PADRAO == "duckdb":
+        return _app_filtro_duckdb(marca)
+
+    # base achatada, reaproveitada entre reruns (cache por processo)
+    df = carregar_marca(marca)
+
+    with st.expander("Filtros"):
+        c1, c2 = st.columns(2)
+
+        # 1) Filtro de datas (limites = 1º e último dia local do índice da base)
+        min_date, max_date = _limites_datas(df)
+        if min_date is not None:
             date_start, date_end = c1.slider(
                 "Período de publicação",
                 min_value=min_date,
@@ -60,18 +100,90 @@ def app_filtro_relatorio_macro():
         post_types = sorted(df["post_type"].dropna().unique().tolist()) if "post_type" in df.columns else []
         post_type_sel = c2.multiselect("Tipo de Publicação", post_types, default=post_types)
 
-    # =========================
-    # Aplicar filtros
-    # =========================
-    base_filtrada = df.copy()
+    filtro = {
+        "date_start": date_start,
+        "date_end": date_end,
+        "post_types": post_type_sel if post_types else None,
+    }
+    return _recorte_memoizado(df, filtro, lambda chave: _recorte_compartilhado(df, filtro, chave))
+
+def _limites_datas(df):
+    """(primeiro, último) dia local com posts, ou (None, None) se não houver datas."""
+    indice = obter_indice_datas(df)
+    if indice is not None:
+        return indice.limites()
+    dias = dias_locais(df)
+    dias = dias[~np.isnat(dias)]
+    if len(dias) == 0:
+        return None, None
+    return dias.min().item(), dias.max().item()
+
+def _recorte_memoizado(base, filtro, recortar):
+    """
+    Recorte da última execução quando base e filtro não mudaram: reruns que não
+    mexem nos filtros devolvem o mesmo objeto e as seções reaproveitam o que já
+    calcularam para ele.
+    """
+    chave = (filtro["date_start"], filtro["date_end"],
+             None if filtro["post_types"] is None else tuple(filtro["post_types"]))
+    anterior = st.session_state.get("_recorte_relatorio_macro")
+    if anterior is not None and anterior[0] is base and anterior[1] == chave:
+        return anterior[2]
+    recorte = recortar(chave)
+    st.session_state["_recorte_relatorio_macro"] = (base, chave, recorte)
+    return recorte
+
+def _recorte_compartilhado(df, filtro, chave):
+    """
+    Recorte vindo do armazém do processo: sessões com a mesma base e o mesmo
+    filtro usam o mesmo DataFrame. A sessão segura a base e o recorte atuais
+    (não são despejados enquanto ela existir) e solta os anteriores.
+    """
+    recorte = recorte_compartilhado(df, chave, lambda: _aplicar_filtros(df, filtro))
+    referencias = [r for r in (referenciar_base(df), referenciar_recorte(df, chave)) if r is not None]
+    for ref in st.session_state.get("_referencias_relatorio_macro", ()):
+        ref.liberar()
+    st.session_state["_referencias_relatorio_macro"] = referencias
+    return recorte
+
+@instrumentado("filtro")
+def _aplicar_filtros(df, filtro):
+    # uma única máscara sobre a base em cache (que é só leitura): o recorte é
+    # materializado uma vez e, sem filtro efetivo, vira uma visão rasa da base
+    date_start, date_end, post_type_sel = filtro["date_start"], filtro["date_end"], filtro["post_types"]
+    mascara = np.ones(len(df), dtype=bool)
 
     if date_start and date_end:
-        base_filtrada = base_filtrada[
-            (base_filtrada["post_date_resumo"] >= pd.to_datetime(date_start))
-            & (base_filtrada["post_date_resumo"] <= pd.to_datetime(date_end) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1))
-        ]
+        # período em dias locais: busca binária no índice da base (linhas de df = posições na base)
+        indice = obter_indice_datas(df)
+        if indice is not None:
+            mascara &= indice.mascara(date_start, date_end, None if len(df) == indice.tamanho else df.index)
+        else:
+            dias = dias_locais(df)
+            mascara &= (dias >= np.datetime64(pd.Timestamp(date_start).date(), "D")) & (
+                dias <= np.datetime64(pd.Timestamp(date_end).date(), "D")
+            )
+
+    if post_type_sel:
+        mascara &= df["post_type"].isin(post_type_sel).to_numpy()
+
+    # copy(deep=False) não duplica os dados (copy-on-write) e isola os attrs da base
+    base_filtrada = df.copy(deep=False) if mascara.all() else df[mascara]
 
-    if post_types and post_type_sel:
-        base_filtrada = base_filtrada[base_filtrada["post_type"].isin(post_type_sel)]
+    _marcar_recorte_do_cubo(base_filtrada, df, filtro)
+    return base_filtrada
 
-    return base_filtrada
\ No newline at end of file
+def _marcar_recorte_do_cubo(base_filtrada, df, filtro):
+    """
+    Guarda em attrs os grupos do cubo diário que correspondem ao filtro, para os
+    painéis somarem o rollup em vez de varrer os posts. Só marca quando o cubo
+    reproduz exatamente o recorte (mesma quantidade de posts).
+    """
+    cubo = obter_cubo(df)
+    if cubo is None:
+        return
+    grupos = cubo.grupos(**filtro)
+    if cubo.total_posts(grupos) != len(base_filtrada):
+        return
+    # dict novo: attrs pode ser compartilhado com a base em cache
+    base_filtrada.attrs = {**base_filtrada.attrs, "ia_farm_cubo": (grupos, len(base_filtrada))}
@@ -1,37 +1,29 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import networkx as nx
-import matplotlib.pyplot as plt
-from collections import Counter
-import re
-from wordcloud import WordCloud, STOPWORDS
+import os
 import json
-import unicodedata
+import textwrap
+import warnings
 from html import escape
 
+from painel.dados.motor_duckdb import ConsultaDuckDB
+from painel.dados.carregador import obter_tokens, obter_contexto, obter_cubo
+from painel.dados.esquema import CONTEXT_FARM_COLS
+from painel.dados.bitset import _series_to_bool
+from painel.dados.tokenizacao import _split_hashtags, _parse_emocoes, _split_objetos, _split_por_barra
+from painel.dados.kpis import calcular_kpis
+from painel.funcao.graficos import grafico_barras, rotulo_contagem, rotulo_contagem_percentual, rotulo_percentual
+from painel.imagens.miniaturas import MINIATURAS_ATIVAS, url_estatica
+from painel.imagens.prefetch import tiles_da_pagina, obter_prefetcher
+from painel.imagens.duplicatas import grupos_das_urls, versao_do_indice
+from painel.instrumentacao import instrumentado
 
 
-# --- helpers ---
-def _nonempty_any(v):
-    """True se v (string/list) tiver algo não vazio."""
-    if v is None or (isinstance(v, float) and pd.isna(v)):
-        return False
-    if isinstance(v, list):
-        return any(str(x).strip() for x in v if x is not None)
-    s = str(v).strip()
-    return s not in ("", "none", "null")
 
-def _col_bool(df, col):
-    """Série booleana True se a coluna existir e tiver conteúdo não vazio (str/list)."""
-    if col not in df.columns:
-        return pd.Series(False, index=df.index)
-    return df[col].apply(_nonempty_any)
-
-def _pick_first_col(df, candidates):
-    """Retorna o primeiro nome de coluna existente; senão None."""
-    return next((c for c in candidates if c in df.columns), None)
+# --- helpers ---
+def _como_objeto(s):
+    """Categorical -> object: o apply de uma Categorical roda sobre as categorias e não monta listas por post."""
+    return s.astype(object) if isinstance(s.dtype, pd.CategoricalDtype) else s
 
 def _has_ref_legenda_produtos(val):
     if val is None or (isinstance(val, float) and pd.isna(val)):
@@ -55,146 +47,163 @@ def _has_ref_legenda_produtos(val):
                 return True
     return False
 
+def _recorte_no_cubo(df):
+    """
+    (cubo, grupos) quando df é exatamente o recorte marcado pelo filtro do
+    relatório (ver _marcar_recorte_do_cubo); senão None e o painel varre os posts.
+    """
+    marca = df.attrs.get("ia_farm_cubo") if isinstance(df, pd.DataFrame) else None
+    if marca is None:
+        return None
+    grupos, n_linhas = marca
+    cubo = obter_cubo(df)
+    if cubo is None or n_linhas != len(df) or len(grupos) != len(cubo.dias):
+        return None
+    return cubo, grupos
+
+# --- KPIs (partes 1 e 2) ---
+_CHAVES_PARTE01 = ("total_posts", "pct_faces", "pct_texto")
+_CHAVES_PARTE02 = ("pct_mencoes", "pct_hashtags", "pct_urls", "pct_cupons")
+
+def _kpis(df):
+    """Os sete KPIs num único passe: cubo diário, indicadores da carga ou cálculo direto."""
+    recorte = _recorte_no_cubo(df)
+    if recorte is not None:
+        return recorte[0].kpis(recorte[1])
+    return calcular_kpis(df)
+
+@instrumentado()
+def kpis_relatorio(base_filtrada):
+    """
+    Dict com os KPIs das partes 1 e 2 (total_posts e pct_*) da base filtrada,
+    para reaproveitar em outras páginas/exportações sem recalcular.
+    """
+    if isinstance(base_filtrada, ConsultaDuckDB):
+        return {**base_filtrada.kpis_parte01(), **base_filtrada.kpis_parte02()}
+    return _kpis(base_filtrada)
+
 # --- parte 1 ---
-def app_funcao_conceito_basico_parte01(base_filtrada):
-    df = base_filtrada.copy()
+def _kpis_parte01(df):
+    """Qtd. de publicações e % com rosto / texto na imagem."""
+    kpis = _kpis(df)
+    return {k: kpis[k] for k in _CHAVES_PARTE01}
+
+@instrumentado()
+def app_funcao_conceito_basico_parte01(base_filtrada, kpis=None):
+    if kpis is None:
+        kpis = kpis_relatorio(base_filtrada)
 
     with st.container():
         c1, c2, c3 = st.columns(3, border=True)
 
-        total_posts = len(df)
-
-        # rosto
-        col_face = _pick_first_col(df, ["imagem_face_presente"])
-        pct_faces = (pd.to_numeric(df[col_face], errors="coerce").fillna(0).astype(int).mean()*100) if col_face else 0
-
-        # texto na imagem: tenta várias formas
-        pct_prod = 0
-        if "imagem_texto_presente" in df.columns:
-            pct_prod = (pd.to_numeric(df["imagem_texto_presente"], errors="coerce").fillna(0).astype(int).mean()*100)
-        elif "imagem_texto_detectado" in df.columns:
-            pct_prod = (pd.to_numeric(df["imagem_texto_detectado"], errors="coerce").fillna(0).astype(int).mean()*100)
-        elif "imagem_num_blocos_texto" in df.columns:
-            pct_prod = ((pd.to_numeric(df["imagem_num_blocos_texto"], errors="coerce").fillna(0) > 0).mean()*100)
-        elif "imagem_texto_proporcao" in df.columns:
-            pct_prod = ((pd.to_numeric(df["imagem_texto_proporcao"], errors="coerce").fillna(0) > 0).mean()*100)
-
-
         # métricas (sem **; use o CSS para negrito)
-        c1.metric("Qtd. de Publicações", total_posts)
-        c2.metric("% de Publicações com Rosto", f"{pct_faces:.1f}%")
-        c3.metric("% de Publicações com Texto na Imagem", f"{pct_prod:.1f}%")
+        c1.metric("Qtd. de Publicações", kpis["total_posts"])
+        c2.metric("% de Publicações com Rosto", f"{kpis['pct_faces']:.1f}%")
+        c3.metric("% de Publicações com Texto na Imagem", f"{kpis['pct_texto']:.1f}%")
 
 # --- parte 2 ---
-def app_funcao_conceito_basico_parte02(base_filtrada):
-    df = base_filtrada.copy()
+def _kpis_parte02(df):
+    """% de publicações com menções, hashtags, URLs e cupons (imagem ou legenda)."""
+    kpis = _kpis(df)
+    return {k: kpis[k] for k in _CHAVES_PARTE02}
+
+@instrumentado()
+def app_funcao_conceito_basico_parte02(base_filtrada, kpis=None):
+    if kpis is None:
+        kpis = kpis_relatorio(base_filtrada)
 
     with st.container():
         c1, c2, c3, c4 = st.columns(4, border=True)
 
-        # menções (@)
-        menc_img = _col_bool(df, "imagem_mencoes_ocr")
-        menc_leg = _col_bool(df, "legenda_mencoes")
-        pct_mentions = ((menc_img | menc_leg).mean()*100)
-
-        # hashtags
-        hash_img = _col_bool(df, "imagem_hashtags_ocr")
-        hash_leg = _col_bool(df, "legenda_hashtags")
-        pct_hashtags = ((hash_img | hash_leg).mean()*100)
-
-        # URLs
-        url_img = _col_bool(df, "imagem_url_detectada")
-        url_leg = _col_bool(df, "legenda_urls")
-        pct_urls = ((url_img | url_leg).mean()*100)
-
-        # cupons (imagem + legenda em variantes)
-        cup_leg_col = _pick_first_col(df, ["legenda_codigos_cupons", "legenda_codigos.cupons"])
-        cup_leg = _col_bool(df, cup_leg_col) if cup_leg_col else pd.Series(False, index=df.index)
-        cup_img = _col_bool(df, "imagem_codigo_cupom")
-        pct_cupons = ((cup_img | cup_leg).mean()*100)
-
         # métricas
-        c1.metric("% Publi. com Menções (@)", f"{pct_mentions:.1f}%")
-        c2.metric("% Publi. com Hashtags", f"{pct_hashtags:.1f}%")
-        c3.metric("% Publi. com Url", f"{pct_urls:.1f}%")
-        c4.metric("% Publi. com Cupons", f"{pct_cupons:.1f}%")
+        c1.metric("% Publi. com Menções (@)", f"{kpis['pct_mencoes']:.1f}%")
+        c2.metric("% Publi. com Hashtags", f"{kpis['pct_hashtags']:.1f}%")
+        c3.metric("% Publi. com Url", f"{kpis['pct_urls']:.1f}%")
+        c4.metric("% Publi. com Cupons", f"{kpis['pct_cupons']:.1f}%")
 
 
 
-# Gráfico de barras para tipos de post
-def app_funcao_tipo_post(base_filtrada):
+def _contagem_tipo_post(df):
+    """Distribuição por post_type -> DataFrame ['post_type','count','percent']."""
+    recorte = _recorte_no_cubo(df)
+    if recorte is not None:
+        return recorte[0].contagem_tipo_post(recorte[1])
 
-    # distribuição por post_type -> % do total
-    counts = (base_filtrada["post_type"]
+    # Categorical: object para o value_counts não listar as categorias sem posts
+    # e desempatar pela 1ª ocorrência, como nas demais colunas
+    counts = (df["post_type"].astype(object)
               .value_counts(dropna=False)
               .rename_axis("post_type")
               .reset_index(name="count"))
     counts["percent"] = counts["count"] / counts["count"].sum() * 100
 
     # ordenar por percentual (desc)
-    counts = counts.sort_values("percent", ascending=False).reset_index(drop=True)
+    return counts.sort_values("percent", ascending=False).reset_index(drop=True)
+
+# Gráfico de barras para tipos de post
+@instrumentado()
+def app_funcao_tipo_post(base_filtrada):
 
-    fig = px.bar(
-        counts,
-        x="post_type",
-        y="percent",
-        text=counts["percent"].map(lambda v: f"{v:.2f}%"),
+    # distribuição por post_type -> % do total
+    if isinstance(base_filtrada, ConsultaDuckDB):
+        counts = base_filtrada.contagem_tipo_post()
+    else:
+        counts = _contagem_tipo_post(base_filtrada)
+
+    fig = grafico_barras(
+        "tipo_post", counts, "post_type", "percent",
+        rotulo_percentual(counts["percent"], 2),
         labels={"post_type": "Tipo de Publi.", "percent": "% de publicações"},
-        title="% de publicações pelo tipo de publicação",
-        color_discrete_sequence=["#213ac7"],
+        titulo="% de publicações pelo tipo de publicação",
+        titulo_x="Tipo de Publicação",
+        titulo_y="% de publicações",
+        layout=dict(yaxis_tickformat=".2f"),  # casa decimal alinhada ao texto
     )
+    st.plotly_chart(fig, use_container_width=True)
 
-    # fundo transparente + sem grade
-    fig.update_layout(
-        yaxis_tickformat=".2f",            # casa decimal alinhada ao texto
-        yaxis_title="% de publicações",
-        xaxis_title="Tipo de Publicação",
-        plot_bgcolor="rgba(0,0,0,0)",
-        paper_bgcolor="rgba(0,0,0,0)",
-        showlegend=False,                  # só 1 série
-        margin=dict(l=10, r=10, t=50, b=10),
-    )
 
-    # manter ordem custom; rótulos fora e sem corte
-    fig.update_xaxes(
-        showgrid=False, zeroline=False,
-        categoryorder="array", categoryarray=counts["post_type"],
-    )
-    fig.update_yaxes(showgrid=False, zeroline=False)
-    fig.update_traces(textposition="outside", cliponaxis=False)
+def _contagem_no_cubo(df, col, nome):
+    """Contagem de tokens somando os grupos do cubo diário; None se df não for o recorte do filtro."""
+    recorte = _recorte_no_cubo(df)
+    if recorte is None:
+        return None
+    return recorte[0].contagem(col, recorte[1], nome)
 
-    st.plotly_chart(fig, use_container_width=True)
+def _contagem_objetos(df):
+    """Contagem de objetos (split por '/') -> (DataFrame ['objeto','count'], total de ocorrências)."""
+    # rollup diário / tokens pré-calculados na carga: conta só o recorte filtrado
+    contagem = _contagem_no_cubo(df, "imagem_objetos", "objeto")
+    if contagem is not None:
+        return contagem
+    tokens = obter_tokens(df, "imagem_objetos")
+    if tokens is not None:
+        return tokens.contagem(df.index, "objeto")
 
+    # 1) Normalização e split por "/"
+    objetos_series = _como_objeto(df["imagem_objetos"]).apply(_split_objetos)
 
+    # 2) Explode e contagem
+    objetos_explodido = objetos_series.explode().dropna()
+    contagem = objetos_explodido.value_counts().reset_index()
+    contagem.columns = ["objeto", "count"]
+    return contagem, int(objetos_explodido.shape[0])
+
+@instrumentado()
 def app_funcao_objetos(base_filtrada):
     if "imagem_objetos" not in base_filtrada.columns:
         st.warning("Coluna 'imagem_objetos' não encontrada no DataFrame.")
         return
 
-    # 1) Normalização e split por "/"
-    objetos_series = (
-        base_filtrada["imagem_objetos"]
-        .fillna("")
-        .astype(str)
-        .apply(lambda s: [
-            t.strip().lower()
-            for t in s.split("/")
-            if t and t.strip().lower() not in ("", "none", "null")
-        ])
-    )
-
-    # 2) Explode e contagem
-    objetos_explodido = objetos_series.explode().dropna()
-    if objetos_explodido.empty:
+    if isinstance(base_filtrada, ConsultaDuckDB):
+        contagem, total_ocorrencias = base_filtrada.contagem_objetos()
+    else:
+        contagem, total_ocorrencias = _contagem_objetos(base_filtrada)
+    if total_ocorrencias == 0:
         st.info("Sem objetos para exibir.")
         return
 
-    contagem = objetos_explodido.value_counts().reset_index()
-    contagem.columns = ["objeto", "count"]
-
     # 3) Top 10 (+ % opcional)
     top10 = contagem.head(10).copy()
-    total_ocorrencias = int(objetos_explodido.shape[0])
     top10["percent"] = (top10["count"] / total_ocorrencias) * 100
 
     # Inicial maiúscula (apenas display). Use .str.title() se quiser cada palavra capitalizada.
@@ -202,81 +211,55 @@ def app_funcao_objetos(base_filtrada):
 
     # 4) Gráfico (sem watermark)
     top10 = top10.sort_values("count", ascending=True)
-    fig = px.bar(
-        top10,
-        x="count",
-        y="objeto_fmt",
-        orientation="h",
-        text=top10.apply(lambda r: f"{r['count']} ({r['percent']:.1f}%)", axis=1),
+    fig = grafico_barras(
+        "objetos", top10, "count", "objeto_fmt",
+        rotulo_contagem_percentual(top10["count"], top10["percent"]),
+        orientacao="h",
         labels={"count": "Quantidade", "objeto_fmt": "Objeto"},
-        title="Top 10 objetos detectados na imagem",
-        color_discrete_sequence=["#213ac7"],
-    )
-    fig.update_traces(textposition="outside", cliponaxis=False)
-    fig.update_yaxes(categoryorder="array", categoryarray=top10["objeto_fmt"])
-
-    # estilo limpo (fundo transparente e sem grade)
-    fig.update_layout(
-        plot_bgcolor="rgba(0,0,0,0)",
-        paper_bgcolor="rgba(0,0,0,0)",
-        showlegend=False,
-        margin=dict(l=10, r=10, t=50, b=10),
+        titulo="Top 10 objetos detectados na imagem",
+        titulo_x="Quantidade",
+        titulo_y="Objeto",
     )
-    fig.update_xaxes(showgrid=False, zeroline=False, title="Quantidade")
-    fig.update_yaxes(showgrid=False, zeroline=False, title="Objeto")
-
     st.plotly_chart(fig, use_container_width=True)
 
 
 
+def _contagem_hashtags(df):
+    """Contagem de hashtags da legenda -> (DataFrame ['hashtag','count'], total de ocorrências)."""
+    contagem = _contagem_no_cubo(df, "legenda_hashtags", "hashtag")
+    if contagem is not None:
+        return contagem
+    tokens = obter_tokens(df, "legenda_hashtags")
+    if tokens is not None:
+        return tokens.contagem(df.index, "hashtag")
+
+    # Série de listas → explode
+    series = _como_objeto(df["legenda_hashtags"]).apply(_split_hashtags)
+    exploded = series.explode().dropna()
+
+    # Contagem
+    contagem = exploded.value_counts().reset_index()
+    contagem.columns = ["hashtag", "count"]
+    return contagem, int(exploded.shape[0])
+
+@instrumentado()
 def app_funcao_hashtags(base_filtrada):
 
     if "legenda_hashtags" not in base_filtrada.columns:
         st.warning("Coluna 'legenda_hashtags' não encontrada no DataFrame.")
         return
 
-    def _split_hashtags(val):
-        # None / NaN
-        if val is None or (isinstance(val, float) and pd.isna(val)):
-            return []
-
-        # Se for lista, normaliza item a item
-        if isinstance(val, list):
-            items = val
-        else:
-            # Trata como string; separa por espaços, vírgulas, ponto-e-vírgula, '/', '|' e quebras de linha
-            s = str(val).strip()
-            if s == "" or s.lower() in ("none", "null"):
-                return []
-            items = re.split(r"[,\s;/|]+", s)
-
-        # Normaliza: remove '#' duplicado, espaços, caixa-baixa
-        norm = []
-        for it in items:
-            tag = str(it).strip()
-            if not tag:
-                continue
-            tag = tag.lstrip("#").strip()   # remove '#' à esquerda
-            if not tag:
-                continue
-            tag = tag.lower()
-            norm.append(tag)
-        return norm
-
-    # Série de listas → explode
-    series = base_filtrada["legenda_hashtags"].apply(_split_hashtags)
-    exploded = series.explode().dropna()
+    if isinstance(base_filtrada, ConsultaDuckDB):
+        contagem, total = base_filtrada.contagem_hashtags()
+    else:
+        contagem, total = _contagem_hashtags(base_filtrada)
 
-    if exploded.empty:
+    if total == 0:
         st.info("Sem hashtags para exibir.")
         return
 
-    # Contagem e Top 10
-    contagem = exploded.value_counts().reset_index()
-    contagem.columns = ["hashtag", "count"]
-
+    # Top 10
     top10 = contagem.head(10).copy()  # Alterado de top20 para top10
-    total = int(exploded.shape[0])
     top10["percent"] = (top10["count"] / max(total, 1)) * 100
 
     # Rótulo exibido com '#'
@@ -284,29 +267,15 @@ def app_funcao_hashtags(base_filtrada):
 
     # Gráfico: barras horizontais, azul, sem fundo/grade
     top10 = top10.sort_values("count", ascending=True)
-    fig = px.bar(
-        top10,
-        x="count",
-        y="hashtag_fmt",
-        orientation="h",
-        text=top10.apply(lambda r: f"{r['count']} ({r['percent']:.1f}%)", axis=1),
+    fig = grafico_barras(
+        "hashtags", top10, "count", "hashtag_fmt",
+        rotulo_contagem_percentual(top10["count"], top10["percent"]),
+        orientacao="h",
         labels={"count": "Quantidade", "hashtag_fmt": "Hashtag"},
-        title="Top 10 hashtags (hashtags na legenda)",  # Título alterado para Top 10
-        color_discrete_sequence=["#213ac7"],
-    )
-
-    fig.update_traces(textposition="outside", cliponaxis=False)
-    fig.update_yaxes(categoryorder="array", categoryarray=top10["hashtag_fmt"])
-
-    fig.update_layout(
-        plot_bgcolor="rgba(0,0,0,0)",
-        paper_bgcolor="rgba(0,0,0,0)",
-        showlegend=False,
-        margin=dict(l=10, r=10, t=50, b=10),
+        titulo="Top 10 hashtags (hashtags na legenda)",  # Título alterado para Top 10
+        titulo_x="Quantidade",
+        titulo_y="Hashtag",
     )
-    fig.update_xaxes(showgrid=False, zeroline=False, title="Quantidade")
-    fig.update_yaxes(showgrid=False, zeroline=False, title="Hashtag")
-
     st.plotly_chart(fig, use_container_width=True)
 
 
@@ -314,65 +283,25 @@ def app_funcao_hashtags(base_filtrada):
 
 
 
-def _norm_txt(s: str) -> str:
-    if s is None:
-        return ""
-    s = str(s).strip().lower()
-    # remove acentos
-    s = "".join(ch for ch in unicodedata.normalize("NFD", s) if not unicodedata.combining(ch))
-    return s
+def _contagem_emocoes(df):
+    """Contagem de emoções da legenda -> (DataFrame ['emocao','count'], total de ocorrências)."""
+    col = "legenda_sentimento_emocoes"
+    contagem = _contagem_no_cubo(df, col, "emocao")
+    if contagem is not None:
+        return contagem
+    tokens = obter_tokens(df, col)
+    if tokens is not None:
+        return tokens.contagem(df.index, "emocao")
 
-def _parse_emocoes(val):
-    """Aceita None, lista, ou string estilo '[alegria, urgencia]' e retorna lista normalizada."""
-    if val is None or (isinstance(val, float) and pd.isna(val)):
-        return []
+    # Série de listas
+    series = _como_objeto(df[col]).apply(_parse_emocoes)
+    exploded = series.explode().dropna()
 
-    # já é lista?
-    if isinstance(val, list):
-        items = val
-    else:
-        s = str(val).strip()
-        if s in ("", "none", "null"):
-            return []
-        # tenta JSON
-        try:
-            parsed = json.loads(s)
-            if isinstance(parsed, list):
-                items = parsed
-            elif isinstance(parsed, str):
-                items = [parsed]
-            else:
-                # cai no split manual
-                items = re.split(r"[,\;/|]+", s.strip("[]"))
-        except Exception:
-            # split manual
-            items = re.split(r"[,\;/|]+", s.strip("[]"))
-
-    # normalização + mapa de equivalências (ex.: 'urgencia' -> 'urgência')
-    MAP = {
-        "urgencia": "urgência",
-        "exclusividade": "exclusividade",
-        "entusiasmo": "entusiasmo",
-        "alegria": "alegria",
-        "ansiedade": "ansiedade",
-        "medo": "medo",
-        "tristeza": "tristeza",
-        "raiva": "raiva",
-        "surpresa": "surpresa",
-        # adicione outros se aparecerem
-    }
-
-    out = []
-    for it in items:
-        t = _norm_txt(it)
-        if not t:
-            continue
-        # remove aspas remanescentes
-        t = t.strip("'\" ")
-        # aplica mapa (com acento “bonitinho” quando conhecido)
-        out.append(MAP.get(t, t))
-    return out
+    contagem = exploded.value_counts().reset_index()
+    contagem.columns = ["emocao", "count"]
+    return contagem, int(exploded.shape[0])
 
+@instrumentado()
 def app_funcao_emocoes_legenda(base_filtrada: pd.DataFrame, top_n: int = 5):
     """
     Gera um Top N de emoções (contagem e % ao lado), a partir de df['legenda_sentimento_emocoes'].
@@ -382,18 +311,16 @@ def app_funcao_emocoes_legenda(base_filtrada: pd.DataFrame, top_n: int = 5):
         st.warning(f"Coluna '{col}' não encontrada.")
         return
 
-    # Série de listas
-    series = base_filtrada[col].apply(_parse_emocoes)
-    exploded = series.explode().dropna()
+    if isinstance(base_filtrada, ConsultaDuckDB):
+        base_filtrada = base_filtrada.para_pandas([col])
 
-    if exploded.empty:
+    contagem, total_ocorr = _contagem_emocoes(base_filtrada)
+
+    if total_ocorr == 0:
         st.info("Sem emoções para exibir.")
         return
 
-    # contagem e % sobre o total de ocorrências (cada emoção em cada post conta 1)
-    contagem = exploded.value_counts().reset_index()
-    contagem.columns = ["emocao", "count"]
-    total_ocorr = int(exploded.shape[0])
+    # % sobre o total de ocorrências (cada emoção em cada post conta 1)
     contagem["percent"] = contagem["count"] / max(1, total_ocorr) * 100
 
     # Pega apenas o Top N
@@ -404,62 +331,35 @@ def app_funcao_emocoes_legenda(base_filtrada: pd.DataFrame, top_n: int = 5):
 
     # barras horizontais (amarelo → azul)
     top = top.sort_values("count", ascending=True)
-    fig = px.bar(
-        top,
-        x="count",
-        y="emocao_fmt",
-        orientation="h",
-        text=top.apply(lambda r: f"{r['count']} ({r['percent']:.1f}%)", axis=1),
+    fig = grafico_barras(
+        "emocoes_legenda", top, "count", "emocao_fmt",
+        rotulo_contagem_percentual(top["count"], top["percent"]),
+        orientacao="h",
         labels={"count": "Quantidade", "emocao_fmt": "Emoção"},
-        title=f"Top {top_n} emoções na legenda",  # Atualizado para refletir o top_n
-        color_discrete_sequence=["#213ac7"]
-    )
-    fig.update_traces(textposition="outside", cliponaxis=False)
-    fig.update_yaxes(categoryorder="array", categoryarray=top["emocao_fmt"])
-
-    # estilo limpo
-    fig.update_layout(
-        plot_bgcolor="rgba(0,0,0,0)",
-        paper_bgcolor="rgba(0,0,0,0)",
-        showlegend=False,
-        margin=dict(l=10, r=10, t=50, b=10),
+        titulo=f"Top {top_n} emoções na legenda",  # Atualizado para refletir o top_n
+        titulo_x="Quantidade",
+        titulo_y="Emoção",
     )
-    fig.update_xaxes(showgrid=False, zeroline=False, title="Quantidade")
-    fig.update_yaxes(showgrid=False, zeroline=False, title="Emoção")
-
     st.plotly_chart(fig, use_container_width=True)
 
 
-AZUL = "#213ac7"
-
 # ----------------- helpers -----------------
-def _split_por_barra(val):
-    """Divide por '/', trata None/NaN/'none'/'null' como ['Desconhecido'].
-       Aceita também lista (cada item pode conter '/')."""
-    if val is None or (isinstance(val, float) and pd.isna(val)):
-        return ["Desconhecido"]
-    if isinstance(val, list):
-        tokens = []
-        for v in val:
-            if v is None: 
-                continue
-            for t in str(v).split("/"):
-                t = t.strip()
-                if t:
-                    tokens.append(t)
-        return tokens if tokens else ["Desconhecido"]
-    s = str(val).strip()
-    if s == "" or s.lower() in {"none", "null", "[]"}:
-        return ["Desconhecido"]
-    parts = [t.strip() for t in s.split("/") if t.strip() != ""]
-    return parts if parts else ["Desconhecido"]
-
 def _contagem_categorias(df: pd.DataFrame, col: str, dedup_por_post: bool = True) -> pd.DataFrame:
     """Retorna DataFrame com ['categoria','count'] ordenado desc."""
+    if isinstance(df, ConsultaDuckDB):
+        return df.contagem_categorias(col, dedup_por_post)
     if col not in df.columns:
         return pd.DataFrame(columns=["categoria", "count"])
+    contagem = _contagem_no_cubo(df, col, "categoria") if dedup_por_post else None
+    if contagem is not None:
+        cont, _ = contagem
+        return cont[cont["categoria"].str.strip().str.lower() != "desconhecido"]
+    tokens = obter_tokens(df, col) if dedup_por_post else None
+    if tokens is not None:
+        cont, _ = tokens.contagem(df.index, "categoria")
+        return cont[cont["categoria"].str.strip().str.lower() != "desconhecido"]
     # lista de listas
-    serie = df[col].apply(_split_por_barra)
+    serie = _como_objeto(df[col]).apply(_split_por_barra)
     if dedup_por_post:
         serie = serie.apply(lambda lst: sorted(set(lst)))
     expl = serie.explode().dropna()
@@ -477,61 +377,56 @@ def _plot_barh_counts(cont: pd.DataFrame, titulo: str, ylab: str):
     if cont.empty:
         st.info(f"Sem dados para **{titulo}**.")
         return
-    # display: capitaliza e troca '_' por espaço
-    cont = cont.copy()
-    cont["categoria_fmt"] = cont["categoria"].astype(str).apply(
-        lambda x: x.replace("_"," ").strip().capitalize()
-    )
+    # display: capitaliza e troca '_' por espaço (assign devolve um novo frame)
+    cont = cont.assign(categoria_fmt=cont["categoria"].astype(str)
+                       .str.replace("_", " ").str.strip().str.capitalize())
     # Remover a categoria "Desconhecido" do gráfico, se ainda existir
     cont = cont[cont["categoria_fmt"].str.lower() != "desconhecido"]
 
     # ordena para barras horizontais
     cont = cont.sort_values("count", ascending=True)
-    fig = px.bar(
-        cont, x="count", y="categoria_fmt", orientation="h",
-        text=cont["count"].map(str),
+    fig = grafico_barras(
+        titulo, cont, "count", "categoria_fmt", rotulo_contagem(cont["count"]),
+        orientacao="h",
         labels={"count":"Quantidade", "categoria_fmt": ylab},
-        title=titulo,
-        color_discrete_sequence=[AZUL],
-    )
-    fig.update_traces(textposition="outside", cliponaxis=False)
-    fig.update_yaxes(categoryorder="array", categoryarray=cont["categoria_fmt"])
-    fig.update_layout(
-        plot_bgcolor="rgba(0,0,0,0)",
-        paper_bgcolor="rgba(0,0,0,0)",
-        showlegend=False,
-        margin=dict(l=10, r=10, t=50, b=10),
+        titulo=titulo,
+        titulo_x="Quantidade",
+        titulo_y=ylab,
     )
-    fig.update_xaxes(showgrid=False, zeroline=False, title="Quantidade")
-    fig.update_yaxes(showgrid=False, zeroline=False, title=ylab)
     st.plotly_chart(fig, use_container_width=True)
 
 # ----------------- 6 visualizações -----------------
+@instrumentado()
 def grafico_topicos_imagem(df: pd.DataFrame, top_n: int | None = None):
     cont = _contagem_categorias(df, "imagem_topicos")
     if top_n: cont = cont.head(top_n)
     _plot_barh_counts(cont, "Tópicos associados à Imagem", "Tópico (imagem)")
 
+@instrumentado()
 def grafico_gatilhos_imagem(df: pd.DataFrame, top_n: int | None = None):
     cont = _contagem_categorias(df, "imagem_gatilhos")
     if top_n: cont = cont.head(top_n)
     _plot_barh_counts(cont, "Gatilhos utilizados na Imagem", "Gatilho (imagem)")
 
+@instrumentado()
 def grafico_ctas_imagem(df: pd.DataFrame, top_n: int | None = None):
     cont = _contagem_categorias(df, "imagem_cta_tipo")
     if top_n: cont = cont.head(top_n)
     _plot_barh_counts(cont, "CTAs utilizados na Imagem", "CTA (imagem)")
 
+@instrumentado()
 def grafico_topicos_legenda(df: pd.DataFrame, top_n: int | None = None):
     cont = _contagem_categorias(df, "legenda_topicos")
     if top_n: cont = cont.head(top_n)
     _plot_barh_counts(cont, "Top 5 tópicos associados à Legenda", "Tópico (legenda)")
 
+@instrumentado()
 def grafico_gatilhos_legenda(df: pd.DataFrame, top_n: int | None = None):
     cont = _contagem_categorias(df, "legenda_gatilhos")
     if top_n: cont = cont.head(top_n)
     _plot_barh_counts(cont, "Top 5 gatilhos utilizados na Legenda", "Gatilho (legenda)")
 
+@instrumentado()
 def grafico_ctas_legenda(df: pd.DataFrame, top_n: int | None = None):
     cont = _contagem_categorias(df, "legenda_cta")
     if top_n: cont = cont.head(top_n)
@@ -539,40 +434,6 @@ def grafico_ctas_legenda(df: pd.DataFrame, top_n: int | None = None):
 
 
 
-import streamlit as st
-from html import escape
-
-CONTEXT_FARM_COLS = [
-    "imagem_contexto_farm_cabide_visivel",
-    "imagem_contexto_farm_arara_visivel",
-    "imagem_contexto_farm_steamer_visivel",
-    "imagem_contexto_farm_modo_retrato",
-    "imagem_contexto_farm_provador_lotado",
-    "imagem_contexto_farm_reflexo_espelho",
-    "imagem_contexto_farm_interior_loja",
-    "imagem_contexto_farm_foco_look",
-    "imagem_contexto_farm_foco_acessorio",
-    "imagem_contexto_farm_foco_textura",
-    "imagem_contexto_farm_roupas_dobradas",
-    "imagem_contexto_farm_cortina_visivel",
-    "imagem_contexto_farm_manequim_visivel",
-    "imagem_contexto_farm_etiqueta_preco_visivel",
-    "imagem_contexto_farm_sacola_visivel",
-    "imagem_contexto_farm_selfie_no_espelho",
-    "imagem_contexto_farm_logo_marca_visivel",
-]
-
-def _series_to_bool(s: pd.Series) -> pd.Series:
-    """Converte uma série (bool, numérica, string) para booleano."""
-    if s.dtype == bool:
-        return s.fillna(False)
-    s_str = s.astype(str).str.strip().str.lower()
-    num = pd.to_numeric(s_str, errors="coerce")
-    mask_num = num.fillna(0) > 0
-    truthy = {"true", "1", "sim", "yes", "y", "verdadeiro"}
-    mask_str = s_str.isin(truthy)
-    return (mask_num | mask_str).fillna(False)
-
 def _fmt_label(col: str) -> str:
     """Torna o rótulo legível."""
     base = col.replace("imagem_contexto_farm_", "").replace("_", " ").strip()
@@ -585,7 +446,116 @@ def _is_http_url(x: str) -> bool:
     except Exception:
         return False
 
-def filtro_e_mosaico_imagens(df: pd.DataFrame, thumb_col: str = "thumbnail", tz: str = "America/Sao_Paulo", key: str = "mosaico_main", ordenar: str = "Mais recentes", mostrar_legenda: bool = False, abrir_nova_aba: bool = True, colunas: int = 5, por_pagina: int = 40, proporcao: str = "1 / 1"):
+# "grade": a página inteira do mosaico num único bloco HTML/CSS;
+# "colunas": um st.columns por linha e um st.image por tile (modo antigo)
+MODO_MOSAICO = os.environ.get("IA_FARM_MOSAICO", "grade").lower()
+
+def _mosaico_em_grade(page_df, thumb_col, key, colunas, proporcao, mostrar_legenda, abrir_nova_aba, proximas=()):
+    """
+    Renderiza a página como uma grade CSS num único st.markdown. Cada tile usa
+    a miniatura do cache (servida em app/static/) quando já existe; senão a URL
+    original, carregada pelo navegador sob demanda (loading="lazy").
+    """
+    urls = page_df[thumb_col].astype(str).tolist()
+    tiles = {}
+    if MINIATURAS_ATIVAS and st.get_option("server.enableStaticServing"):
+        # não espera download: o que faltar entra no cache para o próximo rerun
+        tiles = {u: url_estatica(c) for u, c in tiles_da_pagina(urls, proporcao, proximas, espera=0).items()}
+
+    legendas = page_df["caption"].tolist() if mostrar_legenda and "caption" in page_df.columns else [None] * len(urls)
+    repeticoes = page_df["_repeticoes"].tolist() if "_repeticoes" in page_df.columns else [1] * len(urls)
+    itens = []
+    for url, cap, rep in zip(urls, legendas, repeticoes):
+        img = f'<img src="{escape(tiles.get(url) or url)}" loading="lazy" decoding="async" alt="">'
+        if abrir_nova_aba:
+            img = f'<a href="{escape(url)}" target="_blank" rel="noopener noreferrer">{img}</a>'
+        selo = f'<span class="mosaic-badge-{key}">×{int(rep)}</span>' if rep > 1 else ""
+        cap = (cap or "").strip()
+        # quebras de linha da legenda viram <br>: uma linha em branco no HTML
+        # encerraria o bloco e o markdown mostraria o resto como texto/código
+        cap = "<br>".join(escape(linha) for linha in cap.splitlines())
+        legenda = f'<div class="mosaic-caption-left-{key}">{cap}</div>' if cap else ""
+        itens.append(f'<div class="mosaic-tile-{key}">{selo}{img}{legenda}</div>')
+
+    # sem recuo: uma linha recuada 4+ espaços vira bloco de código no markdown
+    estilo = textwrap.dedent(f"""\
+        <style>
+        .mosaic-grid-{key} {{
+            display: grid;
+            grid-template-columns: repeat({int(colunas)}, minmax(0, 1fr));
+            gap: 1rem;
+            align-items: start;
+        }}
+        .mosaic-grid-{key} img {{
+            display: block;
+            width: 100%;
+            aspect-ratio: {proporcao};
+            object-fit: cover;
+            background: #f2f2f2;
+            border-radius: 8px;
+        }}
+        .mosaic-grid-{key} .mosaic-tile-{key} {{
+            position: relative;
+        }}
+        .mosaic-badge-{key} {{
+            position: absolute;
+            top: 6px;
+            right: 6px;
+            z-index: 1;
+            padding: 1px 8px;
+            border-radius: 10px;
+            background: rgba(33, 58, 199, 0.9);
+            color: #fff;
+            font-size: 0.8rem;
+        }}
+        </style>
+        """)
+    st.markdown(
+        f'{estilo}<div class="mosaic-grid-{key}">{"".join(itens)}</div>',
+        unsafe_allow_html=True,
+    )
+
+@instrumentado("mosaico_preparacao")
+def _preparar_dados_mosaico(df, mask_all, thumb_col, ordenar):
+    """(qtd. de posts no recorte, imagens válidas sem URL repetida na ordem pedida)."""
+    # o mosaico só precisa de url/data/legenda: recorta essas colunas em
+    # vez de copiar o DataFrame inteiro; a data já vem interpretada da carga
+    # (post_date_resumo, instante UTC) e só é lida de post_date em DataFrames
+    # que não passaram por preparar_base
+    col_data = "post_date_resumo" if "post_date_resumo" in df.columns else "post_date"
+    cols_mosaico = [c for c in (thumb_col, col_data, "caption") if c in df.columns]
+    data = df.loc[mask_all, cols_mosaico]
+    qtd_filtrada = len(data)
+
+    if col_data == "post_date" and "post_date" in data.columns:
+        data["post_date_resumo"] = pd.to_datetime(data.pop("post_date"), errors="coerce", utc=True)
+
+    data = (
+        data[data[thumb_col].apply(_is_http_url)]
+        .drop_duplicates(subset=[thumb_col])
+        .reset_index(drop=True)
+    )
+
+    # Ordenando de acordo com a opção selecionada
+    if ordenar != "Sem ordenação" and "post_date_resumo" in data.columns:
+        data = data.sort_values("post_date_resumo", ascending=(ordenar == "Mais antigos"))
+    return qtd_filtrada, data
+
+@instrumentado()
+def filtro_e_mosaico_imagens(df: pd.DataFrame, thumb_col: str = "thumbnail", tz: str | None = None, key: str = "mosaico_main", ordenar: str = "Mais recentes", mostrar_legenda: bool = False, abrir_nova_aba: bool = True, colunas: int = 5, por_pagina: int = 40, proporcao: str = "1 / 1", modo: str = MODO_MOSAICO):
+
+    if tz is not None:
+        # a data do mosaico é o instante UTC da carga; o fuso dos dias é IA_FARM_FUSO
+        warnings.warn("filtro_e_mosaico_imagens: o parâmetro tz não é mais usado (ver IA_FARM_FUSO).",
+                      DeprecationWarning, stacklevel=2)
+
+    if isinstance(df, ConsultaDuckDB):
+        # mesma consulta -> mesmo DataFrame entre reruns (a memoização abaixo compara por identidade)
+        memo = st.session_state.get(f"{key}_consulta")
+        if memo is None or memo[0] is not df:
+            memo = (df, df.para_pandas(CONTEXT_FARM_COLS + [thumb_col, "post_date_resumo", "caption"]))
+            st.session_state[f"{key}_consulta"] = memo
+        df = memo[1]
 
     with st.container():
 
@@ -600,54 +570,58 @@ def filtro_e_mosaico_imagens(df: pd.DataFrame, thumb_col: str = "thumbnail", tz:
 
             # multiselect com labels amigáveis
             label_map = {c: _fmt_label(c) for c in available}
-            inv_label_map = {v: k for k, v in label_map.items()}
 
-            selected_labels = st.multiselect(
+            # flags pré-calculadas (bitset): contagem por opção para a seleção atual
+            bitset = obter_contexto(df)
+            sel_atual = [c for c in st.session_state.get(f"{key}_contexto", []) if c in label_map]
+            contagens = bitset.contagens(df.index, sel_atual) if bitset is not None else None
+
+            selected_cols = st.multiselect(
                 "Selecione os conteúdos (o post deve conter **todos**):",
-                options=[label_map[c] for c in available],
+                options=available,
                 default=[],
+                format_func=lambda c: f"{label_map[c]} ({contagens[c]})" if contagens else label_map[c],
+                key=f"{key}_contexto",
             )
-            selected_cols = [inv_label_map[lbl] for lbl in selected_labels]
 
-            # aplica filtro (AND entre as colunas selecionadas)
+            # aplica filtro (AND entre as colunas selecionadas) como máscara sobre df
             if selected_cols:
-                mask_all = pd.Series(True, index=df.index)
-                for col in selected_cols:
-                    mask_all &= _series_to_bool(df[col])
-                df_filtrado = df.loc[mask_all].copy()
+                if bitset is not None:
+                    mask_all = bitset.filtrar(df.index, selected_cols)
+                else:
+                    mask_all = pd.Series(True, index=df.index)
+                    for col in selected_cols:
+                        mask_all &= _series_to_bool(df[col])
             else:
-                df_filtrado = df.copy()
+                mask_all = slice(None)
 
-            if thumb_col not in df_filtrado.columns:
+            if thumb_col not in df.columns:
                 st.warning(f"Coluna '{thumb_col}' não encontrada.")
                 return
 
-            data = df_filtrado.copy()
-
-            if "post_date" in data.columns:
-                data["post_date"] = pd.to_datetime(data["post_date"], errors="coerce", utc=True)
-                try:
-                    data["post_date_local"] = data["post_date"].dt.tz_convert(tz)
-                except Exception:
-                    data["post_date_local"] = data["post_date"]
-
-            data = (
-                data[data[thumb_col].apply(_is_http_url)]
-                .drop_duplicates(subset=[thumb_col])
-                .reset_index(drop=True)
-            )
+            # recorte ordenado do mosaico memoizado por (base, contexto, ordem): trocar
+            # página, colunas ou legenda só fatia o que já foi preparado
+            chave_dados = (tuple(selected_cols), ordenar)
+            memo = st.session_state.get(f"{key}_dados")
+            if memo is not None and memo[0] is df and memo[1] == chave_dados:
+                qtd_filtrada, data = memo[2]
+            else:
+                qtd_filtrada, data = _preparar_dados_mosaico(df, mask_all, thumb_col, ordenar)
+                st.session_state[f"{key}_dados"] = (df, chave_dados, (qtd_filtrada, data))
             if data.empty:
                 st.info("Nenhuma imagem válida para exibir.")
                 return
 
-            # Ordenando de acordo com a opção selecionada
-            if ordenar != "Sem ordenação" and "post_date" in data.columns:
-                data = data.sort_values("post_date", ascending=(ordenar == "Mais antigos"))
-
             c1, c2, c3, c4 = st.columns([1.2, 1.2, 1.0, 1.0])
 
             with c1:
                 mostrar_legenda = st.checkbox("Mostrar legendas (caption)", value=mostrar_legenda, key=f"{key}_legend")
+                agrupar = st.checkbox(
+                    "Agrupar imagens quase iguais",
+                    value=False,
+                    key=f"{key}_agrupar",
+                    help="Mostra uma imagem por grupo de quase-duplicatas (índice de hashes perceptuais das imagens já em cache).",
+                )
                 
             with c2:
                 ord_sel = st.selectbox(
@@ -661,6 +635,20 @@ def filtro_e_mosaico_imagens(df: pd.DataFrame, thumb_col: str = "thumbnail", tz:
             with c4:
                 por_pagina = st.number_input("Por página", 10, 200, value=por_pagina, step=10, key=f"{key}_pp")
 
+            if agrupar:
+                # representante = 1ª imagem do grupo na ordem atual; guarda o tamanho do grupo.
+                # Os grupos do recorte ficam memoizados junto dele e só são refeitos
+                # quando o arquivo do índice muda (cada URL consulta o cache em disco)
+                cache = obter_prefetcher().cache
+                versao = versao_do_indice(cache)
+                memo = st.session_state.get(f"{key}_grupos")
+                if memo is not None and memo[0] is data and memo[1] == versao:
+                    grupos = memo[2]
+                else:
+                    grupos = pd.Series(grupos_das_urls(data[thumb_col].astype(str).tolist(), cache), index=data.index)
+                    st.session_state[f"{key}_grupos"] = (data, versao, grupos)
+                data = data.assign(_repeticoes=grupos.map(grupos.value_counts()))[~grupos.duplicated()]
+
             total = len(data)
             total_paginas = max(1, (total + por_pagina - 1) // por_pagina)
             page = st.session_state.get(f"{key}_page", 1)
@@ -669,11 +657,12 @@ def filtro_e_mosaico_imagens(df: pd.DataFrame, thumb_col: str = "thumbnail", tz:
             ini = (page - 1) * por_pagina
             fim = min(ini + por_pagina, total)
             page_df = data.iloc[ini:fim].reset_index(drop=True)
+            proximas = data[thumb_col].iloc[fim:fim + por_pagina].astype(str).tolist()
 
     # Exibindo a quantidade de publicações no filtro
     c1, c2 = st.columns([10, 1.5])
     with c1:
-        st.metric("Quantidade de publicações (filtradas)", len(df_filtrado))
+        st.metric("Quantidade de publicações (filtradas)", qtd_filtrada)
 
     # Botão para limpar o filtro
     with c2:
@@ -703,6 +692,14 @@ def filtro_e_mosaico_imagens(df: pd.DataFrame, thumb_col: str = "thumbnail", tz:
         unsafe_allow_html=True,
     )
 
+    if modo == "grade":
+        _mosaico_em_grade(page_df, thumb_col, key, colunas, proporcao, mostrar_legenda, abrir_nova_aba, proximas)
+        st.caption(f"Mostrando {ini+1}–{fim} de {total} imagens • Página {page}/{total_paginas}")
+        return
+
+    # tiles da página em paralelo; a próxima página já fica aquecendo
+    tiles = tiles_da_pagina(page_df[thumb_col].astype(str).tolist(), proporcao, proximas=proximas)
+
     rows = (len(page_df) + colunas - 1) // colunas
     for r in range(rows):
         cols = st.columns(colunas)
@@ -714,17 +711,29 @@ def filtro_e_mosaico_imagens(df: pd.DataFrame, thumb_col: str = "thumbnail", tz:
             url = str(row[thumb_col])
             cap = (row.get("caption") or "").strip() if mostrar_legenda else ""
 
+            # tile redimensionado do cache local; lento/indisponível vira placeholder
+            imagem = tiles.get(url)
+
             with cols[c]:
-                if abrir_nova_aba:
+                if imagem is None:
+                    alvo = f' href="{escape(url)}" target="_blank" rel="noopener noreferrer"' if abrir_nova_aba else ""
+                    st.markdown(
+                        f'<div class="mosaic-tile-{key}"><a{alvo}><div class="placeholder"></div></a></div>',
+                        unsafe_allow_html=True,
+                    )
+                elif abrir_nova_aba:
                     st.markdown(
                         f'<a href="{escape(url)}" target="_blank" rel="noopener noreferrer">',
                         unsafe_allow_html=True,
                     )
-                    st.image(url, use_container_width=True)
+                    st.image(imagem, use_container_width=True)
                     st.markdown("</a>", unsafe_allow_html=True)
                 else:
-                    st.image(url, use_container_width=True)
+                    st.image(imagem, use_container_width=True)
 
+                rep = int(row.get("_repeticoes", 1))
+                if rep > 1:
+                    st.caption(f"{rep} imagens quase iguais")
                 if cap:
                     st.markdown(f'<div class="mosaic-caption-left-{key}">{escape(cap)}</div>', unsafe_allow_html=True)
 
@@ -0,0 +1,144 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from painel.instrumentacao import instrumentado
+
+# Fábrica dos gráficos de barras do relatório. Cada figura é montada uma vez
+# por (id do gráfico, hash do agregado + parâmetros) e guardada serializada
+# (JSON) num LRU do processo; num rerun em que o agregado não mudou (ex.: só a
+# página do mosaico mudou) o painel reaproveita a figura sem passar pelo px.bar.
+MAX_FIGURAS = int(os.environ.get("IA_FARM_CACHE_GRAFICOS", "256"))
+
+AZUL = "#213ac7"
+_FUNDO = "rgba(0,0,0,0)"
+
+
+# ----------------- rótulos (vetorizados) -----------------
+def rotulo_contagem_percentual(contagem, percentual):
+    """'12 (3.4%)' para cada linha, sem apply por linha."""
+    pct = np.char.mod("%.1f", np.asarray(percentual, dtype=float))
+    return pd.Series(contagem).astype(str).to_numpy(dtype=object) + " (" + pct.astype(object) + "%)"
+
+
+def rotulo_percentual(percentual, casas=2):
+    """'12.34%' para cada linha."""
+    return np.char.mod(f"%.{casas}f%%", np.asarray(percentual, dtype=float)).astype(object)
+
+
+def rotulo_contagem(contagem):
+    return pd.Series(contagem).astype(str).to_numpy(dtype=object)
+
+
+# ----------------- cache de figuras -----------------
+class _EntradaFigura:
+    """JSON da figura (imutável, compartilhável entre sessões) e a Figure decodificada sob demanda."""
+
+    __slots__ = ("json", "_figura")
+
+    def __init__(self, texto_json, figura=None):
+        self.json = texto_json
+        self._figura = figura
+
+    def figura(self):
+        if self._figura is None:
+            import plotly.graph_objects as go
+
+            self._figura = go.Figure(json.loads(self.json))
+        return self._figura
+
+
+_FIGURAS = OrderedDict()  # (id, digest) -> _EntradaFigura
+_LOCK_FIGURAS = threading.Lock()
+_ESTATISTICAS = {"acertos": 0, "faltas": 0}
+
+
+def _digest(dados, colunas, parametros):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(parametros).encode())
+    for col in colunas:
+        h.update(col.encode())
+        h.update(pd.util.hash_pandas_object(dados[col], index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def estatisticas_graficos():
+    """Acertos/faltas do cache de figuras, qtd. de figuras e bytes de JSON guardados."""
+    with _LOCK_FIGURAS:
+        return {**_ESTATISTICAS, "figuras": len(_FIGURAS),
+                "bytes": sum(len(e.json) for e in _FIGURAS.values())}
+
+
+def limpar_cache_graficos():
+    with _LOCK_FIGURAS:
+        _FIGURAS.clear()
+        _ESTATISTICAS.update(acertos=0, faltas=0)
+
+
+@instrumentado("figura_plotly")
+def _montar_barras(dados, x, y, rotulos, orientacao, titulo, labels, titulo_x, titulo_y, layout):
+    # plotly.express só é carregado no 1º gráfico (não atrasa login e filtros)
+    import plotly.express as px
+
+    horizontal = orientacao == "h"
+    fig = px.bar(
+        dados,
+        x=x,
+        y=y,
+        orientation=orientacao,
+        text=rotulos,
+        labels=labels,
+        title=titulo,
+        color_discrete_sequence=[AZUL],
+    )
+    fig.update_traces(textposition="outside", cliponaxis=False)
+
+    # estilo limpo (fundo transparente e sem grade)
+    fig.update_layout(
+        plot_bgcolor=_FUNDO,
+        paper_bgcolor=_FUNDO,
+        showlegend=False,
+        margin=dict(l=10, r=10, t=50, b=10),
+        **(layout or {}),
+    )
+    # manter a ordem do agregado no eixo das categorias
+    categorias = dict(categoryorder="array", categoryarray=dados[y if horizontal else x])
+    fig.update_xaxes(showgrid=False, zeroline=False, title=titulo_x, **({} if horizontal else categorias))
+    fig.update_yaxes(showgrid=False, zeroline=False, title=titulo_y, **(categorias if horizontal else {}))
+    return fig
+
+
+def grafico_barras(id_grafico, dados, x, y, rotulos, *, orientacao="v", titulo=None, labels=None,
+                   titulo_x=None, titulo_y=None, layout=None):
+    """
+    Figura de barras do relatório (azul, rótulo fora, fundo transparente, sem
+    grade), com as categorias na ordem de `dados`. `rotulos` é o texto de cada
+    barra, alinhado às linhas de `dados`. A figura vem do cache quando o mesmo
+    gráfico já foi montado para o mesmo agregado; não altere a figura devolvida.
+    """
+    rotulos = np.asarray(rotulos, dtype=object)
+    parametros = (orientacao, titulo, sorted((labels or {}).items()), titulo_x, titulo_y,
+                  sorted((layout or {}).items()), tuple(rotulos.tolist()))
+    chave = (id_grafico, _digest(dados, (x, y), parametros))
+    with _LOCK_FIGURAS:
+        entrada = _FIGURAS.get(chave)
+        if entrada is not None:
+            _FIGURAS.move_to_end(chave)
+            _ESTATISTICAS["acertos"] += 1
+    if entrada is not None:
+        return entrada.figura()
+
+    fig = _montar_barras(dados, x, y, rotulos, orientacao, titulo, labels, titulo_x, titulo_y, layout)
+    entrada = _EntradaFigura(fig.to_json(), fig)
+    with _LOCK_FIGURAS:
+        _ESTATISTICAS["faltas"] += 1
+        _FIGURAS[chave] = entrada
+        _FIGURAS.move_to_end(chave)
+        while len(_FIGURAS) > MAX_FIGURAS:
+            _FIGURAS.popitem(last=False)
+    return fig
@@ -0,0 +1,252 @@
+import os
+import sys
+import threading
+from itertools import combinations
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from PIL import Image
+
+from painel.imagens.miniaturas import CacheMiniaturas
+
+# Índice de quase-duplicatas do mosaico: um hash perceptual de 64 bits por
+# imagem original do cache (pHash ou dHash) e um grupo por imagem. Imagens a
+# até RAIO_PADRAO bits de distância (Hamming) de uma já indexada entram no
+# grupo dela; a busca usa multi-index hashing (TabelaMultiIndice), então
+# indexar uma imagem nova não varre todas as já indexadas. O índice é montado
+# offline (python -m painel.imagens.duplicatas) e fica em
+# <cache de miniaturas>/duplicatas.parquet.
+RAIO_PADRAO = int(os.environ.get("IA_FARM_RAIO_DUPLICATAS", "6"))
+TIPO_HASH_PADRAO = "phash"
+ARQUIVO_INDICE = "duplicatas.parquet"
+
+
+# ----------------- hashes perceptuais -----------------
+def _bits_para_int(bits):
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def dhash(img, lado=8):
+    """Hash de diferença: compara pixels vizinhos da imagem em (lado+1) x lado tons de cinza."""
+    cinza = np.asarray(img.convert("L").resize((lado + 1, lado), Image.Resampling.LANCZOS), dtype=np.int16)
+    return _bits_para_int(cinza[:, 1:] > cinza[:, :-1])
+
+
+def _matriz_dct(n):
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    return np.cos(np.pi * (2 * x + 1) * k / (2 * n))
+
+
+_DCT32 = _matriz_dct(32)
+
+
+def phash(img):
+    """Hash perceptual: 8 x 8 frequências mais baixas da DCT de 32 x 32 contra a mediana."""
+    cinza = np.asarray(img.convert("L").resize((32, 32), Image.Resampling.LANCZOS), dtype=np.float64)
+    baixas = (_DCT32 @ cinza @ _DCT32.T)[:8, :8]
+    # a mediana ignora o termo DC (brilho médio)
+    return _bits_para_int(baixas > np.median(baixas.ravel()[1:]))
+
+
+HASHES = {"phash": phash, "dhash": dhash}
+
+
+def hash_do_arquivo(caminho, tipo=TIPO_HASH_PADRAO):
+    with Image.open(caminho) as img:
+        return HASHES[tipo](img)
+
+
+def distancia(a, b):
+    """Distância de Hamming entre dois hashes de 64 bits."""
+    return (a ^ b).bit_count()
+
+
+# ----------------- multi-index hashing -----------------
+class TabelaMultiIndice:
+    """
+    Busca por raio em distância de Hamming com multi-index hashing: os 64 bits
+    são cortados em `n_fatias` fatias de 16 bits, cada uma com sua tabela. Dois
+    hashes a até `raio` bits de distância diferem em no máximo raio // n_fatias
+    bits em alguma fatia, então basta olhar, em cada tabela, as chaves a essa
+    distância da fatia consultada e conferir só esses candidatos.
+    """
+
+    def __init__(self, raio, bits=64, n_fatias=4):
+        self.raio = raio
+        largura = bits // n_fatias
+        self._fatias = [(i * largura, (1 << largura) - 1) for i in range(n_fatias)]
+        # variações da chave de cada fatia a até raio // n_fatias bits
+        self._variacoes = [0]
+        for k in range(1, raio // n_fatias + 1):
+            self._variacoes += [sum(1 << b for b in bits_) for bits_ in combinations(range(largura), k)]
+        self._tabelas = [{} for _ in self._fatias]  # valor da fatia -> [(hash, valor)]
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    def inserir(self, h, valor):
+        self._n += 1
+        for tabela, (desloc, mascara) in zip(self._tabelas, self._fatias):
+            tabela.setdefault((h >> desloc) & mascara, []).append((h, valor))
+
+    def buscar(self, h):
+        """[(distância, hash, valor)] a até `raio` bits de h, do mais próximo ao mais distante."""
+        achados = {}
+        for tabela, (desloc, mascara) in zip(self._tabelas, self._fatias):
+            chave = (h >> desloc) & mascara
+            for variacao in self._variacoes:
+                for outro, valor in tabela.get(chave ^ variacao, ()):
+                    if outro not in achados:
+                        d = distancia(h, outro)
+                        if d <= self.raio:
+                            achados[outro] = (d, outro, valor)
+        return sorted(achados.values(), key=lambda a: (a[0], a[2]))
+
+
+# ----------------- índice -----------------
+class IndiceDuplicatas:
+    """digest do conteúdo -> (hash, grupo), com a tabela de busca dos hashes já indexados."""
+
+    def __init__(self, tipo=TIPO_HASH_PADRAO, raio=RAIO_PADRAO):
+        self.tipo = tipo
+        self.raio = raio
+        self.hashes = {}  # digest -> hash
+        self.grupos = {}  # digest -> grupo
+        self._tabela = None  # montada só quando for indexar (o app só consulta os grupos)
+        self._por_hash = {}  # hash -> grupo (hashes iguais não entram de novo na tabela)
+        self._proximo_grupo = 0
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def adicionar(self, digest, h):
+        """Indexa a imagem e devolve o grupo (o da vizinha mais próxima dentro do raio ou um novo)."""
+        if digest in self.grupos:
+            return self.grupos[digest]
+        grupo = self._por_hash.get(h)
+        if grupo is None:
+            if self._tabela is None:
+                self._tabela = TabelaMultiIndice(self.raio)
+                for outro, g in self._por_hash.items():
+                    self._tabela.inserir(outro, g)
+            vizinhas = self._tabela.buscar(h)
+            if vizinhas:
+                grupo = vizinhas[0][2]
+            else:
+                grupo = self._proximo_grupo
+                self._proximo_grupo += 1
+            self._tabela.inserir(h, grupo)
+            self._por_hash[h] = grupo
+        self.hashes[digest] = h
+        self.grupos[digest] = grupo
+        return grupo
+
+    def gravar(self, caminho):
+        digests = list(self.hashes)
+        tabela = pa.table({
+            "digest": pa.array(digests, pa.string()),
+            "hash": pa.array([self.hashes[d] for d in digests], pa.uint64()),
+            "grupo": pa.array([self.grupos[d] for d in digests], pa.int64()),
+        }, metadata={b"ia_farm:tipo": self.tipo.encode(), b"ia_farm:raio": str(self.raio).encode()})
+        tmp = f"{caminho}.{os.getpid()}.tmp"
+        pq.write_table(tabela, tmp, compression="zstd")
+        os.replace(tmp, caminho)
+
+    @classmethod
+    def ler(cls, caminho):
+        tabela = pq.read_table(caminho)
+        meta = tabela.schema.metadata or {}
+        indice = cls(meta.get(b"ia_farm:tipo", TIPO_HASH_PADRAO.encode()).decode(),
+                     int(meta.get(b"ia_farm:raio", str(RAIO_PADRAO).encode())))
+        # os grupos gravados continuam valendo; a tabela de busca é remontada se preciso
+        for d, h, g in zip(*(tabela.column(c).to_pylist() for c in ("digest", "hash", "grupo"))):
+            indice.hashes[d] = h
+            indice.grupos[d] = g
+            indice._por_hash.setdefault(h, g)
+            indice._proximo_grupo = max(indice._proximo_grupo, g + 1)
+        return indice
+
+
+def atualizar_indice(cache=None, tipo=TIPO_HASH_PADRAO, raio=RAIO_PADRAO):
+    """
+    Indexa os originais do cache de miniaturas que ainda não estão no índice
+    e grava o resultado. Retorna (índice, qtd. de imagens novas).
+    """
+    cache = cache or CacheMiniaturas()
+    caminho = os.path.join(cache.diretorio, ARQUIVO_INDICE)
+    indice = IndiceDuplicatas.ler(caminho) if os.path.exists(caminho) else IndiceDuplicatas(tipo, raio)
+    pasta = os.path.join(cache.diretorio, "originais")
+    novos = 0
+    for digest in sorted(os.listdir(pasta)):
+        if digest.endswith(".tmp") or digest in indice.hashes:
+            continue
+        try:
+            h = hash_do_arquivo(os.path.join(pasta, digest), indice.tipo)
+        except Exception:
+            continue  # arquivo que o Pillow não abre (ex.: erro HTML salvo como imagem)
+        indice.adicionar(digest, h)
+        novos += 1
+    if novos:
+        indice.gravar(caminho)
+    return indice, novos
+
+
+# índice do processo, relido quando o arquivo muda: caminho -> (mtime, índice)
+_INDICES = {}
+_LOCK_INDICES = threading.Lock()
+
+
+def _cache_do_processo():
+    """Cache do prefetcher do mosaico (o app não monta um segundo CacheMiniaturas)."""
+    from painel.imagens.prefetch import obter_prefetcher
+    return obter_prefetcher().cache
+
+
+def versao_do_indice(cache=None):
+    """mtime (ns) do arquivo do índice, ou None se ainda não foi montado."""
+    cache = cache or _cache_do_processo()
+    try:
+        return os.stat(os.path.join(cache.diretorio, ARQUIVO_INDICE)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def obter_indice(cache=None):
+    """Índice de quase-duplicatas do cache (None se ainda não foi montado)."""
+    cache = cache or _cache_do_processo()
+    caminho = os.path.join(cache.diretorio, ARQUIVO_INDICE)
+    mtime = versao_do_indice(cache)
+    if mtime is None:
+        return None
+    with _LOCK_INDICES:
+        atual = _INDICES.get(caminho)
+        if atual is None or atual[0] != mtime:
+            atual = (mtime, IndiceDuplicatas.ler(caminho))
+            _INDICES[caminho] = atual
+        return atual[1]
+
+
+def grupos_das_urls(urls, cache=None):
+    """
+    Grupo de quase-duplicatas de cada URL (lista alinhada a urls). URLs que
+    ainda não estão no índice recebem um grupo próprio (negativo).
+    """
+    cache = cache or _cache_do_processo()
+    indice = obter_indice(cache)
+    saida = []
+    for i, url in enumerate(urls):
+        digest = cache.digest_da_url(url) if indice is not None else None
+        grupo = indice.grupos.get(digest) if digest else None
+        saida.append(grupo if grupo is not None else -1 - i)
+    return saida
+
+
+if __name__ == "__main__":
+    # uso: python -m painel.imagens.duplicatas [raio] [phash|dhash]
+    raio = int(sys.argv[1]) if len(sys.argv) > 1 else RAIO_PADRAO
+    tipo = sys.argv[2] if len(sys.argv) > 2 else TIPO_HASH_PADRAO
+    indice, novos = atualizar_indice(tipo=tipo, raio=raio)
+    print(f"{novos} imagens novas; {len(indice)} no índice, {len(set(indice.grupos.values()))} grupos")
@@ -0,0 +1,211 @@
+import os
+import io
+import hashlib
+import threading
+import urllib.request
+from collections import OrderedDict
+
+import streamlit as st
+from PIL import Image, ImageOps, features
+
+# Cache em disco das miniaturas do mosaico. Cada imagem é baixada uma vez e
+# guardada pelo SHA-256 do conteúdo (originais/); as miniaturas são derivadas
+# dela no tamanho do tile (tiles/) e um índice url -> conteúdo (urls/) evita
+# baixar de novo entre reruns e reinícios. O total em disco é limitado por
+# bytes, descartando primeiro os arquivos usados há mais tempo.
+# O padrão fica em static/: com server.enableStaticServing o Streamlit serve
+# essa pasta em app/static/ e o navegador busca os tiles direto (mosaico em grade).
+DIRETORIO_PADRAO = os.environ.get("IA_FARM_CACHE_MINIATURAS", os.path.join("static", "miniaturas"))
+MAX_BYTES_PADRAO = int(float(os.environ.get("IA_FARM_CACHE_MINIATURAS_MB", "512")) * 1024 * 1024)
+# IA_FARM_MINIATURAS=0 volta a mandar as URLs originais direto para o st.image
+# (a busca concorrente dos tiles fica em painel.imagens.prefetch)
+MINIATURAS_ATIVAS = os.environ.get("IA_FARM_MINIATURAS", "1") != "0"
+
+LARGURA_TILE = 320
+TIMEOUT_DOWNLOAD = 10
+FORMATO_TILE = "WEBP" if features.check("webp") else "JPEG"
+_EXTENSOES = {"WEBP": "webp", "JPEG": "jpg"}
+
+
+def _hash_url(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def _baixar(url, timeout=TIMEOUT_DOWNLOAD):
+    """Conteúdo da URL (bytes); levanta exceção em erro HTTP/rede."""
+    req = urllib.request.Request(url, headers={"User-Agent": "ia-farm-painel"})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return resp.read()
+
+
+def tamanho_do_tile(proporcao, largura=LARGURA_TILE):
+    """(largura, altura) do tile para a proporção CSS do mosaico (ex.: "1 / 1", "4 / 5")."""
+    try:
+        w, h = (float(p) for p in str(proporcao).split("/"))
+        if w <= 0 or h <= 0:
+            raise ValueError(proporcao)
+    except ValueError:
+        w = h = 1.0
+    return largura, max(1, round(largura * h / w))
+
+
+def _gravar_atomico(caminho, conteudo):
+    tmp = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(conteudo)
+    os.replace(tmp, caminho)
+
+
+class CacheMiniaturas:
+    """
+    Cache endereçado por conteúdo das imagens do mosaico, com LRU por bytes.
+    Seguro para uso concorrente dentro do processo.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_PADRAO, max_bytes=MAX_BYTES_PADRAO, baixar=_baixar):
+        self.diretorio = os.path.abspath(diretorio)
+        self.max_bytes = max_bytes
+        self.baixar = baixar
+        self._lock = threading.Lock()
+        self._arquivos = OrderedDict()  # caminho -> bytes (do menos para o mais usado)
+        self._total = 0
+        for sub in ("originais", "tiles", "urls"):
+            os.makedirs(os.path.join(self.diretorio, sub), exist_ok=True)
+        self._indexar()
+
+    def _indexar(self):
+        """Carrega os arquivos já em disco, ordenados pelo último acesso."""
+        encontrados = []
+        for sub in ("originais", "tiles"):
+            pasta = os.path.join(self.diretorio, sub)
+            for nome in os.listdir(pasta):
+                if nome.endswith(".tmp"):
+                    continue
+                st_ = os.stat(os.path.join(pasta, nome))
+                encontrados.append((st_.st_mtime, os.path.join(pasta, nome), st_.st_size))
+        for _, caminho, tamanho in sorted(encontrados):
+            self._arquivos[caminho] = tamanho
+            self._total += tamanho
+
+    @property
+    def nbytes(self):
+        return self._total
+
+    # ----------------- LRU -----------------
+    def _tocar(self, caminho):
+        """Marca o arquivo como usado agora; False se ele não está mais em disco."""
+        with self._lock:
+            if caminho not in self._arquivos:
+                return False
+            self._arquivos.move_to_end(caminho)
+        try:
+            os.utime(caminho)  # o mtime guarda a ordem de uso entre reinícios
+        except FileNotFoundError:
+            self._esquecer(caminho)
+            return False
+        return True
+
+    def _esquecer(self, caminho):
+        with self._lock:
+            self._total -= self._arquivos.pop(caminho, 0)
+
+    def _registrar(self, caminho, conteudo):
+        _gravar_atomico(caminho, conteudo)
+        with self._lock:
+            self._total += len(conteudo) - self._arquivos.pop(caminho, 0)
+            self._arquivos[caminho] = len(conteudo)
+            remover = []
+            # nunca descarta o arquivo que acabou de entrar
+            while self._total > self.max_bytes and len(self._arquivos) > 1:
+                antigo, tamanho = self._arquivos.popitem(last=False)
+                self._total -= tamanho
+                remover.append(antigo)
+        for antigo in remover:
+            try:
+                os.remove(antigo)
+            except FileNotFoundError:
+                pass
+
+    # ----------------- originais -----------------
+    def _caminho_original(self, digest):
+        return os.path.join(self.diretorio, "originais", digest)
+
+    def _indice(self, url):
+        return os.path.join(self.diretorio, "urls", _hash_url(url))
+
+    def digest_da_url(self, url):
+        """SHA-256 do conteúdo já baixado da URL, ou None."""
+        try:
+            with open(self._indice(url), encoding="ascii") as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def original(self, url):
+        """(digest, caminho) da imagem original, baixando só se ela ainda não estiver no cache."""
+        digest = self.digest_da_url(url)
+        if digest:
+            caminho = self._caminho_original(digest)
+            if self._tocar(caminho):
+                return digest, caminho
+
+        conteudo = self.baixar(url)
+        digest = hashlib.sha256(conteudo).hexdigest()
+        caminho = self._caminho_original(digest)
+        # mesmo conteúdo em outra URL: reaproveita o arquivo já guardado
+        if not self._tocar(caminho):
+            self._registrar(caminho, conteudo)
+        _gravar_atomico(self._indice(url), digest.encode("ascii"))
+        return digest, caminho
+
+    # ----------------- tiles -----------------
+    def _caminho_tile(self, digest, proporcao, largura, formato):
+        w, h = tamanho_do_tile(proporcao, largura)
+        return os.path.join(self.diretorio, "tiles", f"{digest}_{w}x{h}.{_EXTENSOES[formato]}")
+
+    def miniatura_em_cache(self, url, proporcao="1 / 1", largura=LARGURA_TILE, formato=FORMATO_TILE):
+        """Caminho do tile se ele já estiver no cache (sem baixar nada); senão None."""
+        digest = self.digest_da_url(url)
+        if digest:
+            caminho = self._caminho_tile(digest, proporcao, largura, formato)
+            if self._tocar(caminho):
+                return caminho
+        return None
+
+    def miniatura(self, url, proporcao="1 / 1", largura=LARGURA_TILE, formato=FORMATO_TILE):
+        """
+        Caminho do tile (largura x altura da proporção, recortado ao centro) da
+        imagem da URL. Gera a partir do original em cache na primeira vez.
+        """
+        # tile já gerado: não precisa nem do original (que pode ter sido descartado)
+        caminho = self.miniatura_em_cache(url, proporcao, largura, formato)
+        if caminho is not None:
+            return caminho
+
+        digest, caminho_original = self.original(url)
+        caminho = self._caminho_tile(digest, proporcao, largura, formato)
+        if self._tocar(caminho):
+            return caminho
+
+        with Image.open(caminho_original) as img:
+            img = ImageOps.exif_transpose(img)
+            img = img.convert("RGBA" if formato == "WEBP" and img.mode in ("RGBA", "LA", "P") else "RGB")
+            tile = ImageOps.fit(img, tamanho_do_tile(proporcao, largura), method=Image.Resampling.LANCZOS)
+        buf = io.BytesIO()
+        tile.save(buf, format=formato, quality=80)
+        self._registrar(caminho, buf.getvalue())
+        return caminho
+
+
+def url_estatica(caminho):
+    """
+    URL relativa (app/static/...) de um arquivo do cache para o navegador, ou
+    None se o static serving estiver desligado ou o arquivo estiver fora de
+    static/ (relativo ao diretório de execução, como os caminhos de data/).
+    """
+    if caminho is None or not st.get_option("server.enableStaticServing"):
+        return None
+    rel = os.path.relpath(os.path.abspath(caminho), os.path.abspath("static"))
+    if rel.startswith(".."):
+        return None
+    return "app/static/" + rel.replace(os.sep, "/")
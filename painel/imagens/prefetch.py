@@ -0,0 +1,146 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from painel.imagens.miniaturas import CacheMiniaturas, MINIATURAS_ATIVAS
+
+# Pré-carga das miniaturas do mosaico: os tiles da página atual são baixados e
+# redimensionados em paralelo (pool de threads limitado) e os da próxima página
+# ficam aquecendo em segundo plano. A página espera no máximo ESPERA_PAGINA;
+# o que não ficou pronto (ou falhou) vira o tile .placeholder e aparece num
+# rerun seguinte, já do cache.
+MAX_THREADS = int(os.environ.get("IA_FARM_THREADS_MINIATURAS", "8"))
+ESPERA_PAGINA = float(os.environ.get("IA_FARM_ESPERA_MINIATURAS", "4"))
+TIMEOUT = (3.05, 10)      # (conexão, leitura) em segundos
+TENTATIVAS = 2            # retries além da 1ª tentativa (erros de rede e 429/5xx)
+CONEXOES_POR_HOST = 8
+MAX_HOSTS = 16
+# URL que falhou não é tentada de novo por este tempo (evita travar todo rerun)
+SEGUNDOS_FALHA = 600
+
+
+def _sessao_http():
+    """Sessão com pool de conexões por host e retry com backoff."""
+    # requests/urllib3 só são carregados quando o mosaico busca a 1ª miniatura
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=TENTATIVAS,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    adaptador = HTTPAdapter(pool_connections=MAX_HOSTS, pool_maxsize=CONEXOES_POR_HOST, max_retries=retry)
+    sessao = requests.Session()
+    sessao.headers["User-Agent"] = "ia-farm-painel"
+    sessao.mount("http://", adaptador)
+    sessao.mount("https://", adaptador)
+    return sessao
+
+
+def baixar_com_sessao(sessao):
+    """Função de download para o CacheMiniaturas usando a sessão (pool + retry + timeout)."""
+    def _baixar(url):
+        resp = sessao.get(url, timeout=TIMEOUT)
+        resp.raise_for_status()
+        return resp.content
+    return _baixar
+
+
+class PrefetcherMiniaturas:
+    """
+    Busca tiles do CacheMiniaturas num pool de threads limitado. Cada URL tem
+    no máximo uma busca em andamento; falhas recentes não são refeitas.
+    """
+
+    def __init__(self, cache=None, max_threads=MAX_THREADS):
+        if cache is None:
+            cache = CacheMiniaturas(baixar=baixar_com_sessao(_sessao_http()))
+        self.cache = cache
+        self.max_threads = max_threads
+        self._pool = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="miniaturas")
+        self._lock = threading.Lock()
+        self._em_andamento = {}  # (url, proporcao) -> Future
+        self._falhas = {}        # url -> instante da última falha
+
+    def _buscar(self, url, proporcao):
+        try:
+            return self.cache.miniatura(url, proporcao)
+        except Exception:
+            with self._lock:
+                self._falhas[url] = time.monotonic()
+            return None
+        finally:
+            with self._lock:
+                self._em_andamento.pop((url, proporcao), None)
+
+    def _agendar(self, url, proporcao, limite=None):
+        """Future da busca do tile (reaproveita a que já está rodando); None se a URL falhou há pouco."""
+        with self._lock:
+            falha = self._falhas.get(url)
+            if falha is not None:
+                if time.monotonic() - falha < SEGUNDOS_FALHA:
+                    return None
+                del self._falhas[url]
+            fut = self._em_andamento.get((url, proporcao))
+            if fut is None:
+                # aquecimento não enfileira mais do que o pool dá conta
+                if limite is not None and len(self._em_andamento) >= limite:
+                    return None
+                fut = self._pool.submit(self._buscar, url, proporcao)
+                self._em_andamento[(url, proporcao)] = fut
+            return fut
+
+    def pagina(self, urls, proporcao="1 / 1", espera=ESPERA_PAGINA):
+        """
+        Tiles das URLs da página, buscados em paralelo. Espera no máximo
+        `espera` segundos; o que não ficou pronto ou falhou vem como None.
+        """
+        prontos, futuros = {}, {}
+        for u in dict.fromkeys(urls):
+            # tile já em disco não passa pelo pool
+            prontos[u] = self.cache.miniatura_em_cache(u, proporcao)
+            if prontos[u] is None:
+                futuros[u] = self._agendar(u, proporcao)
+        pendentes = [f for f in futuros.values() if f is not None]
+        if pendentes and espera > 0:
+            wait(pendentes, timeout=espera)
+        for u, f in futuros.items():
+            prontos[u] = f.result() if f is not None and f.done() else None
+        return prontos
+
+    def aquecer(self, urls, proporcao="1 / 1"):
+        """Agenda em segundo plano as URLs (ex.: próxima página), sem esperar."""
+        for u in dict.fromkeys(urls):
+            self._agendar(u, proporcao, limite=self.max_threads * 2)
+
+
+_PREFETCHER = None
+_LOCK_PREFETCHER = threading.Lock()
+
+
+def obter_prefetcher():
+    """Prefetcher do processo (pool e cache compartilhados entre sessões)."""
+    global _PREFETCHER
+    with _LOCK_PREFETCHER:
+        if _PREFETCHER is None:
+            _PREFETCHER = PrefetcherMiniaturas()
+        return _PREFETCHER
+
+
+def tiles_da_pagina(urls, proporcao="1 / 1", proximas=(), espera=ESPERA_PAGINA):
+    """
+    Fonte de cada tile da página para o st.image: caminho do tile em cache ou
+    None (placeholder). Com o cache desligado devolve as próprias URLs.
+    `proximas` (URLs da próxima página) ficam aquecendo em segundo plano.
+    Com espera=0 só devolve o que já está em cache e agenda o resto.
+    """
+    if not MINIATURAS_ATIVAS:
+        return {u: u for u in urls}
+    prefetcher = obter_prefetcher()
+    tiles = prefetcher.pagina(urls, proporcao, espera)
+    prefetcher.aquecer(proximas, proporcao)
+    return tiles
@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import logging
+import threading
+import functools
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# Instrumentação dos pontos quentes do relatório (carga, achatamento, filtro,
+# cada gráfico e o mosaico): tempo de parede, linhas de entrada/saída e, se
+# pedido, bytes alocados por medição. Desligada por padrão: os decoradores
+# devolvem a própria função e medir() não faz nada. Ligada, as medições de cada
+# rerun são reunidas por coletar(), viram uma linha de log JSON (logger
+# "ia_farm.instrumentacao") e ficam disponíveis para o painel de diagnóstico.
+#   IA_FARM_INSTRUMENTACAO=1        tempo e linhas (custo desprezível)
+#   IA_FARM_INSTRUMENTACAO=memoria  também bytes alocados/pico, via tracemalloc:
+#                                   deixa o Python bem mais lento e é global ao
+#                                   processo (com sessões simultâneas os bytes
+#                                   incluem o que as outras alocaram)
+_MODO = os.environ.get("IA_FARM_INSTRUMENTACAO", "0").lower()
+INSTRUMENTACAO_ATIVA = _MODO in ("1", "memoria")
+_MEDIR_MEMORIA = _MODO == "memoria"
+
+LOGGER = logging.getLogger("ia_farm.instrumentacao")
+if INSTRUMENTACAO_ATIVA and not LOGGER.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    LOGGER.addHandler(_handler)
+    LOGGER.setLevel(logging.INFO)
+
+# estado por thread (cada sessão do Streamlit roda o script numa thread própria)
+_LOCAL = threading.local()
+
+
+def _linhas(obj):
+    """Qtd. de linhas de um DataFrame/Series/array (ou do 1º deles numa tupla); None se não houver."""
+    if isinstance(obj, tuple):
+        return next((n for n in map(_linhas, obj) if n is not None), None)
+    if isinstance(obj, (pd.DataFrame, pd.Series, np.ndarray)):
+        return len(obj)
+    return None
+
+
+class Medicao:
+    """Uma medição em andamento; linhas_saida pode ser preenchida por quem mede."""
+
+    __slots__ = ("nome", "nivel", "linhas_entrada", "linhas_saida", "_t0", "_bytes0", "_pico")
+
+    def __init__(self, nome, nivel, linhas_entrada):
+        self.nome = nome
+        self.nivel = nivel
+        self.linhas_entrada = linhas_entrada
+        self.linhas_saida = None
+
+
+class _MedicaoDesligada:
+    __slots__ = ()
+
+    def __setattr__(self, nome, valor):
+        pass
+
+
+_DESLIGADA = _MedicaoDesligada()
+
+
+def _pilha():
+    pilha = getattr(_LOCAL, "pilha", None)
+    if pilha is None:
+        pilha = _LOCAL.pilha = []
+    return pilha
+
+
+@contextmanager
+def medir(nome, entrada=None):
+    """
+    Mede o bloco: tempo, linhas de `entrada` (DataFrame) e de linhas_saida
+    (atribuída pelo bloco) e bytes alocados. Só registra dentro de coletar().
+    """
+    registro = getattr(_LOCAL, "registro", None)
+    if not INSTRUMENTACAO_ATIVA or registro is None:
+        yield _DESLIGADA
+        return
+
+    pilha = _pilha()
+    medicao = Medicao(nome, len(pilha), _linhas(entrada))
+    if _MEDIR_MEMORIA:
+        atual, pico = tracemalloc.get_traced_memory()
+        if pilha:
+            # o pico da medição de fora até aqui não pode se perder no reset abaixo
+            pilha[-1]._pico = max(pilha[-1]._pico, pico)
+        tracemalloc.reset_peak()
+        medicao._bytes0 = medicao._pico = atual
+    pilha.append(medicao)
+    medicao._t0 = time.perf_counter()
+    try:
+        yield medicao
+    finally:
+        ms = (time.perf_counter() - medicao._t0) * 1000
+        pilha.pop()
+        alocados = pico = None
+        if _MEDIR_MEMORIA:
+            atual, pico = tracemalloc.get_traced_memory()
+            pico = max(medicao._pico, pico)
+            if pilha:
+                pilha[-1]._pico = max(pilha[-1]._pico, pico)
+            alocados, pico = atual - medicao._bytes0, pico - medicao._bytes0
+        registro.append({
+            "nome": nome,
+            "nivel": medicao.nivel,
+            "ms": round(ms, 3),
+            "linhas_entrada": medicao.linhas_entrada,
+            "linhas_saida": medicao.linhas_saida,
+            "bytes_alocados": alocados,
+            "bytes_pico": pico,
+        })
+
+
+def instrumentado(nome=None):
+    """
+    Decorador: mede cada chamada com medir(), com o 1º argumento como entrada
+    e o retorno como saída. Com a instrumentação desligada devolve a função.
+    """
+    def decorador(fn):
+        if not INSTRUMENTACAO_ATIVA:
+            return fn
+        rotulo = nome or fn.__name__
+
+        @functools.wraps(fn)
+        def medido(*args, **kwargs):
+            with medir(rotulo, args[0] if args else None) as medicao:
+                resultado = fn(*args, **kwargs)
+                medicao.linhas_saida = _linhas(resultado)
+                return resultado
+        return medido
+    return decorador
+
+
+@contextmanager
+def coletar(evento, **contexto):
+    """
+    Reúne as medições feitas no bloco (um rerun ou um rerun só de fragmento) e
+    no fim grava a linha de log. Devolve a lista de medições (em ordem de
+    término), ou None se a instrumentação estiver desligada ou se já houver uma
+    coleta em andamento nesta thread (as medições vão para ela).
+    """
+    if not INSTRUMENTACAO_ATIVA or getattr(_LOCAL, "registro", None) is not None:
+        yield None
+        return
+    if _MEDIR_MEMORIA and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    registro = _LOCAL.registro = []
+    t0 = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        _LOCAL.registro = None
+        _LOCAL.pilha = []
+        LOGGER.info(json.dumps({
+            "evento": evento,
+            **contexto,
+            "ms": round((time.perf_counter() - t0) * 1000, 3),
+            "medicoes": registro,
+        }, ensure_ascii=False, default=str))
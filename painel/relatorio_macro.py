@@ -1,16 +1,39 @@
-from PIL import Image
 import streamlit as st
 import pandas as pd
-from authentication.login import login_user
 
-import re
-import ast
-
-from painel.filtro.filtro_relatorio_macro import *
-from painel.funcao.funcao_relatorio_macro import *
+import time
+from contextlib import contextmanager
+
+from authentication.login import usuario_administrador
+from painel.instrumentacao import INSTRUMENTACAO_ATIVA, coletar, medir
+from painel.filtro.filtro_relatorio_macro import app_filtro_relatorio_macro
+from painel.funcao.funcao_relatorio_macro import (
+    kpis_relatorio,
+    app_funcao_conceito_basico_parte01,
+    app_funcao_conceito_basico_parte02,
+    app_funcao_tipo_post,
+    app_funcao_objetos,
+    app_funcao_hashtags,
+    app_funcao_emocoes_legenda,
+    grafico_topicos_legenda,
+    grafico_gatilhos_legenda,
+    grafico_ctas_legenda,
+    filtro_e_mosaico_imagens,
+)
 
 def app_relatorio_macro(authenticator):
 
+    # com IA_FARM_INSTRUMENTACAO=1 o rerun é medido e vira uma linha de log
+    with coletar("rerun_relatorio") as medicoes:
+        _relatorio(authenticator)
+
+    if medicoes is not None:
+        st.session_state["instrumentacao_relatorio"] = medicoes
+    if INSTRUMENTACAO_ATIVA and usuario_administrador(st.session_state.get("email")):
+        _painel_instrumentacao()
+
+def _relatorio(authenticator):
+
     with st.container():
 
         col1,col2 = st.columns([19,1])
@@ -21,52 +44,117 @@ def app_relatorio_macro(authenticator):
         with col2:
             authenticator.logout(location='main')
     
-    base_filtrada = app_filtro_relatorio_macro()
+    # filtros no escopo do app: todas as seções dependem deles, então mudar um
+    # filtro reroda a página inteira (o recorte é memoizado por filtro)
+    with _cronometrar("filtros"):
+        base_filtrada = app_filtro_relatorio_macro()
 
     st.subheader("📊 Informações Gerais")
-    
-    with st.container():
-        app_funcao_conceito_basico_parte01(base_filtrada)
-    
-    with st.container():
-        app_funcao_conceito_basico_parte02(base_filtrada)
-    
-    st.subheader("📈 Análises Detalhadas")
-    #
-    with st.container():
-
-        col1, col2, col3 = st.columns([1.5,2,2], border=True)
-        
-        with col1:
-            app_funcao_tipo_post(base_filtrada)
-
-        with col2:
-            app_funcao_objetos(base_filtrada)
-       
-        with col3:
-            app_funcao_hashtags(base_filtrada)
+    _secao_kpis(base_filtrada)
 
-    with st.container():
-
-        col1, col2 = st.columns([1, 1], border=True)
-        
-        with col1:
-            app_funcao_emocoes_legenda(base_filtrada)
-
-        with col2:
-            grafico_topicos_legenda(base_filtrada, top_n=5)
-    
-    with st.container():
-
-        col1, col2 = st.columns([1, 1], border=True)
-
-        with col1:
-            grafico_gatilhos_legenda(base_filtrada, top_n=5)
+    st.subheader("📈 Análises Detalhadas")
+    _secao_graficos(base_filtrada)
 
-        with col2:
-            grafico_ctas_legenda(base_filtrada, top_n=5)
-    
-    
     st.subheader("🧩 Mosaico de Imagens")
-    filtro_e_mosaico_imagens(base_filtrada)
-
+    _secao_mosaico(base_filtrada)
+
+
+# Cada seção é um fragmento: interagir com um widget dela (ex.: página, colunas
+# ou contexto do mosaico) reroda só a seção, com os argumentos da última
+# execução completa, em vez do relatório inteiro.
+@contextmanager
+def _cronometrar(secao):
+    """
+    Tempo de servidor da seção na última execução, em st.session_state['tempos_relatorio'] (ms).
+    Com a instrumentação ligada a seção também é medida; num rerun só do
+    fragmento as medições dele são coletadas à parte.
+    """
+    t0 = time.perf_counter()
+    try:
+        with coletar("rerun_fragmento", secao=secao) as medicoes, medir(f"secao_{secao}"):
+            yield
+    finally:
+        tempos = st.session_state.setdefault("tempos_relatorio", {})
+        tempos[secao] = (time.perf_counter() - t0) * 1000
+    if medicoes is not None:
+        st.session_state.setdefault("instrumentacao_fragmentos", {})[secao] = medicoes
+
+def _tabela_medicoes(medicoes):
+    tabela = pd.DataFrame(medicoes)
+    for col in ("bytes_alocados", "bytes_pico"):
+        tabela[col.replace("bytes", "mb")] = pd.to_numeric(tabela.pop(col)) / 1e6
+    return tabela.sort_values("ms", ascending=False)
+
+def _painel_instrumentacao():
+    """Medições do último rerun (só para administradores): o que domina o tempo de servidor."""
+    with st.expander("🛠️ Instrumentação (diagnóstico)"):
+        medicoes = st.session_state.get("instrumentacao_relatorio")
+        if medicoes:
+            st.caption("Último rerun completo (nível = profundidade da medição; mb = MB alocados pelo "
+                       "Python, só com IA_FARM_INSTRUMENTACAO=memoria).")
+            st.dataframe(_tabela_medicoes(medicoes), hide_index=True, width="stretch")
+        for secao, medicoes in st.session_state.get("instrumentacao_fragmentos", {}).items():
+            st.caption(f"Último rerun só da seção '{secao}'")
+            st.dataframe(_tabela_medicoes(medicoes), hide_index=True, width="stretch")
+
+def _memo_sessao(nome, base_filtrada, calcular):
+    """Valor calculado para este recorte (mesmo objeto) reaproveitado entre reruns da sessão."""
+    anterior = st.session_state.get(nome)
+    if anterior is not None and anterior[0] is base_filtrada:
+        return anterior[1]
+    valor = calcular(base_filtrada)
+    st.session_state[nome] = (base_filtrada, valor)
+    return valor
+
+@st.fragment
+def _secao_kpis(base_filtrada):
+    with _cronometrar("kpis"):
+        # os sete KPIs saem de um único passe e alimentam as duas linhas de métricas
+        kpis = _memo_sessao("_kpis_relatorio_macro", base_filtrada, kpis_relatorio)
+
+        with st.container():
+            app_funcao_conceito_basico_parte01(base_filtrada, kpis)
+
+        with st.container():
+            app_funcao_conceito_basico_parte02(base_filtrada, kpis)
+
+@st.fragment
+def _secao_graficos(base_filtrada):
+    with _cronometrar("graficos"):
+        with st.container():
+
+            col1, col2, col3 = st.columns([1.5,2,2], border=True)
+
+            with col1:
+                app_funcao_tipo_post(base_filtrada)
+
+            with col2:
+                app_funcao_objetos(base_filtrada)
+
+            with col3:
+                app_funcao_hashtags(base_filtrada)
+
+        with st.container():
+
+            col1, col2 = st.columns([1, 1], border=True)
+
+            with col1:
+                app_funcao_emocoes_legenda(base_filtrada)
+
+            with col2:
+                grafico_topicos_legenda(base_filtrada, top_n=5)
+
+        with st.container():
+
+            col1, col2 = st.columns([1, 1], border=True)
+
+            with col1:
+                grafico_gatilhos_legenda(base_filtrada, top_n=5)
+
+            with col2:
+                grafico_ctas_legenda(base_filtrada, top_n=5)
+
+@st.fragment
+def _secao_mosaico(base_filtrada):
+    with _cronometrar("mosaico"):
+        filtro_e_mosaico_imagens(base_filtrada)